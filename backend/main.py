@@ -1,11 +1,21 @@
+from dotenv import load_dotenv
+# Before the service imports: they read their settings from the environment at import time
+load_dotenv()
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes import prices, market, portfolio, trades, news, alerts, chat, backtest, whale
-from dotenv import load_dotenv
+from routes import prices, market, portfolio, trades, news, alerts, chat, backtest, whale, signals
+from services.binance_service import start_price_stream, stop_price_stream
+from services.alert_service import start_alert_monitor, flush_alerts
+from services.indicator_feed import start_indicator_feed
+from services.whale_service import start_whale_stream, stop_whale_stream
+from services.tick_store import start_tick_recorder, flush_tick_recorder
+from services.model_registry import start_model_scheduler, stop_model_scheduler
+from services.crypto_data_service import refresh_pepe_model
+from services.shared_arrays import shutdown_pool
+from services import http_client
 import uvicorn
 import os
 
-load_dotenv()
 app = FastAPI(title="Crypto Trading API", version="1.0.0")
 
 # Get allowed origins from environment or use defaults
@@ -31,6 +41,39 @@ app.include_router(alerts.router, prefix="/api/alerts", tags=["alerts"])
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
 app.include_router(backtest.router, prefix="/api/backtest", tags=["backtest"])
 app.include_router(whale.router, prefix="/api/whale", tags=["whale"])
+app.include_router(signals.router, prefix="/api/signals", tags=["signals"])
+
+# Live Binance price feed; set ENABLE_PRICE_STREAM=false to always use REST
+ENABLE_PRICE_STREAM = os.getenv("ENABLE_PRICE_STREAM", "true").lower() == "true"
+# Streaming whale detector over aggTrades; set ENABLE_WHALE_STREAM=false to poll instead
+ENABLE_WHALE_STREAM = os.getenv("ENABLE_WHALE_STREAM", "true").lower() == "true"
+# Save every streamed aggTrade to data/ticks for replay backtests
+RECORD_TICKS = os.getenv("RECORD_TICKS", "false").lower() == "true"
+# Warm-load saved models and retrain them in the background when stale
+ENABLE_MODEL_SCHEDULER = os.getenv("ENABLE_MODEL_SCHEDULER", "true").lower() == "true"
+
+@app.on_event("startup")
+def start_streams():
+    if ENABLE_PRICE_STREAM:
+        start_alert_monitor()
+        start_indicator_feed()
+        start_price_stream()
+    if ENABLE_WHALE_STREAM:
+        if RECORD_TICKS:
+            start_tick_recorder()
+        start_whale_stream()
+    if ENABLE_MODEL_SCHEDULER:
+        start_model_scheduler([refresh_pepe_model])
+
+@app.on_event("shutdown")
+async def stop_streams():
+    stop_price_stream()
+    stop_whale_stream()
+    stop_model_scheduler()
+    flush_tick_recorder()
+    flush_alerts()
+    shutdown_pool()
+    await http_client.aclose()
 
 @app.get("/")
 def root():
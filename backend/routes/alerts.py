@@ -1,8 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 import sys
 sys.path.append('..')
-from services.alert_service import load_alerts, add_alert, remove_alert, check_alerts
+from services.alert_service import list_alerts, add_alert, remove_alert, check_alerts, get_recent_triggers
 
 router = APIRouter()
 
@@ -16,25 +16,26 @@ class AlertRequest(BaseModel):
 @router.get("/")
 def get_alerts():
     """Get all price alerts"""
-    alerts = load_alerts()
+    alerts = list_alerts()
     return {"success": True, "data": alerts}
 
 @router.post("/add")
 def create_alert(alert: AlertRequest):
     """Add a new price alert"""
-    add_alert(
+    alert_id = add_alert(
         alert.coin,
         alert.target_price,
         alert.condition,
         alert.alert_type,
         alert.base_price
     )
-    return {"success": True, "message": "Alert added"}
+    return {"success": True, "message": "Alert added", "id": alert_id}
 
-@router.delete("/{index}")
-def delete_alert(index: int):
+@router.delete("/{alert_id}")
+def delete_alert(alert_id: int):
     """Remove an alert"""
-    remove_alert(index)
+    if not remove_alert(alert_id):
+        raise HTTPException(status_code=404, detail="Alert not found")
     return {"success": True, "message": "Alert removed"}
 
 @router.get("/check")
@@ -42,3 +43,8 @@ def check_price_alerts(prices: dict):
     """Check if any alerts are triggered"""
     triggered = check_alerts(prices)
     return {"success": True, "data": triggered}
+
+@router.get("/triggered")
+def get_triggered_alerts():
+    """Alerts recently triggered by live price ticks"""
+    return {"success": True, "data": get_recent_triggers()}
@@ -1,14 +1,26 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
-from services.backtesting_service import run_backtest
+from typing import List, Optional
+from services.backtesting_service import run_backtest, get_backtest_cache_stats, DEFAULT_CHART_POINTS
+from services.chart_data import columns_to_arrow, ARROW_MEDIA_TYPE
+from services.optimization_service import run_sweep, run_walk_forward
+from services.portfolio_backtest_service import run_portfolio_backtest
+from services.monte_carlo_service import run_monte_carlo
+from services.replay_service import replay_backtest, DEFAULT_BAR_SECONDS, DEFAULT_FEE_BPS
+from services.tick_store import download_ticks
+from services.binance_service import resolve_symbol
+from services.strategy_registry import list_strategies, register_strategy
 
 router = APIRouter()
 
 class BacktestRequest(BaseModel):
     coin: str
-    strategy: str  # 'sma_crossover' or 'rsi'
+    strategy: str  # 'sma_crossover', 'rsi' or a registered custom strategy
     params: dict
     days: int = 30
+    chart_points: int = DEFAULT_CHART_POINTS  # 0 keeps every candle
+    format: str = "json"  # or "arrow" (chart as an Arrow IPC stream, the rest in its metadata)
 
 @router.post("/run")
 def backtest(request: BacktestRequest):
@@ -17,10 +29,202 @@ def backtest(request: BacktestRequest):
         coin=request.coin,
         strategy=request.strategy,
         params=request.params,
-        days=request.days
+        days=request.days,
+        chart_points=request.chart_points
+    )
+    
+    if request.format == "arrow" and result.get('success'):
+        meta = {key: value for key, value in result.items() if key != 'chart'}
+        try:
+            content = columns_to_arrow(result['chart'], meta)
+        except RuntimeError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+        return Response(content=content, media_type=ARROW_MEDIA_TYPE)
+    
+    # The result is already JSON-safe; skip FastAPI's per-element encoder
+    return JSONResponse({
+        "success": result.get('success', False),
+        "data": result
+    })
+
+@router.get("/cache/stats")
+def backtest_cache_stats():
+    """Backtest result cache hit/miss counters"""
+    return {"success": True, "data": get_backtest_cache_stats()}
+
+class SweepRequest(BaseModel):
+    coin: str
+    strategy: str  # 'sma_crossover', 'rsi' or a registered custom strategy
+    grid: dict     # {param: [values]}
+    days: int = 30
+    metric: str = 'total_profit_pct'
+    top: int = 20
+
+@router.post("/sweep")
+def sweep(request: SweepRequest):
+    """Backtest every combination of a parameter grid"""
+    result = run_sweep(
+        coin=request.coin,
+        strategy=request.strategy,
+        grid=request.grid,
+        days=request.days,
+        metric=request.metric,
+        top=request.top
     )
     
     return {
         "success": result.get('success', False),
         "data": result
     }
+
+class WalkForwardRequest(BaseModel):
+    coin: str
+    strategy: str  # 'sma_crossover', 'rsi' or a registered custom strategy
+    grid: dict     # {param: [values]} searched on each train window
+    days: int = 180
+    train_days: int = 30
+    test_days: int = 7
+    metric: str = 'total_profit_pct'
+
+@router.post("/walk-forward")
+def walk_forward(request: WalkForwardRequest):
+    """Walk-forward optimization with out-of-sample scoring"""
+    result = run_walk_forward(
+        coin=request.coin,
+        strategy=request.strategy,
+        grid=request.grid,
+        days=request.days,
+        train_days=request.train_days,
+        test_days=request.test_days,
+        metric=request.metric
+    )
+    
+    return {
+        "success": result.get('success', False),
+        "data": result
+    }
+
+class PortfolioBacktestRequest(BaseModel):
+    coins: List[str]
+    strategy: str  # 'sma_crossover', 'rsi' or a registered custom strategy
+    params: dict
+    days: int = 365
+    allocation: str = 'equal_weight'  # or 'fixed_fraction'
+    fraction: Optional[float] = None
+    initial_capital: float = 10000
+
+@router.post("/portfolio")
+def portfolio_backtest(request: PortfolioBacktestRequest):
+    """Run one strategy across many coins with shared capital"""
+    result = run_portfolio_backtest(
+        coins=request.coins,
+        strategy=request.strategy,
+        params=request.params,
+        days=request.days,
+        allocation=request.allocation,
+        fraction=request.fraction,
+        initial_capital=request.initial_capital
+    )
+    
+    return {
+        "success": result.get('success', False),
+        "data": result
+    }
+
+class MonteCarloRequest(BaseModel):
+    coin: str
+    strategy: str  # 'sma_crossover', 'rsi' or a registered custom strategy
+    params: dict
+    days: int = 30
+    method: str = 'bootstrap'  # 'bootstrap', 'shuffle' or 'block'
+    simulations: int = 5000
+    block_size: int = 24
+    confidence: float = 0.95
+    initial_capital: float = 10000
+    seed: Optional[int] = None
+
+@router.post("/monte-carlo")
+def monte_carlo(request: MonteCarloRequest):
+    """Confidence intervals for a backtest from resampled trades or returns"""
+    result = run_monte_carlo(
+        coin=request.coin,
+        strategy=request.strategy,
+        params=request.params,
+        days=request.days,
+        method=request.method,
+        simulations=request.simulations,
+        block_size=request.block_size,
+        confidence=request.confidence,
+        initial_capital=request.initial_capital,
+        seed=request.seed
+    )
+    
+    return {
+        "success": result.get('success', False),
+        "data": result
+    }
+
+class ReplayRequest(BaseModel):
+    coin: str
+    strategy: str  # 'sma_crossover', 'rsi' or a registered custom strategy
+    params: dict
+    hours: int = 24
+    bar_seconds: int = DEFAULT_BAR_SECONDS
+    fee_bps: float = DEFAULT_FEE_BPS
+    latency_ms: int = 0
+    initial_capital: float = 10000
+
+@router.post("/replay")
+def replay(request: ReplayRequest):
+    """Replay recorded aggTrades through a strategy with fees and latency"""
+    result = replay_backtest(
+        coin=request.coin,
+        strategy=request.strategy,
+        params=request.params,
+        hours=request.hours,
+        bar_seconds=request.bar_seconds,
+        fee_bps=request.fee_bps,
+        latency_ms=request.latency_ms,
+        initial_capital=request.initial_capital
+    )
+    
+    return JSONResponse({
+        "success": result.get('success', False),
+        "data": result
+    })
+
+class TickDownloadRequest(BaseModel):
+    coin: str
+    hours: int = 1
+
+@router.post("/ticks/download")
+def download_tick_history(request: TickDownloadRequest):
+    """Fill the tick store with recent aggTrades from Binance"""
+    symbol = resolve_symbol(request.coin)
+    if not symbol:
+        raise HTTPException(status_code=404, detail=f"Unknown coin: {request.coin}")
+    saved = download_ticks(symbol, request.hours)
+    return {"success": True, "data": {"symbol": symbol, "ticks_saved": saved}}
+
+class StrategyRequest(BaseModel):
+    name: str
+    entry: str     # e.g. "sma(10) crosses_above sma(30) and rsi(14) < 60"
+    exit: str
+    params: dict = {}
+    description: str = ""
+
+@router.get("/strategies")
+def get_strategies():
+    """List built-in and custom strategies"""
+    return {"success": True, "data": list_strategies()}
+
+@router.post("/strategies")
+def create_strategy(request: StrategyRequest):
+    """Register a custom rule-based strategy"""
+    try:
+        strategy = register_strategy(
+            request.name, request.entry, request.exit, request.params, request.description
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "data": strategy}
@@ -102,7 +102,7 @@ def get_fallback_response(message: str) -> str:
     return "I can help you learn about Bitcoin, Ethereum, blockchain, DeFi, NFTs, and trading. Try asking about one of these topics!"
 
 @router.post("/chat")
-def chat(request: ChatRequest):
+async def chat(request: ChatRequest):
     """AI chatbot endpoint with Google Gemini"""
     
     if not request.message or not request.message.strip():
@@ -115,7 +115,7 @@ def chat(request: ChatRequest):
             full_prompt = f"{SYSTEM_PROMPT}\n\nUser Question: {request.message}\n\nProvide a helpful, educational response:"
             
             # Generate response using the correct method
-            response = model.generate_content(full_prompt)
+            response = await model.generate_content_async(full_prompt)
             
             # Extract the text from the response
             ai_response = response.text
@@ -1,31 +1,37 @@
 from fastapi import APIRouter
 import sys
 sys.path.append('..')
-from services.market_service import get_fear_greed_index, get_top_coins, get_gainers_losers
-from services.whale_service import get_whale_transactions
+from services.market_service import get_fear_greed_index_async, get_top_coins_async, get_gainers_losers_async
+from services.whale_service import get_whale_transactions_async
+from services.crypto_data_service import search_coins
 
 router = APIRouter()
 
 @router.get("/fear-greed")
-def get_fear_greed():
+async def get_fear_greed():
     """Get Fear & Greed Index"""
-    data = get_fear_greed_index()
+    data = await get_fear_greed_index_async()
     return {"success": True, "data": data}
 
 @router.get("/top-coins")
-def get_top(limit: int = 10):
+async def get_top(limit: int = 10):
     """Get top coins by volume"""
-    coins = get_top_coins(limit)
+    coins = await get_top_coins_async(limit)
     return {"success": True, "data": coins}
 
 @router.get("/gainers-losers")
-def get_movers(limit: int = 5):
+async def get_movers(limit: int = 5):
     """Get top gainers and losers"""
-    data = get_gainers_losers(limit)
+    data = await get_gainers_losers_async(limit)
     return {"success": True, "data": data}
 
 @router.get("/whale-alerts")
-def get_whales(limit: int = 5):
+async def get_whales(limit: int = 5):
     """Get whale transaction alerts"""
-    transactions = get_whale_transactions(limit)
+    transactions = await get_whale_transactions_async(limit)
     return {"success": True, "data": transactions}
+
+@router.get("/coins/search")
+def search_coin_list(q: str, limit: int = 10):
+    """Autocomplete coins by id, symbol or name prefix"""
+    return {"success": True, "data": search_coins(q, limit)}
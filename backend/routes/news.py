@@ -1,12 +1,12 @@
 from fastapi import APIRouter
 import sys
 sys.path.append('..')
-from services.news_service import get_crypto_news
+from services.news_service import get_crypto_news_async
 
 router = APIRouter()
 
 @router.get("/")
-def get_news():
+async def get_news():
     """Get crypto news with sentiment"""
-    news = get_crypto_news()
+    news = await get_crypto_news_async()
     return {"success": True, "data": news}
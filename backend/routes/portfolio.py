@@ -1,4 +1,6 @@
 from fastapi import APIRouter
+from starlette.concurrency import run_in_threadpool
+import asyncio
 import sys
 sys.path.append('..')
 from services.trade_service import get_wallet
@@ -6,20 +8,30 @@ from services.portfolio_service import (
     calculate_sharpe_ratio, calculate_max_drawdown, 
     calculate_win_rate, get_rebalancing_suggestions
 )
-from services.binance_service import get_binance_prices
+from services.binance_service import get_binance_prices_async
 
 router = APIRouter()
 
+def _calculate_metrics(history):
+    return {
+        "sharpe_ratio": calculate_sharpe_ratio() if history else 0,
+        "max_drawdown": calculate_max_drawdown() if history else 0,
+        "win_rate": calculate_win_rate() if history else 0
+    }
+
 @router.get("/")
-def get_portfolio():
+async def get_portfolio():
     """Get complete portfolio data"""
-    wallet = get_wallet()
+    wallet = await run_in_threadpool(get_wallet)
     holdings = wallet.get("holdings", {})
     history = wallet.get("history", [])
     
-    # Get current prices
+    # Get current prices while the file-based metrics are computed
     coins = [c for c in holdings.keys() if holdings[c] > 0]
-    prices = get_binance_prices(coins) if coins else {}
+    prices, metrics = await asyncio.gather(
+        get_binance_prices_async(coins) if coins else asyncio.sleep(0, result={}),
+        run_in_threadpool(_calculate_metrics, history)
+    )
     
     # Calculate portfolio value
     portfolio_data = {}
@@ -32,13 +44,6 @@ def get_portfolio():
                 "current_value": amount * current_price
             }
     
-    # Calculate metrics
-    metrics = {
-        "sharpe_ratio": calculate_sharpe_ratio() if history else 0,
-        "max_drawdown": calculate_max_drawdown() if history else 0,
-        "win_rate": calculate_win_rate() if history else 0
-    }
-    
     # Get suggestions
     suggestions = get_rebalancing_suggestions(
         {k: {"current_value": v["current_value"]} for k, v in portfolio_data.items()}
@@ -1,19 +1,48 @@
-from fastapi import APIRouter
+import time
+from fastapi import APIRouter, HTTPException
+from starlette.concurrency import run_in_threadpool
 import sys
 sys.path.append('..')
-from services.binance_service import get_binance_prices, get_binance_klines
+from services.binance_service import (
+    get_binance_prices_async, get_binance_klines, get_binance_klines_range, INTERVAL_MS, MAX_RANGE_KLINES
+)
+from services.indicator_feed import get_live_indicators
 
 router = APIRouter()
 
 @router.get("/current")
-def get_current_prices(coins: str = "bitcoin,ethereum,solana,pepe"):
+async def get_current_prices(coins: str = "bitcoin,ethereum,solana,pepe"):
     """Get current prices for specified coins"""
     coin_list = coins.split(",")
-    prices = get_binance_prices(coin_list)
+    prices = await get_binance_prices_async(coin_list)
     return {"success": True, "data": prices}
 
 @router.get("/historical/{coin}")
-def get_historical_prices(coin: str, interval: str = "1h", limit: int = 100):
-    """Get historical candlestick data"""
-    klines = get_binance_klines(coin, interval, limit)
+async def get_historical_prices(coin: str, interval: str = "1h", limit: int = 100,
+                                start: int = None, end: int = None):
+    """
+    Get historical candlestick data: the last `limit` candles, or every candle
+    with open time in [start, end) when start (ms) is given (end defaults to now)
+    """
+    # Served from the on-disk candle store, so keep it off the event loop
+    if start is None:
+        if not 0 < limit <= MAX_RANGE_KLINES:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_RANGE_KLINES}")
+        klines = await run_in_threadpool(get_binance_klines, coin, interval, limit)
+        return {"success": True, "data": klines}
+
+    end = end if end is not None else int(time.time() * 1000)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if interval in INTERVAL_MS and (end - start) // INTERVAL_MS[interval] > MAX_RANGE_KLINES:
+        raise HTTPException(status_code=400, detail=f"Range spans more than {MAX_RANGE_KLINES} candles")
+    klines = await run_in_threadpool(get_binance_klines_range, coin, interval, start, end)
     return {"success": True, "data": klines}
+
+@router.get("/indicators/{coin}")
+def get_indicators(coin: str):
+    """Live hourly SMA/RSI and strategy signals from the price stream"""
+    indicators = get_live_indicators(coin)
+    if indicators is None:
+        raise HTTPException(status_code=404, detail=f"No live indicators for {coin}")
+    return {"success": True, "data": indicators}
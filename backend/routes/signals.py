@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from services.signal_service import get_batch_signals
+
+router = APIRouter()
+
+@router.get("/")
+def get_signals(coins: str = "", window: int = 24, days: int = 30):
+    """Model signals for many coins at once (watched coins by default, 'all' for every mapped coin)"""
+    coin_list = None if not coins else coins if coins == "all" else coins.split(",")
+    result = get_batch_signals(coin_list, window=window, days=days)
+    
+    return {
+        "success": result.get('success', False),
+        "data": result
+    }
@@ -1,17 +1,23 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 import sys
 sys.path.append('..')
-from services.whale_service import get_whale_transactions, format_whale_message
+from services.whale_service import get_whale_transactions_async, format_whale_message, scan_whale_history, MAX_HISTORY_HOURS
 
 router = APIRouter()
 
 @router.get("/transactions")
-def get_transactions(limit: int = 10):
+async def get_transactions(limit: int = 10):
     """Get recent large crypto transactions"""
-    transactions = get_whale_transactions(limit)
+    transactions = await get_whale_transactions_async(limit)
     
     # Add formatted message to each transaction
     for tx in transactions:
         tx['message'] = format_whale_message(tx)
         
     return {"success": True, "data": transactions}
+
+@router.get("/history")
+def get_history(hours: int = Query(24, ge=1, le=MAX_HISTORY_HOURS), threshold: float = None):
+    """Whale trades and hourly whale buy/sell volume over a lookback window"""
+    history = scan_whale_history(hours=hours, threshold=threshold)
+    return {"success": True, "data": history}
@@ -15,6 +15,12 @@ export default function BacktestPage() {
     const [smaParams, setSmaParams] = useState({ short_period: 10, long_period: 30 });
     const [rsiParams, setRsiParams] = useState({ rsi_period: 14, oversold: 30, overbought: 70 });
 
+    // The API returns the chart as parallel columns; recharts wants one object per point
+    const chartData = results?.chart
+        ? results.chart.timestamp.map((_: number, i: number) =>
+            Object.fromEntries(Object.keys(results.chart).map((key) => [key, results.chart[key][i]])))
+        : [];
+
     const handleRunBacktest = async () => {
         setLoading(true);
         try {
@@ -211,7 +217,7 @@ export default function BacktestPage() {
                             <div className="bg-slate-900 p-6 rounded-xl border border-slate-800 h-[400px]">
                                 <h3 className="text-lg font-bold mb-4 text-white">Performance Chart</h3>
                                 <ResponsiveContainer width="100%" height="100%">
-                                    <LineChart data={results.chart_data}>
+                                    <LineChart data={chartData}>
                                         <CartesianGrid strokeDasharray="3 3" stroke="#334155" />
                                         <XAxis
                                             dataKey="timestamp"
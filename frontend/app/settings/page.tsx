@@ -44,9 +44,9 @@ export default function SettingsPage() {
         }
     };
 
-    const handleDeleteAlert = async (index: number) => {
+    const handleDeleteAlert = async (id: number) => {
         try {
-            await alertsAPI.delete(index);
+            await alertsAPI.delete(id);
             fetchAlerts();
         } catch (error) {
             console.error('Error deleting alert:', error);
@@ -131,9 +131,9 @@ export default function SettingsPage() {
                         <p className="text-slate-400 text-center py-8">No active alerts. Create one to get started!</p>
                     ) : (
                         <div className="space-y-3">
-                            {alerts.map((alert: any, idx: number) => (
+                            {alerts.map((alert: any) => (
                                 <div
-                                    key={idx}
+                                    key={alert.id}
                                     className="bg-slate-800/50 p-4 rounded-lg border border-slate-700 flex items-center justify-between hover:border-emerald-500/30 transition-colors"
                                 >
                                     <div>
@@ -143,7 +143,7 @@ export default function SettingsPage() {
                                         </p>
                                     </div>
                                     <button
-                                        onClick={() => handleDeleteAlert(idx)}
+                                        onClick={() => handleDeleteAlert(alert.id)}
                                         className="p-2 hover:bg-red-500/20 rounded-lg transition-colors"
                                     >
                                         <Trash2 className="w-5 h-5 text-red-400" />
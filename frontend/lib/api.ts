@@ -31,7 +31,7 @@ export const newsAPI = {
 export const alertsAPI = {
     get: () => api.get('/alerts'),
     add: (data: any) => api.post('/alerts/add', data),
-    delete: (index: number) => api.delete(`/alerts/${index}`),
+    delete: (id: number) => api.delete(`/alerts/${id}`),
 };
 
 export const chatAPI = {
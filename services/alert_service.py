@@ -1,33 +1,276 @@
-import json
-import os
+import time
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from sqlalchemy import select, insert, update, delete, bindparam
+from services.database import get_engine, alerts_table
 
-ALERTS_FILE = os.path.join("data", "alerts.json")
+SAVE_DELAY = 0.5           # seconds; trigger updates landing within this window are batched
+RECENT_TRIGGERS_SIZE = 100
+# Bisection uses a slightly widened price so float rounding in the trigger
+# price never hides an alert; candidates are then checked with the exact rule
+_SEARCH_TOLERANCE = 1e-9
 
 def load_alerts():
-    """Load alerts from file."""
-    if not os.path.exists(ALERTS_FILE):
-        return []
-    try:
-        with open(ALERTS_FILE, "r") as f:
-            return json.load(f)
-    except:
-        return []
-
-def save_alerts(alerts):
-    """Save alerts to file."""
-    os.makedirs(os.path.dirname(ALERTS_FILE), exist_ok=True)
-    with open(ALERTS_FILE, "w") as f:
-        json.dump(alerts, f, indent=4)
+    """Load all alerts from the database, oldest first."""
+    with get_engine().connect() as conn:
+        rows = conn.execute(select(alerts_table).order_by(alerts_table.c.id))
+        return [dict(row._mapping) for row in rows]
+
+def _trigger_price(alert):
+    """
+    Price at which an alert fires, or None if it cannot be indexed yet.
+    Percentage alerts are converted to a price using their base price.
+    """
+    target = alert["target_price"]
+    if alert.get("alert_type", "price") == "price":
+        return target
+    base_price = alert.get("base_price")
+    if not base_price or base_price <= 0:
+        return None
+    if alert["condition"] == "above":
+        return base_price * (1 + target / 100)
+    return base_price * (1 - target / 100)
+
+def _evaluate(alert, current_price):
+    """Exact trigger rule; returns the message or None."""
+    coin = alert["coin"]
+    target = alert["target_price"]
+    condition = alert["condition"]
+
+    if alert.get("alert_type", "price") == "price":
+        if condition == "above" and current_price >= target:
+            return f"{coin.upper()} is now ${current_price:.2f} (Target: ${target:.2f})"
+        elif condition == "below" and current_price <= target:
+            return f"{coin.upper()} is now ${current_price:.2f} (Target: ${target:.2f})"
+        return None
+
+    base_price = alert["base_price"]
+    percent_change = ((current_price - base_price) / base_price) * 100
+
+    if condition == "above" and percent_change >= target:
+        return f"{coin.upper()} up {percent_change:.2f}% (Target: +{target}%)"
+    elif condition == "below" and percent_change <= -target:
+        return f"{coin.upper()} down {abs(percent_change):.2f}% (Target: -{target}%)"
+    return None
+
+class AlertBook:
+    """
+    In-memory alert book backed by the alerts table.
+    Active alerts are indexed per (coin, condition) in lists sorted by
+    trigger price, so a price update finds every crossed alert by
+    bisection in O(log n + k). Adds and removals are written straight to
+    the database; trigger updates are batched by a background thread.
+    """
+    def __init__(self):
+        self._alerts = {}          # id -> alert, in creation order
+        self._index = {}           # (coin, condition) -> sorted [(trigger_price, id)]
+        self._indexed = set()      # ids currently in an index list
+        self._pending_base = {}    # coin -> [alert] percentage alerts waiting for a base price
+        self._rsi_alerts = {}      # coin -> [alert] active RSI alerts, checked once per closed bar
+        self._loaded = False
+        self._lock = threading.RLock()
+        self._triggered_ids = set()
+        self._base_updates = {}    # id -> base price set since the last write
+        self._dirty = threading.Event()
+        self._writer = None
+        self.recent_triggers = deque(maxlen=RECENT_TRIGGERS_SIZE)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                for alert in load_alerts():
+                    self._append(alert)
+                self._loaded = True
+
+    def _append(self, alert):
+        self._alerts[alert["id"]] = alert
+        if not alert.get("triggered"):
+            self._index_alert(alert)
+
+    def _index_alert(self, alert):
+        if alert.get("alert_type") == "rsi":
+            self._rsi_alerts.setdefault(alert["coin"], []).append(alert)
+            return
+        trigger_price = _trigger_price(alert)
+        if trigger_price is None:
+            if alert.get("alert_type") == "percentage" and alert.get("base_price") is None:
+                self._pending_base.setdefault(alert["coin"], []).append(alert)
+            return
+        insort(self._index.setdefault((alert["coin"], alert["condition"]), []), (trigger_price, alert["id"]))
+        self._indexed.add(alert["id"])
+
+    def _unindex_alert(self, alert):
+        if alert["id"] in self._indexed:
+            self._indexed.discard(alert["id"])
+            entries = self._index[(alert["coin"], alert["condition"])]
+            entry = (_trigger_price(alert), alert["id"])
+            del entries[bisect_left(entries, entry)]
+        for waiting in (self._pending_base, self._rsi_alerts):
+            alerts = waiting.get(alert["coin"], [])
+            if alert in alerts:
+                alerts.remove(alert)
+
+    def _schedule_save(self):
+        self._dirty.set()
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="alert-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            self._dirty.wait()
+            time.sleep(SAVE_DELAY)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error saving alerts: {e}")
+
+    def flush(self):
+        """Write pending trigger and base price updates now."""
+        with self._lock:
+            self._dirty.clear()
+            triggered = [{"alert_id": i} for i in self._triggered_ids]
+            bases = [{"alert_id": i, "base": b} for i, b in self._base_updates.items()]
+            self._triggered_ids = set()
+            self._base_updates = {}
+        if not triggered and not bases:
+            return
+        with get_engine().begin() as conn:
+            if bases:
+                conn.execute(
+                    update(alerts_table).where(alerts_table.c.id == bindparam("alert_id"))
+                    .values(base_price=bindparam("base")), bases)
+            if triggered:
+                conn.execute(
+                    update(alerts_table).where(alerts_table.c.id == bindparam("alert_id"))
+                    .values(triggered=True), triggered)
+
+    def all(self):
+        self._ensure_loaded()
+        with self._lock:
+            return [dict(alert) for alert in self._alerts.values()]
+
+    def add(self, alert):
+        """Insert an alert and return its id."""
+        self._ensure_loaded()
+        with get_engine().begin() as conn:
+            alert["id"] = conn.execute(insert(alerts_table), alert).inserted_primary_key[0]
+        with self._lock:
+            self._append(alert)
+        return alert["id"]
+
+    def remove(self, alert_id):
+        """Delete an alert by id. Returns False if it does not exist."""
+        self._ensure_loaded()
+        with self._lock:
+            alert = self._alerts.pop(alert_id, None)
+            if alert is None:
+                return False
+            self._unindex_alert(alert)
+            self._triggered_ids.discard(alert_id)
+            self._base_updates.pop(alert_id, None)
+        with get_engine().begin() as conn:
+            conn.execute(delete(alerts_table).where(alerts_table.c.id == alert_id))
+        return True
+
+    def evaluate(self, current_prices):
+        """
+        Trigger every active alert crossed by the given prices ({coin: price}).
+        Returns the messages in alert creation order.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            fired = []
+            for coin, current_price in current_prices.items():
+                fired += self._evaluate_coin(coin, current_price)
+            if not fired:
+                return []
+            # Report in creation order, like the old linear scan
+            fired.sort()
+            messages = [message for _, message in fired]
+            self.recent_triggers.extend(messages)
+        self._schedule_save()
+        return messages
+
+    def _evaluate_coin(self, coin, current_price):
+        # Percentage alerts without a base price start from the first price seen
+        pending = self._pending_base.pop(coin, [])
+        for alert in pending:
+            alert["base_price"] = current_price
+            self._base_updates[alert["id"]] = current_price
+            self._index_alert(alert)
+        if pending:
+            self._schedule_save()
+
+        fired = []
+        above = self._index.get((coin, "above"))
+        if above:
+            hi = bisect_right(above, (current_price * (1 + _SEARCH_TOLERANCE), float("inf")))
+            fired += self._fire(above, 0, hi, current_price)
+        below = self._index.get((coin, "below"))
+        if below:
+            lo = bisect_left(below, (current_price * (1 - _SEARCH_TOLERANCE), -1))
+            fired += self._fire(below, lo, len(below), current_price)
+        return fired
+
+    def evaluate_indicators(self, coin, indicators):
+        """Trigger the coin's RSI alerts against a closed bar's indicators."""
+        self._ensure_loaded()
+        rsi = indicators.get("rsi")
+        if rsi is None:
+            return []
+        with self._lock:
+            messages, kept = [], []
+            for alert in self._rsi_alerts.get(coin, []):
+                target, condition = alert["target_price"], alert["condition"]
+                if (condition == "above" and rsi >= target) or (condition == "below" and rsi <= target):
+                    alert["triggered"] = True
+                    self._triggered_ids.add(alert["id"])
+                    messages.append(f"{coin.upper()} RSI is now {rsi:.1f} (Target: {condition} {target})")
+                else:
+                    kept.append(alert)
+            if not messages:
+                return []
+            self._rsi_alerts[coin] = kept
+            self.recent_triggers.extend(messages)
+        self._schedule_save()
+        return messages
+
+    def _fire(self, entries, lo, hi, current_price):
+        fired, kept = [], []
+        for entry in entries[lo:hi]:
+            alert = self._alerts[entry[1]]
+            message = _evaluate(alert, current_price)
+            if message is None:
+                kept.append(entry)
+                continue
+            alert["triggered"] = True
+            self._indexed.discard(alert["id"])
+            self._triggered_ids.add(alert["id"])
+            fired.append((alert["id"], message))
+        if fired:
+            entries[lo:hi] = kept
+        return fired
+
+_book = AlertBook()
+
+def list_alerts():
+    """Return all alerts (active and triggered)."""
+    return _book.all()
 
 def add_alert(coin, target_price, condition, alert_type="price", base_price=None):
     """
     Add a new alert.
-    alert_type: 'price', 'percentage'
+    alert_type: 'price', 'percentage', 'rsi' (target_price is the hourly RSI level)
     condition: 'above' or 'below'
     base_price: For percentage alerts, the reference price
+    Returns the new alert's id.
     """
-    alerts = load_alerts()
-    alerts.append({
+    return _book.add({
         "coin": coin,
         "target_price": target_price,
         "condition": condition,
@@ -35,64 +278,39 @@ def add_alert(coin, target_price, condition, alert_type="price", base_price=None
         "base_price": base_price,
         "triggered": False
     })
-    save_alerts(alerts)
 
-def remove_alert(index):
-    """Remove alert by index."""
-    alerts = load_alerts()
-    if 0 <= index < len(alerts):
-        alerts.pop(index)
-        save_alerts(alerts)
+def remove_alert(alert_id):
+    """Remove alert by id. Returns False if no such alert exists."""
+    return _book.remove(alert_id)
 
 def check_alerts(current_prices):
     """
     Check if any alerts should be triggered.
     Returns list of triggered alert messages.
     """
-    alerts = load_alerts()
-    triggered = []
-    
-    for i, alert in enumerate(alerts):
-        if alert.get("triggered"):
-            continue
-            
-        coin = alert["coin"]
-        target = alert["target_price"]
-        condition = alert["condition"]
-        alert_type = alert.get("alert_type", "price")
-        
-        if coin not in current_prices:
-            continue
-            
-        current_price = current_prices[coin]["usd"]
-        
-        should_trigger = False
-        message = ""
-        
-        if alert_type == "price":
-            if condition == "above" and current_price >= target:
-                should_trigger = True
-                message = f"{coin.upper()} is now ${current_price:.2f} (Target: ${target:.2f})"
-            elif condition == "below" and current_price <= target:
-                should_trigger = True
-                message = f"{coin.upper()} is now ${current_price:.2f} (Target: ${target:.2f})"
-        
-        elif alert_type == "percentage":
-            base_price = alert.get("base_price", current_price)
-            percent_change = ((current_price - base_price) / base_price) * 100
-            
-            if condition == "above" and percent_change >= target:
-                should_trigger = True
-                message = f"{coin.upper()} up {percent_change:.2f}% (Target: +{target}%)"
-            elif condition == "below" and percent_change <= -target:
-                should_trigger = True
-                message = f"{coin.upper()} down {abs(percent_change):.2f}% (Target: -{target}%)"
-        
-        if should_trigger:
-            triggered.append(message)
-            alert["triggered"] = True
-    
-    if triggered:
-        save_alerts(alerts)
-    
-    return triggered
+    return _book.evaluate({coin: price["usd"] for coin, price in current_prices.items()})
+
+def get_recent_triggers():
+    """Messages of alerts recently triggered by live price ticks, oldest first."""
+    return list(_book.recent_triggers)
+
+def flush_alerts():
+    """Persist pending alert changes immediately."""
+    _book.flush()
+
+def start_alert_monitor():
+    """
+    Evaluate alerts on every live price tick from the Binance price stream,
+    and RSI alerts whenever the live indicator feed closes a bar.
+    """
+    from services.binance_service import COIN_MAPPING, add_price_listener
+    from services.indicator_feed import add_indicator_listener
+    coin_for_symbol = {symbol: coin for coin, symbol in COIN_MAPPING.items()}
+
+    def on_price(symbol, price):
+        coin = coin_for_symbol.get(symbol)
+        if coin is not None:
+            _book.evaluate({coin: price})
+
+    add_price_listener(on_price)
+    add_indicator_listener(_book.evaluate_indicators)
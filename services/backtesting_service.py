@@ -2,24 +2,122 @@
 Strategy Backtesting Service
 Tests trading strategies on historical data
 """
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from services.binance_service import get_binance_klines
+from services.binance_service import get_binance_candles, resolve_symbol
+from services.candle_store import klines_to_array, add_candle_listener, OPEN_TIME, CLOSE, VOLUME
+from services.result_cache import ResultCache, cache_key
+from services.chart_data import lttb_indices, columns_to_json
+from services import indicators
+from services.strategy_registry import get_strategy, SERIES
+
+DEFAULT_CHART_POINTS = 500
+
+# Finished backtests, dropped whenever new candles for their symbol are stored
+_backtest_cache = ResultCache("backtests")
+add_candle_listener(_backtest_cache.invalidate)
 
 def calculate_sma(prices, period):
-    """Calculate Simple Moving Average"""
-    return pd.Series(prices).rolling(window=period).mean().tolist()
+    """Calculate Simple Moving Average (column-wise for a 2-D matrix)"""
+    return indicators.sma(prices, period)
 
 def calculate_rsi(prices, period=14):
-    """Calculate Relative Strength Index"""
-    prices_series = pd.Series(prices)
-    delta = prices_series.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi.tolist()
+    """Calculate Relative Strength Index (column-wise for a 2-D matrix)"""
+    return indicators.rsi(prices, period)
+
+def _as_candles(data):
+    """Accept kline rows or a candle array; return the (n, 11) float64 array."""
+    if isinstance(data, np.ndarray):
+        return data
+    return klines_to_array(data)
+
+def simulate_positions(buy, sell):
+    """
+    Replay the flat/long position rules over boolean signal arrays:
+    buy only when flat, sell only when holding.
+    Returns (entries, exits) as index arrays of the accepted trades.
+    """
+    events = np.flatnonzero(buy | sell)
+    
+    if np.any(buy[events] & sell[events]):
+        # A bar that is both a buy and a sell signal flips the position
+        # either way, so replay the (few) signal bars one by one
+        entries, exits = [], []
+        holding = False
+        for i in events:
+            if not holding and buy[i]:
+                entries.append(i)
+                holding = True
+            elif holding and sell[i]:
+                exits.append(i)
+                holding = False
+        return np.array(entries, dtype=np.int64), np.array(exits, dtype=np.int64)
+    
+    # Otherwise the position simply follows the last signal: a trade happens
+    # wherever a signal differs from the one before it (starting flat)
+    is_buy = buy[events]
+    changed = is_buy != np.concatenate(([False], is_buy[:-1]))
+    return events[changed & is_buy], events[changed & ~is_buy]
+
+def _build_trades(timestamps, closes, entries, exits, buy_info, sell_info):
+    """
+    Turn entry/exit indices into the trade records used across the service.
+    buy_info(i) / sell_info(i) return the extra fields for a BUY / SELL at bar i.
+    """
+    trades = []
+    for n, i in enumerate(entries):
+        price = float(closes[i])
+        trades.append({'action': 'BUY', 'price': price, 'timestamp': int(timestamps[i]), **buy_info(i)})
+        if n < len(exits):
+            j = exits[n]
+            sell_price = float(closes[j])
+            profit = sell_price - price
+            profit_pct = (profit / price) * 100
+            trades.append({
+                'action': 'SELL',
+                'price': sell_price,
+                'timestamp': int(timestamps[j]),
+                'profit': profit,
+                'profit_pct': profit_pct,
+                **sell_info(j)
+            })
+    return trades
+
+def sma_crossover_signals(closes, short_period=10, long_period=30):
+    """
+    Vectorized SMA crossover signals over a float64 close array
+    (or a (bars, assets) matrix, column-wise).
+    Returns (buy, sell, short_sma, long_sma).
+    """
+    short_sma = calculate_sma(closes, short_period)
+    long_sma = calculate_sma(closes, long_period)
+    
+    # Buy when short MA crosses above long MA, sell when it crosses below
+    above, below = short_sma > long_sma, short_sma < long_sma
+    buy = np.zeros(np.shape(closes), dtype=bool)
+    sell = np.zeros(np.shape(closes), dtype=bool)
+    buy[1:] = above[1:] & (short_sma[:-1] <= long_sma[:-1])
+    sell[1:] = below[1:] & (short_sma[:-1] >= long_sma[:-1])
+    
+    # The first long_period bars are warm-up
+    buy[:long_period] = False
+    sell[:long_period] = False
+    return buy, sell, short_sma, long_sma
+
+def rsi_signals(closes, rsi_period=14, oversold=30, overbought=70):
+    """
+    Vectorized RSI signals over a float64 close array
+    (or a (bars, assets) matrix, column-wise).
+    Returns (buy, sell, rsi).
+    """
+    rsi = calculate_rsi(closes, rsi_period)
+    buy = rsi < oversold
+    sell = rsi > overbought
+    
+    # The first rsi_period + 1 bars are warm-up
+    buy[:rsi_period + 1] = False
+    sell[:rsi_period + 1] = False
+    return buy, sell, rsi
 
 def sma_crossover_strategy(data, short_period=10, long_period=30):
     """
@@ -27,47 +125,17 @@ def sma_crossover_strategy(data, short_period=10, long_period=30):
     Buy when short MA crosses above long MA
     Sell when short MA crosses below long MA
     """
-    closes = [float(k[4]) for k in data]  # Close prices
-    short_sma = calculate_sma(closes, short_period)
-    long_sma = calculate_sma(closes, long_period)
+    candles = _as_candles(data)
+    timestamps, closes = candles[:, OPEN_TIME], candles[:, CLOSE]
     
-    trades = []
-    position = None
-    
-    for i in range(long_period, len(data)):
-        timestamp = data[i][0]
-        price = closes[i]
-        
-        # Buy signal: short MA crosses above long MA
-        if short_sma[i] > long_sma[i] and short_sma[i-1] <= long_sma[i-1]:
-            if position is None:
-                position = {
-                    'type': 'buy',
-                    'price': price,
-                    'timestamp': timestamp
-                }
-                trades.append({
-                    'action': 'BUY',
-                    'price': price,
-                    'timestamp': timestamp,
-                    'reason': f'SMA({short_period}) crossed above SMA({long_period})'
-                })
-        
-        # Sell signal: short MA crosses below long MA
-        elif short_sma[i] < long_sma[i] and short_sma[i-1] >= long_sma[i-1]:
-            if position is not None:
-                profit = price - position['price']
-                profit_pct = (profit / position['price']) * 100
-                trades.append({
-                    'action': 'SELL',
-                    'price': price,
-                    'timestamp': timestamp,
-                    'profit': profit,
-                    'profit_pct': profit_pct,
-                    'reason': f'SMA({short_period}) crossed below SMA({long_period})'
-                })
-                position = None
+    buy, sell, short_sma, long_sma = sma_crossover_signals(closes, short_period, long_period)
+    entries, exits = simulate_positions(buy, sell)
     
+    trades = _build_trades(
+        timestamps, closes, entries, exits,
+        lambda i: {'reason': f'SMA({short_period}) crossed above SMA({long_period})'},
+        lambda i: {'reason': f'SMA({short_period}) crossed below SMA({long_period})'}
+    )
     return trades, short_sma, long_sma
 
 def rsi_strategy(data, rsi_period=14, oversold=30, overbought=70):
@@ -76,47 +144,17 @@ def rsi_strategy(data, rsi_period=14, oversold=30, overbought=70):
     Buy when RSI < oversold (default 30)
     Sell when RSI > overbought (default 70)
     """
-    closes = [float(k[4]) for k in data]
-    rsi = calculate_rsi(closes, rsi_period)
+    candles = _as_candles(data)
+    timestamps, closes = candles[:, OPEN_TIME], candles[:, CLOSE]
     
-    trades = []
-    position = None
-    
-    for i in range(rsi_period + 1, len(data)):
-        timestamp = data[i][0]
-        price = closes[i]
-        rsi_value = rsi[i]
-        
-        # Buy signal: RSI crosses below oversold
-        if rsi_value < oversold and position is None:
-            position = {
-                'type': 'buy',
-                'price': price,
-                'timestamp': timestamp
-            }
-            trades.append({
-                'action': 'BUY',
-                'price': price,
-                'timestamp': timestamp,
-                'rsi': rsi_value,
-                'reason': f'RSI({rsi_value:.1f}) below {oversold} (oversold)'
-            })
-        
-        # Sell signal: RSI crosses above overbought
-        elif rsi_value > overbought and position is not None:
-            profit = price - position['price']
-            profit_pct = (profit / position['price']) * 100
-            trades.append({
-                'action': 'SELL',
-                'price': price,
-                'timestamp': timestamp,
-                'rsi': rsi_value,
-                'profit': profit,
-                'profit_pct': profit_pct,
-                'reason': f'RSI({rsi_value:.1f}) above {overbought} (overbought)'
-            })
-            position = None
+    buy, sell, rsi = rsi_signals(closes, rsi_period, oversold, overbought)
+    entries, exits = simulate_positions(buy, sell)
     
+    trades = _build_trades(
+        timestamps, closes, entries, exits,
+        lambda i: {'rsi': float(rsi[i]), 'reason': f'RSI({rsi[i]:.1f}) below {oversold} (oversold)'},
+        lambda i: {'rsi': float(rsi[i]), 'reason': f'RSI({rsi[i]:.1f}) above {overbought} (overbought)'}
+    )
     return trades, rsi
 
 def calculate_metrics(trades, initial_capital=10000):
@@ -131,7 +169,8 @@ def calculate_metrics(trades, initial_capital=10000):
             'total_profit_pct': 0,
             'avg_profit': 0,
             'max_profit': 0,
-            'max_loss': 0
+            'max_loss': 0,
+            'final_capital': initial_capital
         }
     
     sell_trades = [t for t in trades if t['action'] == 'SELL']
@@ -156,84 +195,105 @@ def calculate_metrics(trades, initial_capital=10000):
         'final_capital': initial_capital + total_profit
     }
 
-def run_backtest(coin, strategy, params, days=30):
+def strategy_signals(closes, strategy, params):
+    """
+    Entry/exit signal arrays of a registered strategy over closes (a vector or
+    a (bars, assets) matrix), plus its warm-up length in bars.
+    Raises ValueError for an unknown strategy.
+    """
+    return get_strategy(strategy).signals({'close': closes}, params)
+
+def run_strategy(candles, strategy, params):
+    """
+    Run a registered strategy over a candle array.
+    Returns (trades, indicators); raises ValueError for an unknown strategy.
+    """
+    definition = get_strategy(strategy)
+    candles = _as_candles(candles)
+    timestamps, closes = candles[:, OPEN_TIME], candles[:, CLOSE]
+    series = {name: candles[:, column] for name, column in SERIES.items()}
+    
+    buy, sell, plots, fields, _ = definition.evaluate(series, params)
+    entries, exits = simulate_positions(buy, sell)
+    
+    params = definition.merged_params(params)
+    def info(template):
+        def at(i):
+            values = {name: float(v[i]) for name, v in fields.items()}
+            return {**values, 'reason': template.format(**params, **values)}
+        return at
+    
+    trades = _build_trades(
+        timestamps, closes, entries, exits,
+        info(definition.entry_reason), info(definition.exit_reason)
+    )
+    return trades, plots
+
+def run_backtest(coin, strategy, params, days=30, chart_points=DEFAULT_CHART_POINTS):
     """
     Run backtest on historical data
     
     Args:
         coin: Cryptocurrency symbol (bitcoin, ethereum, etc.)
-        strategy: Strategy name ('sma_crossover' or 'rsi')
+        strategy: Registered strategy name ('sma_crossover', 'rsi' or a custom one)
         params: Strategy parameters
         days: Number of days of historical data
+        chart_points: Chart size after LTTB downsampling (0 keeps every candle)
     """
-    # Map coin names to Binance symbols
-    symbol_map = {
-        'bitcoin': 'BTCUSDT',
-        'ethereum': 'ETHUSDT',
-        'solana': 'SOLUSDT',
-        'pepe': 'PEPEUSDT'
-    }
+    symbol = resolve_symbol(coin)
+    if not symbol:
+        return {'error': f'Unknown coin: {coin}'}
     
-    symbol = symbol_map.get(coin, 'BTCUSDT')
+    # Fetch historical data (closed candles only, served from the local candle store)
+    candles = get_binance_candles(symbol, interval='1h', limit=days * 24, closed_only=True)
     
-    # Fetch historical data
-    data = get_binance_klines(symbol, interval='1h', limit=days * 24)
-    
-    if not data:
+    if not len(candles):
         return {'error': 'Failed to fetch historical data'}
     
+    try:
+        definition = get_strategy(strategy)
+    except ValueError as e:
+        return {'error': str(e)}
+    
+    # Rules are part of the key so redefining a custom strategy never serves old results
+    key = cache_key(
+        symbol, '1h', int(candles[0, OPEN_TIME]), int(candles[-1, OPEN_TIME]), len(candles),
+        [strategy, definition.entry, definition.exit, chart_points], definition.merged_params(params)
+    )
+    cached = _backtest_cache.get(key)
+    if cached is not None:
+        return cached
+    
     # Run strategy
-    if strategy == 'sma_crossover':
-        short_period = params.get('short_period', 10)
-        long_period = params.get('long_period', 30)
-        trades, short_sma, long_sma = sma_crossover_strategy(data, short_period, long_period)
-        indicators = {'short_sma': short_sma, 'long_sma': long_sma}
-    elif strategy == 'rsi':
-        rsi_period = params.get('rsi_period', 14)
-        oversold = params.get('oversold', 30)
-        overbought = params.get('overbought', 70)
-        trades, rsi = rsi_strategy(data, rsi_period, oversold, overbought)
-        indicators = {'rsi': rsi}
-    else:
-        return {'error': 'Unknown strategy'}
+    try:
+        trades, indicators = run_strategy(candles, strategy, params)
+    except ValueError as e:
+        return {'error': str(e)}
     
     # Calculate metrics
     metrics = calculate_metrics(trades)
     
-    # Prepare chart data
-    chart_data = []
-    for i, k in enumerate(data):
-        point = {
-            'timestamp': k[0],
-            'price': float(k[4]),
-            'volume': float(k[5])
-        }
-        
-        # Helper to handle NaN and Infinity
-        def safe_float(val):
-            if pd.isna(val) or np.isnan(val) or np.isinf(val):
-                return None
-            return float(val)
-
-        if strategy == 'sma_crossover' and i < len(short_sma):
-            point['short_sma'] = safe_float(short_sma[i])
-            point['long_sma'] = safe_float(long_sma[i])
-        elif strategy == 'rsi' and i < len(rsi):
-            point['rsi'] = safe_float(rsi[i])
-            
-        chart_data.append(point)
-    
-    # Sanitize indicators for JSON response
-    sanitized_indicators = {}
-    for k, v in indicators.items():
-        sanitized_indicators[k] = [None if (pd.isna(x) or np.isnan(x) or np.isinf(x)) else float(x) for x in v]
+    # Chart columns over the whole run, downsampled on price with LTTB
+    timestamps = candles[:, OPEN_TIME]
+    keep = lttb_indices(timestamps, candles[:, CLOSE], chart_points)
+    chart = {
+        'timestamp': timestamps[keep].astype(np.int64),
+        'price': candles[keep, CLOSE],
+        'volume': candles[keep, VOLUME],
+        **{name: values[keep] for name, values in indicators.items()}
+    }
 
-    return {
+    result = {
         'success': True,
         'strategy': strategy,
-        'params': params,
+        'params': definition.merged_params(params),   # what the cache key and the run used
         'trades': trades,
         'metrics': metrics,
-        'chart_data': chart_data[-100:],  # Last 100 points for chart
-        'indicators': sanitized_indicators
+        'chart': columns_to_json(chart)
     }
+    _backtest_cache.put(key, result)
+    return result
+
+def get_backtest_cache_stats():
+    """Hit/miss counters and sizes of the backtest result cache."""
+    return _backtest_cache.stats()
@@ -1,4 +1,8 @@
+import json
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from services import http_client
 
 BASE_URL = "https://api.binance.com/api/v3"
 
@@ -13,11 +17,45 @@ COIN_MAPPING = {
     "polkadot": "DOTUSDT"
 }
 
-def get_binance_klines(coin_id, interval="1h", limit=100):
-    """
-    Fetch Kline (Candlestick) data from Binance.
-    Returns list of [time, open, high, low, close, volume]
-    """
+# Candle length per Binance interval (1M is calendar based and has no fixed length)
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 180_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "30m": 1_800_000,
+    "1h": 3_600_000,
+    "2h": 7_200_000,
+    "4h": 14_400_000,
+    "6h": 21_600_000,
+    "8h": 28_800_000,
+    "12h": 43_200_000,
+    "1d": 86_400_000,
+    "3d": 259_200_000,
+    "1w": 604_800_000
+}
+
+# Weekly candles open on Monday 00:00 UTC, four days after the epoch
+INTERVAL_OFFSET_MS = {"1w": 4 * 86_400_000}
+
+MAX_KLINES_PER_REQUEST = 1000
+MAX_RANGE_KLINES = 50000   # most candles the API serves per request (limit or range)
+KLINE_FETCH_WORKERS = 8
+
+# Streamed prices older than this (seconds) fall back to REST
+LIVE_PRICE_MAX_AGE = 10
+
+# symbol -> (last price, monotonic receive time), filled by the price stream
+_live_prices = {}
+_price_stream = None
+# Callbacks run on every streamed price: fn(symbol, price)
+_price_listeners = []
+
+# Keeps deep-history downloads well under Binance's request weight limit
+_kline_limiter = http_client.RateLimiter(rate=10, burst=10)
+
+def resolve_symbol(coin_id):
+    """Map a coin id to its Binance symbol, or return None."""
     # Try to get symbol from mapping, otherwise assume it's already a symbol
     symbol = COIN_MAPPING.get(coin_id)
     if not symbol:
@@ -26,8 +64,123 @@ def get_binance_klines(coin_id, interval="1h", limit=100):
             symbol = coin_id
         else:
             print(f"No Binance symbol for {coin_id}")
+            return None
+    return symbol
+
+def align_open_time(timestamp_ms, interval):
+    """Return the open time of the candle containing timestamp_ms."""
+    step = INTERVAL_MS[interval]
+    offset = INTERVAL_OFFSET_MS.get(interval, 0)
+    return (timestamp_ms - offset) // step * step + offset
+
+def _fetch_klines_pages(symbol, interval, start_ms, end_ms):
+    """Sequentially page through /klines for [start_ms, end_ms)."""
+    url = f"{BASE_URL}/klines"
+    rows = []
+    cursor = start_ms
+    
+    while cursor < end_ms:
+        params = {
+            "symbol": symbol,
+            "interval": interval,
+            "startTime": cursor,
+            "endTime": end_ms - 1,  # endTime is inclusive on Binance
+            "limit": MAX_KLINES_PER_REQUEST
+        }
+        _kline_limiter.acquire()
+        resp = http_client.get(url, params=params, timeout=10)
+        resp.raise_for_status()
+        page = resp.json()
+        rows.extend(page)
+        
+        if len(page) < MAX_KLINES_PER_REQUEST:
+            break
+        # Next candle opens one interval later (1 ms later for calendar intervals)
+        cursor = page[-1][0] + INTERVAL_MS.get(interval, 1)
+        
+    return rows
+
+def fetch_klines_range(symbol, interval, start_ms, end_ms):
+    """
+    Download raw klines with open time in [start_ms, end_ms).
+    The range is split into 1000-candle windows fetched concurrently under
+    the shared rate limit, then stitched and de-duplicated by open time.
+    Raises on request errors.
+    """
+    step = INTERVAL_MS.get(interval)
+    if step is None:
+        return _fetch_klines_pages(symbol, interval, start_ms, end_ms)
+    
+    span = step * MAX_KLINES_PER_REQUEST
+    windows = [(s, min(s + span, end_ms)) for s in range(start_ms, end_ms, span)]
+    if len(windows) <= 1:
+        return _fetch_klines_pages(symbol, interval, start_ms, end_ms)
+    
+    with ThreadPoolExecutor(max_workers=min(KLINE_FETCH_WORKERS, len(windows))) as pool:
+        pages = pool.map(lambda w: _fetch_klines_pages(symbol, interval, *w), windows)
+        by_open_time = {row[0]: row for page in pages for row in page}
+        
+    return [by_open_time[t] for t in sorted(by_open_time)]
+
+def get_binance_klines_range(coin_id, interval, start_ms, end_ms):
+    """
+    Fetch every candle with open time in [start_ms, end_ms), however many
+    that is. Served from the local candle store like get_binance_klines.
+    """
+    symbol = resolve_symbol(coin_id)
+    if not symbol:
+        return []
+    
+    if interval not in INTERVAL_MS:
+        try:
+            return _fetch_klines_pages(symbol, interval, start_ms, end_ms)
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching Binance klines for {symbol}: {e}")
             return []
+    
+    from services.candle_store import get_candles, candles_to_klines
+    return candles_to_klines(get_candles(symbol, interval, start_ms, end_ms))
+
+def get_binance_klines(coin_id, interval="1h", limit=100, closed_only=False):
+    """
+    Fetch Kline (Candlestick) data from Binance.
+    Returns list of [time, open, high, low, close, volume]
+    
+    Candles are served from the local candle store, so only candles not
+    seen before are downloaded. With closed_only the still-forming candle
+    is left out, which lets repeat calls run without any network access.
+    """
+    if interval not in INTERVAL_MS:
+        symbol = resolve_symbol(coin_id)
+        return _get_binance_klines_direct(symbol, interval, limit) if symbol else []
+    
+    from services.candle_store import candles_to_klines
+    return candles_to_klines(get_binance_candles(coin_id, interval, limit, closed_only))
+
+def get_binance_candles(coin_id, interval="1h", limit=100, closed_only=False):
+    """
+    Same candles as get_binance_klines, returned as the candle store's
+    (n, 11) float64 array instead of row lists. Fixed-length intervals only.
+    """
+    from services.candle_store import get_candles, empty_candles
+    
+    symbol = resolve_symbol(coin_id)
+    if not symbol:
+        return empty_candles()
+    
+    now = int(time.time() * 1000)
+    current_open = align_open_time(now, interval)
+    step = INTERVAL_MS[interval]
+    
+    if closed_only:
+        start_ms, end_ms = current_open - limit * step, current_open
+    else:
+        start_ms, end_ms = current_open - (limit - 1) * step, now
         
+    return get_candles(symbol, interval, start_ms, end_ms)[-limit:]
+
+def _get_binance_klines_direct(symbol, interval, limit):
+    """Single uncached /klines request, used for calendar intervals."""
     url = f"{BASE_URL}/klines"
     params = {
         "symbol": symbol,
@@ -36,7 +189,7 @@ def get_binance_klines(coin_id, interval="1h", limit=100):
     }
     
     try:
-        resp = requests.get(url, params=params, timeout=10)
+        resp = http_client.get(url, params=params, timeout=10)
         resp.raise_for_status()
         data = resp.json()
         
@@ -48,30 +201,133 @@ def get_binance_klines(coin_id, interval="1h", limit=100):
         print(f"Error fetching Binance klines for {symbol}: {e}")
         return []
 
-def get_binance_prices(coins=None):
+def _ticker_params(symbols):
+    # Binance expects a compact JSON array, e.g. ["BTCUSDT","ETHUSDT"]
+    return {"symbols": json.dumps(sorted(set(symbols)), separators=(",", ":"))}
+
+def get_binance_ticker_prices(symbols):
     """
-    Fetch current prices for specified coins from Binance.
-    Returns dict: {'bitcoin': {'usd': 95000}, ...}
+    Fetch last prices for many symbols in a single request.
+    Returns dict: {'BTCUSDT': 95000.0, ...}
+    """
+    if not symbols:
+        return {}
+        
+    url = f"{BASE_URL}/ticker/price"
+    try:
+        resp = http_client.get(url, params=_ticker_params(symbols), timeout=5)
+        resp.raise_for_status()
+        return {item["symbol"]: float(item["price"]) for item in resp.json()}
+    except Exception as e:
+        print(f"Error fetching Binance prices for {len(symbols)} symbols: {e}")
+        return {}
+
+async def get_binance_ticker_prices_async(symbols):
+    """Async version of get_binance_ticker_prices."""
+    if not symbols:
+        return {}
+        
+    url = f"{BASE_URL}/ticker/price"
+    try:
+        resp = await http_client.aget(url, params=_ticker_params(symbols), timeout=5)
+        resp.raise_for_status()
+        return {item["symbol"]: float(item["price"]) for item in resp.json()}
+    except Exception as e:
+        print(f"Error fetching Binance prices for {len(symbols)} symbols: {e}")
+        return {}
+
+def _on_mini_ticker(stream, data):
+    """Record the last price from a miniTicker event and notify listeners."""
+    symbol, price = data["s"], float(data["c"])
+    _live_prices[symbol] = (price, time.monotonic())
+    for listener in _price_listeners:
+        try:
+            listener(symbol, price)
+        except Exception as e:
+            print(f"Error in price listener for {symbol}: {e}")
+
+def add_price_listener(listener):
+    """Register fn(symbol, price) to be called on every streamed price update."""
+    _price_listeners.append(listener)
+
+def start_price_stream(coins=None):
+    """
+    Subscribe to miniTicker streams for the given coins (default: every
+    mapped coin) and keep the live price table up to date in the background.
+    """
+    global _price_stream
+    from services.stream_service import BinanceStream
+    
+    coins = coins or list(COIN_MAPPING)
+    streams = [f"{COIN_MAPPING[c].lower()}@miniTicker" for c in coins if c in COIN_MAPPING]
+    
+    if _price_stream is None:
+        _price_stream = BinanceStream(streams, _on_mini_ticker)
+    _price_stream.start()
+    return _price_stream
+
+def stop_price_stream():
+    """Stop the background price stream if it is running."""
+    global _price_stream
+    if _price_stream is not None:
+        _price_stream.stop()
+        _price_stream = None
+
+def get_live_price(symbol, max_age=LIVE_PRICE_MAX_AGE):
+    """Return the streamed price for symbol, or None if missing or older than max_age seconds."""
+    entry = _live_prices.get(symbol)
+    if entry is None or time.monotonic() - entry[1] > max_age:
+        return None
+    return entry[0]
+
+def _split_live_prices(coins):
+    """
+    Answer what we can from the live price table.
+    Returns (results, stale) where stale maps coin -> symbol still to fetch.
     """
     if coins is None:
         coins = ["bitcoin", "ethereum", "pepe", "solana", "ripple", "dogecoin", "cardano", "polkadot"]
         
     results = {}
+    stale = {}
     for coin in coins:
         symbol = COIN_MAPPING.get(coin)
         if not symbol:
             continue
-            
-        url = f"{BASE_URL}/ticker/price"
-        params = {"symbol": symbol}
-        
-        try:
-            resp = requests.get(url, params=params, timeout=5)
-            resp.raise_for_status()
-            data = resp.json()
-            price = float(data["price"])
+        price = get_live_price(symbol)
+        if price is None:
+            stale[coin] = symbol
+        else:
             results[coin] = {"usd": price}
-        except Exception as e:
-            print(f"Error fetching Binance price for {coin}: {e}")
+    return results, stale
+
+def get_binance_prices(coins=None):
+    """
+    Fetch current prices for specified coins from Binance.
+    Returns dict: {'bitcoin': {'usd': 95000}, ...}
+    
+    Prices come from the live stream table when fresh; only stale or
+    missing coins are fetched over REST.
+    """
+    results, stale = _split_live_prices(coins)
+    
+    if stale:
+        # One batched request regardless of how many coins are missing
+        ticker = get_binance_ticker_prices(list(stale.values()))
+        for coin, symbol in stale.items():
+            if symbol in ticker:
+                results[coin] = {"usd": ticker[symbol]}
+            
+    return results
+
+async def get_binance_prices_async(coins=None):
+    """Async version of get_binance_prices."""
+    results, stale = _split_live_prices(coins)
+    
+    if stale:
+        ticker = await get_binance_ticker_prices_async(list(stale.values()))
+        for coin, symbol in stale.items():
+            if symbol in ticker:
+                results[coin] = {"usd": ticker[symbol]}
             
     return results
@@ -0,0 +1,179 @@
+"""
+Candle Store
+Local on-disk kline history, one memory-mapped NumPy file per symbol and interval
+"""
+import os
+import json
+import time
+import tempfile
+import threading
+from collections import defaultdict
+import numpy as np
+from services.binance_service import fetch_klines_range
+from services.time_ranges import merge_ranges, missing_ranges
+
+CANDLE_DIR = os.path.join("data", "candles")
+
+# Numeric kline fields kept on disk, in Binance order (the trailing "ignore" field is dropped)
+CANDLE_COLUMNS = (
+    "open_time", "open", "high", "low", "close", "volume",
+    "close_time", "quote_volume", "trades", "taker_base_volume", "taker_quote_volume"
+)
+OPEN_TIME, OPEN, HIGH, LOW, CLOSE, VOLUME, CLOSE_TIME = range(7)
+
+_locks = defaultdict(threading.Lock)
+_candle_listeners = []
+
+def _paths(symbol, interval):
+    base = os.path.join(CANDLE_DIR, f"{symbol}_{interval}")
+    return base + ".npy", base + ".json"
+
+def add_candle_listener(listener):
+    """Register fn(symbol, interval) to be called after new candles are stored."""
+    _candle_listeners.append(listener)
+
+def _notify_candle_listeners(symbol, interval):
+    for listener in _candle_listeners:
+        try:
+            listener(symbol, interval)
+        except Exception as e:
+            print(f"Error in candle listener for {symbol} {interval}: {e}")
+
+def empty_candles():
+    return np.empty((0, len(CANDLE_COLUMNS)), dtype=np.float64)
+
+def klines_to_array(rows):
+    """Convert raw Binance kline rows into an (n, 11) float64 array."""
+    if not rows:
+        return empty_candles()
+    return np.array([row[:len(CANDLE_COLUMNS)] for row in rows], dtype=np.float64)
+
+def candles_to_klines(candles):
+    """Convert a candle array back into Binance-style kline rows."""
+    rows = candles.tolist()
+    for row in rows:
+        row[OPEN_TIME] = int(row[OPEN_TIME])
+        row[CLOSE_TIME] = int(row[CLOSE_TIME])
+        row[8] = int(row[8])
+    return rows
+
+def load_candles(symbol, interval):
+    """
+    Load the stored candles (memory-mapped, read-only) and the list of
+    [start_ms, end_ms) ranges they are known to cover completely.
+    """
+    npy_path, meta_path = _paths(symbol, interval)
+    if not os.path.exists(npy_path) or not os.path.exists(meta_path):
+        return empty_candles(), []
+    try:
+        with open(meta_path, "r") as f:
+            covered = json.load(f)["covered"]
+        return np.load(npy_path, mmap_mode="r"), covered
+    except (json.JSONDecodeError, KeyError, IOError, ValueError):
+        return empty_candles(), []
+
+def _replace_file(path, write):
+    """
+    Write a file through write(f) into a uniquely named temp file next to it,
+    then move it into place, so concurrent writers in other processes never
+    share or clobber a half-written file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _save_candles(symbol, interval, candles, covered):
+    """
+    Write candles and coverage atomically so readers never see a partial file.
+    Raises OSError if the file cannot be replaced (e.g. still mapped on Windows).
+    """
+    npy_path, meta_path = _paths(symbol, interval)
+    os.makedirs(CANDLE_DIR, exist_ok=True)
+    _replace_file(npy_path, lambda f: np.save(f, candles))
+    _replace_file(meta_path, lambda f: f.write(json.dumps({"covered": covered}).encode()))
+
+def _merge_candles(old, new):
+    """Union of two candle arrays sorted by open time, new rows win on duplicates."""
+    combined = np.concatenate([new, old])
+    _, first = np.unique(combined[:, OPEN_TIME], return_index=True)
+    return combined[first]
+
+def _slice(candles, start_ms, end_ms):
+    times = candles[:, OPEN_TIME]
+    lo = np.searchsorted(times, start_ms, side="left")
+    hi = np.searchsorted(times, end_ms, side="left")
+    return np.array(candles[lo:hi])
+
+def _fill_gaps(symbol, interval, gaps, now):
+    """
+    Download the gaps and persist closed candles.
+    Returns (stored, forming): every closed candle, including the new ones even
+    if they could not be written, and the still-forming candles, which are
+    never written to disk.
+    """
+    with _locks[(symbol, interval)]:
+        candles, covered = load_candles(symbol, interval)
+        # Another request may have filled the gaps while we waited on the lock
+        gaps = [g for start, end in gaps for g in missing_ranges(covered, start, end)]
+        if not gaps:
+            return candles, empty_candles()
+
+        fetched, forming, new_ranges = [], [], []
+        for start, end in gaps:
+            try:
+                rows = klines_to_array(fetch_klines_range(symbol, interval, start, end))
+            except Exception as e:
+                print(f"Error filling {symbol} {interval} candles: {e}")
+                continue
+
+            is_open = rows[:, CLOSE_TIME] >= now
+            fetched.append(rows[~is_open])
+            forming.append(rows[is_open])
+
+            # Coverage stops where the first unfinished candle begins
+            covered_end = min(end, now)
+            if is_open.any():
+                covered_end = min(covered_end, int(rows[is_open, OPEN_TIME].min()))
+            if covered_end > start:
+                new_ranges.append([start, covered_end])
+
+        if new_ranges:
+            # Merge into memory and drop the map first: Windows cannot replace a mapped file
+            candles = _merge_candles(np.array(candles), np.concatenate(fetched))
+            try:
+                _save_candles(symbol, interval, candles, merge_ranges(covered + new_ranges))
+            except OSError as e:
+                # Serve what was fetched; the gaps are simply downloaded again next time
+                print(f"Error saving {symbol} {interval} candles: {e}")
+            else:
+                _notify_candle_listeners(symbol, interval)
+
+        return candles, np.concatenate(forming) if forming else empty_candles()
+
+def get_candles(symbol, interval, start_ms, end_ms):
+    """
+    Return candles with open time in [start_ms, end_ms) as an (n, 11) float64 array.
+    Only ranges the store has never covered are downloaded.
+    """
+    now = int(time.time() * 1000)
+    end_ms = min(end_ms, now)
+
+    candles, covered = load_candles(symbol, interval)
+    gaps = missing_ranges(covered, start_ms, end_ms)
+    if not gaps:
+        return _slice(candles, start_ms, end_ms)
+
+    del candles   # release the map before _fill_gaps replaces the file under it
+    candles, forming = _fill_gaps(symbol, interval, gaps, now)
+    result = _slice(candles, start_ms, end_ms)
+    if len(forming):
+        result = _merge_candles(result, _slice(forming, start_ms, end_ms))
+    return result
@@ -0,0 +1,77 @@
+"""
+Chart Data
+Columnar chart payloads: LTTB downsampling, JSON-safe columns and optional Arrow encoding
+"""
+import json
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow output is optional
+    pa = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+def lttb_indices(x, y, points):
+    """
+    Largest-Triangle-Three-Buckets: indices of `points` samples of (x, y)
+    that keep the visual shape of the series. Always keeps the first and last point.
+    """
+    n = len(y)
+    if points is None or points >= n or points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket i (0-based, excluding the fixed end points) spans [edges[i], edges[i + 1])
+    edges = (np.arange(points - 1) * (n - 2) / (points - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # Mean of every bucket via prefix sums; the last bucket's "next" is the final point
+    x_sums = np.concatenate(([0.0], np.cumsum(x)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y)))
+    next_lo, next_hi = np.append(edges[1:-1], n - 1), np.append(edges[2:], n)
+    counts = next_hi - next_lo
+    avg_x = (x_sums[next_hi] - x_sums[next_lo]) / counts
+    avg_y = (y_sums[next_hi] - y_sums[next_lo]) / counts
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area between the last pick, each candidate and the next bucket's mean
+        area = np.abs(
+            (x[a] - avg_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def json_column(values):
+    """Vectorized float column to a list with NaN/Infinity as None."""
+    values = np.asarray(values, dtype=np.float64)
+    if np.isfinite(values).all():
+        return values.tolist()
+    return np.where(np.isfinite(values), values, None).tolist()
+
+def columns_to_json(columns):
+    """{name: array} to parallel JSON lists; int64 columns stay integers."""
+    return {
+        name: values.tolist() if np.issubdtype(values.dtype, np.integer) else json_column(values)
+        for name, values in columns.items()
+    }
+
+def columns_to_arrow(columns, metadata=None):
+    """
+    Encode parallel columns as an Arrow IPC stream; metadata (any JSON value)
+    travels in the schema under the key 'meta'. Raises RuntimeError without pyarrow.
+    """
+    if pa is None:
+        raise RuntimeError("Arrow output needs pyarrow installed")
+    table = pa.table({name: pa.array(values, from_pandas=True) for name, values in columns.items()})
+    if metadata is not None:
+        table = table.replace_schema_metadata({"meta": json.dumps(metadata)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -1,5 +1,36 @@
+import os
+import json
+import time
+import bisect
+import threading
+from collections import defaultdict
+import requests
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from services import http_client
+from services.feature_pipeline import build_dataset
+from services.model_registry import get_model, save_model, needs_retrain
+from services.time_ranges import merge_ranges, missing_ranges
+
+WATCHED_COINS = ["bitcoin", "ethereum", "pepe"]
+
+PEPE_MODEL = "pepe_random_forest"
+PEPE_WINDOW = 24
+_pepe_train_lock = threading.Lock()   # one retrain at a time (scheduler vs. request)
+
+# Optional CoinGecko API key, sent with every CoinGecko request when present
+COINGECKO_API_KEY = os.getenv("COINGECKO_API_KEY")
+HEADERS = {"x-cg-demo-api-key": COINGECKO_API_KEY} if COINGECKO_API_KEY else {}
+
 COIN_LIST_CACHE_FILE = os.path.join("data", "coin_list_cache.json")
 CACHE_EXPIRY_SECONDS = 86400  # 24 hours
+COIN_INDEX_CHECK_SECONDS = 60  # how often lookups stat the cache file for changes
+
+HISTORY_DIR = os.path.join("data", "history")
+HISTORY_REFRESH_SECONDS = 3600  # newest stored point may be this old before the tail is fetched
+MIN_RANGE_FETCH_MS = 2 * 86400 * 1000  # shorter market_chart/range spans come back at 5-minute granularity
+MAX_RANGE_FETCH_MS = 90 * 86400 * 1000  # ...and longer ones at daily granularity
+HOUR_MS = 3600 * 1000
 
 def get_coin_list():
     """Fetch the full coin list from CoinGecko with local caching."""
@@ -15,7 +46,7 @@ def get_coin_list():
 
     url = "https://api.coingecko.com/api/v3/coins/list"
     try:
-        resp = requests.get(url, timeout=10)
+        resp = http_client.get(url, timeout=10)
         
         if resp.status_code == 429:
             print("Rate limit hit for coin list. Using fallback/cache if available.")
@@ -42,18 +73,90 @@ def get_coin_list():
         return []
 
 
+class CoinIndex:
+    """
+    Case-insensitive lookups over the CoinGecko coin list: dicts by id,
+    symbol and name, plus a sorted key list for prefix search.
+    """
+    def __init__(self, coins):
+        self.by_id = {}
+        self.by_symbol = {}
+        self.by_name = {}
+        keys = set()
+        for coin in coins:
+            coin_id = coin["id"].lower()
+            self.by_id[coin_id] = coin
+            keys.add((coin_id, coin_id))
+            for field, table in (("symbol", self.by_symbol), ("name", self.by_name)):
+                value = (coin.get(field) or "").lower()
+                if value:
+                    table.setdefault(value, []).append(coin)
+                    keys.add((value, coin_id))
+        self._keys = sorted(keys)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def search(self, prefix, limit=10):
+        """Coins whose id, symbol or name starts with prefix, in key order."""
+        prefix = prefix.lower()
+        found = {}
+        for i in range(bisect.bisect_left(self._keys, (prefix, "")), len(self._keys)):
+            key, coin_id = self._keys[i]
+            if not key.startswith(prefix) or len(found) >= limit:
+                break
+            found.setdefault(coin_id, self.by_id[coin_id])
+        return list(found.values())
+
+
+_coin_index = None
+_coin_index_state = (None, 0.0, 0.0)   # (cache file mtime, built at, last checked)
+_coin_index_lock = threading.Lock()
+
+
+def get_coin_index():
+    """
+    Process-wide CoinIndex, rebuilt only when the cache file changes or
+    CACHE_EXPIRY_SECONDS have passed since it was built.
+    """
+    global _coin_index, _coin_index_state
+    mtime, built_at, checked_at = _coin_index_state
+    now = time.time()
+    if _coin_index is not None and now - checked_at < COIN_INDEX_CHECK_SECONDS:
+        return _coin_index
+
+    with _coin_index_lock:
+        try:
+            current_mtime = os.path.getmtime(COIN_LIST_CACHE_FILE)
+        except OSError:
+            current_mtime = None
+        if _coin_index is None or current_mtime != mtime or now - built_at >= CACHE_EXPIRY_SECONDS:
+            coins = get_coin_list()
+            try:
+                current_mtime = os.path.getmtime(COIN_LIST_CACHE_FILE)  # get_coin_list may have refreshed it
+            except OSError:
+                current_mtime = None
+            # An empty list (API down, no cache) is retried on the next check
+            _coin_index = CoinIndex(coins)
+            built_at = now if coins else 0.0
+            mtime = current_mtime
+        _coin_index_state = (mtime, built_at, now)
+        return _coin_index
+
+
 def validate_coin_id(coin_id):
     """Validate if a coin_id exists on CoinGecko."""
-    coin_list = get_coin_list()
-    if not coin_list:
+    index = get_coin_index()
+    if not len(index):
         # If we can't fetch the list, assume the ID is valid to avoid blocking the app
         # This is a fallback for when the API is down/rate-limited and we have no cache
-        return True 
-        
-    for coin in coin_list:
-        if coin["id"].lower() == coin_id.lower():
-            return True
-    return False
+        return True
+    return coin_id.lower() in index.by_id
+
+
+def search_coins(prefix, limit=10):
+    """Autocomplete: coins whose id, symbol or name starts with prefix."""
+    return get_coin_index().search(prefix, limit)
 
 
 def get_prices(coin_ids=WATCHED_COINS, vs_currency="usd"):
@@ -62,10 +165,11 @@ def get_prices(coin_ids=WATCHED_COINS, vs_currency="usd"):
 
     Returns a dict {coin_id: {"usd": price}, ...}
     """
-    # Validate coin IDs before calling
-    # Optimization: Skip validation if we are sure, or handle 404s gracefully
-    # valid_ids = [cid for cid in coin_ids if validate_coin_id(cid)]
-    valid_ids = coin_ids # Trust the input for now to save API calls
+    # Validate coin IDs before calling (in-memory index lookups)
+    valid_ids = [cid for cid in coin_ids if validate_coin_id(cid)]
+    invalid_ids = [cid for cid in coin_ids if cid not in valid_ids]
+    if invalid_ids:
+        print(f"Skipping unknown coin ids: {', '.join(invalid_ids)}")
     
     if not valid_ids:
         print("No valid coins found to fetch prices.")
@@ -77,7 +181,7 @@ def get_prices(coin_ids=WATCHED_COINS, vs_currency="usd"):
         "vs_currencies": vs_currency
     }
     try:
-        resp = requests.get(url, headers=HEADERS, params=params, timeout=10)
+        resp = http_client.get(url, headers=HEADERS, params=params, timeout=10)
         if resp.status_code == 429:
             print("Rate limit hit fetching prices.")
             return {}
@@ -88,77 +192,140 @@ def get_prices(coin_ids=WATCHED_COINS, vs_currency="usd"):
         return {}
 
 
-def get_historical_prices(coin_id="pepe", vs_currency="usd", days=30):
-    """
-    Fetch historical prices for coin_id over the past `days` days.
+_history = {}  # (coin_id, vs_currency) -> {"covered": [[start_ms, end_ms]], "prices": [[ts, price]]}
+_history_locks = defaultdict(threading.Lock)
 
-    Returns list of [timestamp_in_ms, price].
-    """
-    # Check cache
-    cache_file = os.path.join("data", f"history_{coin_id}_{days}.json")
-    if os.path.exists(cache_file):
+
+def _history_path(coin_id, vs_currency):
+    return os.path.join(HISTORY_DIR, f"{coin_id}_{vs_currency}.json")
+
+
+def _load_history(coin_id, vs_currency):
+    key = (coin_id, vs_currency)
+    if key not in _history:
         try:
-            with open(cache_file, "r") as f:
-                data = json.load(f)
-                # Cache valid for 1 hour (3600 seconds)
-                if time.time() - data["timestamp"] < 3600:
-                    return data["prices"]
-        except:
-            pass
+            with open(_history_path(coin_id, vs_currency), "r") as f:
+                _history[key] = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            _history[key] = {"covered": [], "prices": []}
+    return _history[key]
 
-    # Validate coin_id before calling (skip if cached list check failed to save time, but good to keep if needed)
-    # if not validate_coin_id(coin_id): ... (Skipping validation to save API calls)
 
-    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
+def _save_history(coin_id, vs_currency, history):
+    path = _history_path(coin_id, vs_currency)
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(history, f)
+    os.replace(path + ".tmp", path)
+
+
+def _merge_prices(old, new):
+    """Union of [ts, price] lists keeping one point per hour, new points win."""
+    by_hour = {int(ts) // HOUR_MS: [ts, price] for ts, price in old}
+    by_hour.update((int(ts) // HOUR_MS, [ts, price]) for ts, price in new)
+    return [by_hour[hour] for hour in sorted(by_hour)]
+
+
+def _fetch_price_range(coin_id, vs_currency, start_ms, end_ms):
+    """CoinGecko prices in [start_ms, end_ms]; None when rate limited or failing."""
+    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart/range"
     params = {
         "vs_currency": vs_currency,
-        "days": days
+        "from": start_ms // 1000,
+        "to": end_ms // 1000
     }
     try:
-        resp = requests.get(url, headers=HEADERS, params=params, timeout=10)
+        resp = http_client.get(url, headers=HEADERS, params=params, timeout=10)
         if resp.status_code == 429:
-             print(f"Rate limit hit for {coin_id} history. Using old cache if available.")
-             if os.path.exists(cache_file):
-                 with open(cache_file, "r") as f:
-                    return json.load(f).get("prices", [])
-             return []
-             
+            print(f"Rate limit hit for {coin_id} history. Using stored history.")
+            return None
         resp.raise_for_status()
-        data = resp.json()
-        prices = data.get("prices", [])
-        
-        # Save to cache
-        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
-        with open(cache_file, "w") as f:
-            json.dump({"timestamp": time.time(), "prices": prices}, f)
-            
-        return prices
+        return resp.json().get("prices", [])
     except requests.exceptions.RequestException as e:
         print(f"Error fetching historical prices for {coin_id}: {e}")
-        # Fallback
-        if os.path.exists(cache_file):
-             with open(cache_file, "r") as f:
-                return json.load(f).get("prices", [])
-        return []
+        return None
+
+
+def get_historical_prices(coin_id="pepe", vs_currency="usd", days=30):
+    """
+    Fetch historical prices for coin_id over the past `days` days.
 
+    All windows of a coin share one hourly store in data/history; only the
+    ranges it does not cover yet (usually just the newest points) are fetched.
 
-def prepare_pepe_dataset(price_series, window=24):
+    Returns list of [timestamp_in_ms, price].
+    """
+    now = int(time.time() * 1000)
+    start = now - int(days * 86400 * 1000)
+
+    with _history_locks[(coin_id, vs_currency)]:
+        history = _load_history(coin_id, vs_currency)
+        gaps = [
+            (gap_start, gap_end) for gap_start, gap_end in missing_ranges(history["covered"], start, now)
+            # A short gap at the end just means the store is less than HISTORY_REFRESH_SECONDS old
+            if gap_end < now or gap_start == start or gap_end - gap_start >= HISTORY_REFRESH_SECONDS * 1000
+        ]
+        chunks = [
+            # Every request spans 2 to 90 days so CoinGecko answers with hourly points
+            (min(chunk_start, chunk_end - MIN_RANGE_FETCH_MS), chunk_end)
+            for gap_start, gap_end in gaps
+            for chunk_start in range(gap_start, gap_end, MAX_RANGE_FETCH_MS)
+            for chunk_end in [min(chunk_start + MAX_RANGE_FETCH_MS, gap_end)]
+        ]
+        for fetch_start, fetch_end in chunks:
+            prices = _fetch_price_range(coin_id, vs_currency, fetch_start, fetch_end)
+            if prices is None:
+                break
+            history = {
+                "covered": merge_ranges(history["covered"] + [[fetch_start, fetch_end]]),
+                "prices": _merge_prices(history["prices"], prices)
+            }
+            _history[(coin_id, vs_currency)] = history
+            _save_history(coin_id, vs_currency, history)
+
+    prices = history["prices"]
+    return prices[bisect.bisect_left(prices, [start]):]
+
+
+def prepare_pepe_dataset(price_series, window=24, **features):
     """
     Prepare features and labels for ML training from price series.
 
     price_series: list of [timestamp, price]
     window: number of past points to use as features.
+    features: optional extras for feature_pipeline.feature_matrix
+        (returns, volatility_window, volumes).
 
     Returns:
-        X: np.array shape (samples, window)
+        X: np.array shape (samples, window) plus any extra feature columns
         y: np.array shape (samples,)
     """
-    X, y = [], []
-    prices_only = [price for _, price in price_series]
-    for i in range(len(prices_only) - window - 1):
-        X.append(prices_only[i:i + window])
-        y.append(prices_only[i + window])
-    return np.array(X), np.array(y)
+    if not len(price_series):
+        return np.empty((0, window)), np.empty(0)
+    prices = np.asarray(price_series, dtype=np.float64)[:, 1]
+    return build_dataset(prices, window, **features)
+
+
+def fit_price_model(X, y):
+    """
+    Fit the next-price RandomForestRegressor on prepared windows.
+
+    Returns model or None if insufficient data.
+    """
+    if len(X) < 10:
+        return None
+    # Out-of-bag predictions give a holdout score without changing the fitted trees
+    model = RandomForestRegressor(n_estimators=100, random_state=42, oob_score=True)
+    model.fit(X, y)
+    return model
+
+
+def model_metrics(model, y):
+    """Out-of-bag R2 and MAE of a model from fit_price_model."""
+    return {
+        "oob_r2": float(model.oob_score_),
+        "oob_mae": float(np.mean(np.abs(model.oob_prediction_ - y)))
+    }
 
 
 def train_pepe_model(price_history, window=24):
@@ -168,14 +335,47 @@ def train_pepe_model(price_history, window=24):
     Returns model or None if insufficient data.
     """
     X, y = prepare_pepe_dataset(price_history, window)
-    if len(X) < 10:
+    model = fit_price_model(X, y)
+    if model is None:
         print("Not enough data to train the PEPE model.")
-        return None
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
-    model.fit(X, y)
     return model
 
 
+def refresh_pepe_model(price_history=None, window=PEPE_WINDOW):
+    """
+    Return the registered PEPE model, retraining it only when the registry says
+    it is stale (see model_registry.needs_retrain) or its window changed.
+
+    Returns (model, metadata); (None, None) if no model could be trained.
+    """
+    if price_history is None:
+        price_history = get_historical_prices("pepe", "usd", 30)
+    if not price_history:
+        return get_model(PEPE_MODEL)
+
+    with _pepe_train_lock:
+        model, metadata = get_model(PEPE_MODEL)
+        if metadata is not None and metadata.get("window") == window:
+            new_points = sum(1 for ts, _ in price_history if ts > metadata["train_end"])
+            if not needs_retrain(metadata, new_points):
+                return model, metadata
+
+        trained = train_pepe_model(price_history, window)
+        if trained is None:
+            return model, metadata
+        _, y = prepare_pepe_dataset(price_history, window)
+        metadata = save_model(
+            PEPE_MODEL, trained,
+            coin="pepe",
+            window=window,
+            train_start=price_history[0][0],
+            train_end=price_history[-1][0],
+            samples=len(y),
+            metrics=model_metrics(trained, y)
+        )
+        return trained, metadata
+
+
 def predict_next_price(model, recent_prices, window=24):
     """
     Predict next price using the model based on recent_prices.
@@ -208,8 +408,8 @@ def generate_signal(current_price, predicted_price, buy_threshold=0.02, sell_thr
 
 def get_pepe_signal():
     """
-    Fetch PEPE historical data, train model, predict next price,
-    and generate buy/sell/hold signal.
+    Fetch PEPE historical data, predict the next price with the registered
+    model (retrained only when stale) and generate buy/sell/hold signal.
 
     Returns (current_price, predicted_price, signal_str)
     """
@@ -219,10 +419,10 @@ def get_pepe_signal():
         print("Insufficient price history data for PEPE.")
         return None, None, "No data"
 
-    model = train_pepe_model(price_history, window=24)
+    model, _ = refresh_pepe_model(price_history, window=PEPE_WINDOW)
     current_price = price_history[-1][1]
-    recent_prices = [p for _, p in price_history[-24:]]
-    predicted_price = predict_next_price(model, recent_prices, window=24)
+    recent_prices = [p for _, p in price_history[-PEPE_WINDOW:]]
+    predicted_price = predict_next_price(model, recent_prices, window=PEPE_WINDOW)
     signal = generate_signal(current_price, predicted_price)
     return current_price, predicted_price, signal
 
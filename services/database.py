@@ -0,0 +1,100 @@
+"""
+Database
+Embedded SQLite store (WAL mode) for alerts and portfolio transactions
+"""
+import os
+import json
+import threading
+from sqlalchemy import (
+    create_engine, event, insert, select, func,
+    MetaData, Table, Column, Index, Integer, Float, String, Boolean
+)
+
+DATABASE_FILE = os.path.join("data", "trading.db")
+
+# Legacy JSON stores, imported once into their tables
+ALERTS_JSON_FILE = os.path.join("data", "alerts.json")
+PORTFOLIO_JSON_FILE = os.path.join("data", "portfolio.json")
+
+metadata = MetaData()
+
+alerts_table = Table(
+    "alerts", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("coin", String, nullable=False),
+    Column("target_price", Float, nullable=False),
+    Column("condition", String, nullable=False),
+    Column("alert_type", String, nullable=False, default="price"),
+    Column("base_price", Float),
+    Column("triggered", Boolean, nullable=False, default=False),
+    Index("ix_alerts_triggered_coin", "triggered", "coin")
+)
+
+transactions_table = Table(
+    "transactions", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("coin_id", String, nullable=False, index=True),
+    Column("amount", Float, nullable=False),
+    Column("price", Float, nullable=False)
+)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run while a write is in progress
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+def _load_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return []
+
+def _migrate_json(conn, table, path, to_row):
+    """Import a legacy JSON file into an empty table, then set the file aside."""
+    if not os.path.exists(path):
+        return
+    if conn.execute(select(func.count()).select_from(table)).scalar() == 0:
+        rows = [to_row(item) for item in _load_json(path)]
+        if rows:
+            conn.execute(insert(table), rows)
+        print(f"Migrated {len(rows)} rows from {path} into {table.name}")
+    os.replace(path, path + ".migrated")
+
+def _alert_row(alert):
+    return {
+        "coin": alert["coin"],
+        "target_price": alert["target_price"],
+        "condition": alert["condition"],
+        "alert_type": alert.get("alert_type", "price"),
+        "base_price": alert.get("base_price"),
+        "triggered": bool(alert.get("triggered", False))
+    }
+
+def _transaction_row(transaction):
+    return {
+        "coin_id": transaction["coin_id"],
+        "amount": float(transaction["amount"]),
+        "price": float(transaction["price"])
+    }
+
+def get_engine():
+    """Return the shared engine, creating the schema and migrating JSON data on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                os.makedirs(os.path.dirname(DATABASE_FILE), exist_ok=True)
+                engine = create_engine(f"sqlite:///{DATABASE_FILE}")
+                event.listen(engine, "connect", _set_sqlite_pragmas)
+                metadata.create_all(engine)
+                with engine.begin() as conn:
+                    _migrate_json(conn, alerts_table, ALERTS_JSON_FILE, _alert_row)
+                    _migrate_json(conn, transactions_table, PORTFOLIO_JSON_FILE, _transaction_row)
+                _engine = engine
+    return _engine
@@ -0,0 +1,80 @@
+"""
+Feature Pipeline
+Sliding-window training data for the price models, built on strided views
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from services.binance_service import get_binance_candles
+from services.candle_store import CLOSE, VOLUME
+
+def window_view(values, window):
+    """
+    Read-only (len - window + 1, window) view of every full window of a 1-D
+    array; no data is copied. Empty when the array is shorter than the window.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < window:
+        return np.empty((0, window))
+    return sliding_window_view(values, window)
+
+def _rolling_std(returns, period):
+    """Population std of each full `period` run of returns, via running sums."""
+    sums = np.concatenate(([0.0], np.cumsum(returns)))
+    squares = np.concatenate(([0.0], np.cumsum(returns * returns)))
+    mean = (sums[period:] - sums[:-period]) / period
+    variance = (squares[period:] - squares[:-period]) / period - mean * mean
+    return np.sqrt(np.maximum(variance, 0.0))
+
+def feature_matrix(prices, window=24, volumes=None, returns=False, volatility_window=None):
+    """
+    One feature row for every full window of prices, oldest first
+    (len(prices) - window + 1 rows).
+
+    Columns: the window's prices, then optionally its window - 1 simple returns,
+    the std of the last `volatility_window` returns and the window's volumes.
+    Without extras the result is a zero-copy view of the prices.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    X = window_view(prices, window)
+    if not returns and volatility_window is None and volumes is None:
+        return X
+
+    rows = len(X)
+    parts = [X]
+    simple_returns = prices[1:] / prices[:-1] - 1 if len(prices) > 1 else np.empty(0)
+    if returns:
+        parts.append(window_view(simple_returns, window - 1)[:rows])
+    if volatility_window is not None:
+        if not 1 < volatility_window < window:
+            raise ValueError("volatility_window must be between 2 and window - 1")
+        # Row i ends at price i + window - 1, i.e. after return i + window - 2
+        volatility = _rolling_std(simple_returns, volatility_window) if rows else np.empty(0)
+        parts.append(volatility[window - 1 - volatility_window:][:rows, None])
+    if volumes is not None:
+        parts.append(window_view(volumes, window)[:rows])
+    return np.hstack(parts)
+
+def build_dataset(prices, window=24, **features):
+    """
+    Training rows and next-price labels from a price array.
+    Keeps the original dataset's sample count of len(prices) - window - 1.
+    Returns (X, y); X is a view of the prices when no extra features are asked for.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    samples = max(len(prices) - window - 1, 0)
+    X = feature_matrix(prices, window, **features)[:samples]
+    return X, prices[window:window + samples]
+
+def candle_dataset(coin_id, interval="1h", limit=1000, window=24,
+                   returns=False, volatility_window=None, volume=False):
+    """
+    Training data for any coin and interval from the local candle store
+    (e.g. interval='1m', limit=60 * 24 * 90 for three months of minute bars).
+    """
+    candles = get_binance_candles(coin_id, interval=interval, limit=limit, closed_only=True)
+    return build_dataset(
+        candles[:, CLOSE], window,
+        volumes=candles[:, VOLUME] if volume else None,
+        returns=returns,
+        volatility_window=volatility_window
+    )
@@ -1,4 +1,4 @@
-import requests
+from services import http_client
 from datetime import datetime, timedelta
 
 def calculate_what_if(coin, amount_usd, days_ago):
@@ -40,7 +40,7 @@ def calculate_what_if(coin, amount_usd, days_ago):
     }
     
     try:
-        resp = requests.get(url, params=params, timeout=10)
+        resp = http_client.get(url, params=params, timeout=10)
         resp.raise_for_status()
         data = resp.json()
         
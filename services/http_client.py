@@ -0,0 +1,115 @@
+"""
+Shared HTTP Client
+One pooled, keep-alive session with retries used by every upstream call
+"""
+import time
+import asyncio
+import threading
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_CONNECTIONS = 10  # Number of distinct hosts kept in the pool
+POOL_MAXSIZE = 32      # Concurrent keep-alive connections per host
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.3
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+_async_client = None
+
+def _build_session():
+    """Create a session with connection pooling and retry on transient errors."""
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        # 429 is left to the callers, they already fall back to their caches
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session():
+    """Return the process-wide session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+def get(url, params=None, timeout=10, **kwargs):
+    """
+    GET through the shared session.
+    Same signature and exceptions as requests.get.
+    """
+    return get_session().get(url, params=params, timeout=timeout, **kwargs)
+
+def get_async_client():
+    """Return the process-wide httpx.AsyncClient, creating it on first use."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=POOL_MAXSIZE),
+            # Transport-level retries cover connection errors only
+            transport=httpx.AsyncHTTPTransport(retries=MAX_RETRIES)
+        )
+    return _async_client
+
+async def aget(url, params=None, timeout=10, **kwargs):
+    """
+    Async GET through the shared client, retrying 5xx responses with the
+    same backoff as the sync session. Returns an httpx.Response.
+    """
+    client = get_async_client()
+    for attempt in range(MAX_RETRIES + 1):
+        resp = await client.get(url, params=params, timeout=timeout, **kwargs)
+        if resp.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return resp
+        await asyncio.sleep(BACKOFF_FACTOR * (2 ** attempt))
+
+async def aclose():
+    """Close the async client (called on application shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: allows `burst` calls at once, then
+    `rate` calls per second on average.
+    """
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,153 @@
+"""
+Live Indicator Feed
+Hourly SMA and RSI per coin, updated incrementally from the live price stream
+"""
+import math
+import time
+import threading
+from services.binance_service import (
+    COIN_MAPPING, INTERVAL_MS, add_price_listener, align_open_time, get_binance_candles
+)
+from services.candle_store import OPEN_TIME, CLOSE
+from services.indicators import SMA, RSI
+
+FEED_INTERVAL = "1h"
+SEED_BARS = 200   # closed candles replayed to warm the indicators up
+# Same defaults as the backtested strategies
+SHORT_PERIOD = 10
+LONG_PERIOD = 30
+RSI_PERIOD = 14
+OVERSOLD = 30
+OVERBOUGHT = 70
+
+def _json_float(value):
+    return None if math.isnan(value) else value
+
+class CoinIndicators:
+    """Streaming indicators for one coin plus the strategy signals of the last closed bar."""
+    def __init__(self):
+        self.short_sma = SMA(SHORT_PERIOD)
+        self.long_sma = SMA(LONG_PERIOD)
+        self.rsi = RSI(RSI_PERIOD)
+        self.close = None
+        self.bars = 0
+        self.bar_open = None      # open time of the bar currently forming
+        self.last_price = None    # latest tick inside that bar
+        self.signals = {"sma_crossover": None, "rsi": None}
+
+    def close_bar(self, close):
+        """Feed one closed candle; same rules as sma_crossover_signals / rsi_signals."""
+        was_above = self.short_sma.value >= self.long_sma.value
+        was_below = self.short_sma.value <= self.long_sma.value
+        short, long = self.short_sma.update(close), self.long_sma.update(close)
+        rsi = self.rsi.update(close)
+        self.close = close
+        self.bars += 1
+
+        crossover = None
+        if short > long and was_below:
+            crossover = "BUY"
+        elif short < long and was_above:
+            crossover = "SELL"
+        rsi_signal = None
+        if self.bars > RSI_PERIOD + 1:
+            rsi_signal = "BUY" if rsi < OVERSOLD else "SELL" if rsi > OVERBOUGHT else None
+        self.signals = {"sma_crossover": crossover, "rsi": rsi_signal}
+
+    def snapshot(self):
+        return {
+            "close": self.close,
+            "bar_open": self.bar_open,
+            f"sma_{SHORT_PERIOD}": _json_float(self.short_sma.value),
+            f"sma_{LONG_PERIOD}": _json_float(self.long_sma.value),
+            "rsi": _json_float(self.rsi.value),
+            "signals": dict(self.signals)
+        }
+
+class IndicatorFeed:
+    """
+    Seeds each coin from the candle store, then advances the indicators once
+    per closed bar using the last streamed price of that bar.
+    """
+    def __init__(self):
+        self._coins = {}          # coin id -> CoinIndicators
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def seed(self, coin):
+        candles = get_binance_candles(coin, interval=FEED_INTERVAL, limit=SEED_BARS, closed_only=True)
+        state = CoinIndicators()
+        for close in candles[:, CLOSE].tolist():
+            state.close_bar(close)
+        if len(candles):
+            state.bar_open = int(candles[-1, OPEN_TIME]) + INTERVAL_MS[FEED_INTERVAL]
+        with self._lock:
+            self._coins[coin] = state
+
+    def on_price(self, coin, price):
+        with self._lock:
+            state = self._coins.get(coin)
+            if state is None:
+                return
+            bar_open = align_open_time(int(time.time() * 1000), FEED_INTERVAL)
+            closed = None
+            if state.bar_open is not None and bar_open > state.bar_open:
+                if bar_open - state.bar_open > INTERVAL_MS[FEED_INTERVAL] or state.last_price is None:
+                    # Missed whole bars (stream outage): rebuild from stored candles
+                    self._coins.pop(coin)
+                    threading.Thread(target=self.seed, args=(coin,), daemon=True).start()
+                    return
+                state.close_bar(state.last_price)
+                closed = state.snapshot()
+            state.bar_open = bar_open
+            state.last_price = price
+
+        if closed is not None:
+            for listener in self._listeners:
+                try:
+                    listener(coin, closed)
+                except Exception as e:
+                    print(f"Error in indicator listener for {coin}: {e}")
+
+    def get(self, coin):
+        with self._lock:
+            state = self._coins.get(coin)
+            return state.snapshot() if state else None
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+_feed = IndicatorFeed()
+_started = False
+
+def start_indicator_feed(coins=None):
+    """Follow the live price stream; seeding runs in the background."""
+    global _started
+    if _started:
+        return
+    _started = True
+    coins = coins or list(COIN_MAPPING)
+    coin_for_symbol = {COIN_MAPPING[c]: c for c in coins if c in COIN_MAPPING}
+
+    def on_price(symbol, price):
+        coin = coin_for_symbol.get(symbol)
+        if coin is not None:
+            _feed.on_price(coin, price)
+
+    def seed_all():
+        for coin in coin_for_symbol.values():
+            try:
+                _feed.seed(coin)
+            except Exception as e:
+                print(f"Error seeding indicators for {coin}: {e}")
+
+    add_price_listener(on_price)
+    threading.Thread(target=seed_all, name="indicator-seed", daemon=True).start()
+
+def get_live_indicators(coin):
+    """Latest hourly indicators and signals for a coin, or None if not tracked yet."""
+    return _feed.get(coin)
+
+def add_indicator_listener(listener):
+    """Register fn(coin, snapshot) to be called whenever a bar closes."""
+    _feed.add_listener(listener)
@@ -0,0 +1,169 @@
+"""
+Indicators
+Streaming indicators with cheap per-price updates, and batch kernels that return the same values.
+Batch kernels take a price vector or a (bars, assets) matrix (column-wise, NaN
+before an asset's first price). Streaming objects expose .value, NaN until warmed up.
+"""
+import math
+from collections import deque
+import numpy as np
+import pandas as pd
+
+def sma(prices, period):
+    """
+    Simple moving average via pandas' rolling mean, the kernel the original
+    backtests used: a Kahan-compensated running sum where a window of identical
+    prices averages to that price exactly, so ties between averages are preserved.
+    SMA.update reproduces it bit for bit.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    frame = pd.Series(prices) if prices.ndim == 1 else pd.DataFrame(prices)
+    return frame.rolling(window=period).mean().to_numpy()
+
+def ema(prices, span=None, alpha=None):
+    """
+    Exponential moving average seeded with the first price (no bias adjustment).
+    Loops over bars (vectorized across assets) with the same arithmetic as EMA.update.
+    """
+    alpha = _ema_alpha(span, alpha)
+    prices = np.asarray(prices, dtype=np.float64)
+    result = np.empty(prices.shape)
+    value = np.full(prices.shape[1:], np.nan)
+    for i, price in enumerate(prices):
+        value = np.where(np.isnan(value), price, (1 - alpha) * value + alpha * price)
+        result[i] = value
+    return result
+
+def rsi(prices, period=14, method='sma'):
+    """
+    Relative Strength Index.
+    method='sma' averages gains and losses over a rolling window (the first bar
+    counts as no change); method='wilder' uses Wilder's smoothing (alpha = 1/period)
+    and is NaN for the first `period` bars.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    delta = np.full(prices.shape, np.nan)
+    delta[1:] = prices[1:] - prices[:-1]
+
+    if method == 'sma':
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        avg_gain, avg_loss = sma(gain, period), sma(loss, period)
+    elif method == 'wilder':
+        gain = np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0))
+        loss = np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0))
+        avg_gain, avg_loss = ema(gain, alpha=1 / period), ema(loss, alpha=1 / period)
+        avg_gain[:period] = np.nan
+    else:
+        raise ValueError(f'Unknown RSI method: {method}')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+def _ema_alpha(span, alpha):
+    if alpha is None:
+        if span is None:
+            raise ValueError('span or alpha is required')
+        alpha = 2 / (span + 1)
+    return alpha
+
+def _ratio(numerator, denominator):
+    """numerator / denominator with NumPy's float semantics (inf or NaN on zero)."""
+    if math.isnan(numerator) or math.isnan(denominator):
+        return math.nan
+    if denominator == 0:
+        return math.nan if numerator == 0 else math.copysign(math.inf, numerator)
+    return numerator / denominator
+
+class SMA:
+    """
+    Streaming simple moving average over the last `period` prices, with the
+    same compensated add/remove arithmetic as pandas' rolling mean (see sma()).
+    """
+    def __init__(self, period):
+        self.period = period
+        self._window = deque()
+        self._total = 0.0
+        self._add_error = 0.0      # Kahan compensation, kept separately for adds and removes
+        self._remove_error = 0.0
+        self._negatives = 0
+        self._run = 0              # consecutive repeats of the latest price, counting itself
+        self._previous = None
+        self.value = math.nan
+
+    def _add(self, value, error):
+        y = value - error
+        total = self._total + y
+        error = total - self._total - y
+        self._total = total
+        return error
+
+    def update(self, price):
+        if len(self._window) == self.period:
+            oldest = self._window.popleft()
+            self._remove_error = self._add(-oldest, self._remove_error)
+            self._negatives -= math.copysign(1.0, oldest) < 0
+        self._window.append(price)
+        self._add_error = self._add(price, self._add_error)
+        self._negatives += math.copysign(1.0, price) < 0
+        self._run = self._run + 1 if price == self._previous else 1
+        self._previous = price
+
+        if len(self._window) == self.period:
+            value = self._total / self.period
+            if self._run >= self.period:
+                value = price
+            elif self._negatives == 0 and value < 0:
+                value = 0.0
+            elif self._negatives == self.period and value > 0:
+                value = 0.0
+            self.value = value
+        return self.value
+
+class EMA:
+    """Streaming exponential moving average, seeded with the first price."""
+    def __init__(self, span=None, alpha=None):
+        self.alpha = _ema_alpha(span, alpha)
+        self.value = math.nan
+
+    def update(self, price):
+        if math.isnan(self.value):
+            self.value = price
+        else:
+            self.value = (1 - self.alpha) * self.value + self.alpha * price
+        return self.value
+
+class RSI:
+    """Streaming Relative Strength Index; see rsi() for the methods."""
+    def __init__(self, period=14, method='sma'):
+        if method == 'sma':
+            self._gain, self._loss = SMA(period), SMA(period)
+        elif method == 'wilder':
+            self._gain, self._loss = EMA(alpha=1 / period), EMA(alpha=1 / period)
+        else:
+            raise ValueError(f'Unknown RSI method: {method}')
+        self.period = period
+        self.method = method
+        self._previous = None
+        self._count = 0
+        self.value = math.nan
+
+    def update(self, price):
+        if self._previous is None:
+            delta = None
+        else:
+            delta = price - self._previous
+        self._previous = price
+        self._count += 1
+
+        if delta is None:
+            if self.method == 'wilder':
+                return self.value
+            delta = 0.0
+        avg_gain = self._gain.update(delta if delta > 0 else 0.0)
+        avg_loss = self._loss.update(-delta if delta < 0 else 0.0)
+
+        if self.method == 'wilder' and self._count <= self.period:
+            return self.value
+        self.value = 100 - 100 / (1 + _ratio(avg_gain, avg_loss))
+        return self.value
@@ -1,95 +1,168 @@
-import requests
+import time
+import asyncio
+import threading
+import numpy as np
+from services import http_client
+
+TICKER_24HR_URL = "https://api.binance.com/api/v3/ticker/24hr"
+SNAPSHOT_TTL = 15  # seconds
+MIN_MOVER_VOLUME = 1000000  # USDT quote volume required to count as a gainer/loser
+
+_snapshot = None
+_snapshot_at = 0.0
+_snapshot_lock = threading.Lock()
+_snapshot_async_lock = None
+
+FEAR_GREED_URL = "https://api.alternative.me/fng/"
+FEAR_GREED_DEFAULT = {"value": 50, "classification": "Neutral"}
+
+def _parse_fear_greed(data):
+    if data.get("data") and len(data["data"]) > 0:
+        latest = data["data"][0]
+        return {
+            "value": int(latest.get("value", 50)),
+            "classification": latest.get("value_classification", "Neutral")
+        }
+    return dict(FEAR_GREED_DEFAULT)
 
 def get_fear_greed_index():
     """
     Fetch Fear & Greed Index from Alternative.me API.
     Returns: {'value': 50, 'classification': 'Neutral'}
     """
-    url = "https://api.alternative.me/fng/"
     try:
-        resp = requests.get(url, timeout=5)
+        resp = http_client.get(FEAR_GREED_URL, timeout=5)
+        resp.raise_for_status()
+        return _parse_fear_greed(resp.json())
+    except Exception as e:
+        print(f"Error fetching Fear & Greed Index: {e}")
+    
+    return dict(FEAR_GREED_DEFAULT)
+
+async def get_fear_greed_index_async():
+    """Async version of get_fear_greed_index."""
+    try:
+        resp = await http_client.aget(FEAR_GREED_URL, timeout=5)
         resp.raise_for_status()
-        data = resp.json()
-        
-        if data.get("data") and len(data["data"]) > 0:
-            latest = data["data"][0]
-            return {
-                "value": int(latest.get("value", 50)),
-                "classification": latest.get("value_classification", "Neutral")
-            }
+        return _parse_fear_greed(resp.json())
     except Exception as e:
         print(f"Error fetching Fear & Greed Index: {e}")
     
-    return {"value": 50, "classification": "Neutral"}
+    return dict(FEAR_GREED_DEFAULT)
+
+def _parse_ticker_snapshot(data):
+    """Parse the /ticker/24hr payload's USDT pairs into ranked arrays."""
+    usdt_pairs = [item for item in data if item["symbol"].endswith("USDT")]
+    
+    price = np.array([float(item["lastPrice"]) for item in usdt_pairs], dtype=np.float64)
+    change = np.array([float(item.get("priceChangePercent", 0)) for item in usdt_pairs], dtype=np.float64)
+    volume = np.array([float(item.get("quoteVolume", 0)) for item in usdt_pairs], dtype=np.float64)
+    
+    # Stable descending sorts keep upstream order for ties, like sorted(reverse=True)
+    liquid = np.flatnonzero(volume > MIN_MOVER_VOLUME)
+    return {
+        "symbols": [item["symbol"].replace("USDT", "") for item in usdt_pairs],
+        "price": price,
+        "change": change,
+        "volume": volume,
+        "by_volume": np.argsort(-volume, kind="stable"),
+        "by_change": liquid[np.argsort(-change[liquid], kind="stable")]
+    }
+
+def _snapshot_is_fresh():
+    return _snapshot is not None and time.monotonic() - _snapshot_at < SNAPSHOT_TTL
+
+def get_ticker_snapshot():
+    """
+    Return the cached 24hr ticker snapshot, refreshing it when older than
+    SNAPSHOT_TTL. Concurrent callers share a single refresh; if it fails
+    the previous snapshot is served. Returns None if none is available.
+    """
+    global _snapshot, _snapshot_at
+    if _snapshot_is_fresh():
+        return _snapshot
+    
+    with _snapshot_lock:
+        # Another caller may have refreshed it while we waited
+        if _snapshot_is_fresh():
+            return _snapshot
+        try:
+            resp = http_client.get(TICKER_24HR_URL, timeout=10)
+            resp.raise_for_status()
+            _snapshot = _parse_ticker_snapshot(resp.json())
+            _snapshot_at = time.monotonic()
+        except Exception as e:
+            print(f"Error fetching 24hr ticker: {e}")
+    return _snapshot
+
+async def get_ticker_snapshot_async():
+    """Async version of get_ticker_snapshot, sharing the same cache."""
+    global _snapshot, _snapshot_at, _snapshot_async_lock
+    if _snapshot_is_fresh():
+        return _snapshot
+    
+    if _snapshot_async_lock is None:
+        _snapshot_async_lock = asyncio.Lock()
+    async with _snapshot_async_lock:
+        if _snapshot_is_fresh():
+            return _snapshot
+        try:
+            resp = await http_client.aget(TICKER_24HR_URL, timeout=10)
+            resp.raise_for_status()
+            _snapshot = _parse_ticker_snapshot(resp.json())
+            _snapshot_at = time.monotonic()
+        except Exception as e:
+            print(f"Error fetching 24hr ticker: {e}")
+    return _snapshot
+
+def _coin_row(snapshot, i):
+    return {
+        "symbol": snapshot["symbols"][i],
+        "price": float(snapshot["price"][i]),
+        "change_24h": float(snapshot["change"][i])
+    }
+
+def _top_coins(snapshot, limit):
+    if snapshot is None:
+        return []
+    
+    top_coins = []
+    for i in snapshot["by_volume"][:limit]:
+        row = _coin_row(snapshot, i)
+        row["volume"] = float(snapshot["volume"][i])
+        top_coins.append(row)
+    
+    return top_coins
+
+def _gainers_losers(snapshot, limit):
+    if snapshot is None or limit <= 0:
+        return {"gainers": [], "losers": []}
+    
+    # Only pairs with reasonable volume, ranked by price change
+    by_change = snapshot["by_change"]
+    gainers = [_coin_row(snapshot, i) for i in by_change[:limit]]
+    losers = [_coin_row(snapshot, i) for i in by_change[::-1][:limit]]
+    
+    return {"gainers": gainers, "losers": losers}
 
 def get_top_coins(limit=10):
     """
     Fetch top coins by 24h volume from Binance.
     Returns list of dicts with symbol, price, change_24h
     """
-    url = "https://api.binance.com/api/v3/ticker/24hr"
-    try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        
-        # Filter USDT pairs only
-        usdt_pairs = [item for item in data if item["symbol"].endswith("USDT")]
-        
-        # Sort by quote volume (trading volume in USDT)
-        sorted_coins = sorted(usdt_pairs, key=lambda x: float(x.get("quoteVolume", 0)), reverse=True)
-        
-        top_coins = []
-        for coin in sorted_coins[:limit]:
-            symbol = coin["symbol"].replace("USDT", "")
-            top_coins.append({
-                "symbol": symbol,
-                "price": float(coin["lastPrice"]),
-                "change_24h": float(coin["priceChangePercent"]),
-                "volume": float(coin["quoteVolume"])
-            })
-        
-        return top_coins
-    except Exception as e:
-        print(f"Error fetching top coins: {e}")
-        return []
+    return _top_coins(get_ticker_snapshot(), limit)
+
+async def get_top_coins_async(limit=10):
+    """Async version of get_top_coins."""
+    return _top_coins(await get_ticker_snapshot_async(), limit)
 
 def get_gainers_losers(limit=5):
     """
     Get top gainers and losers in last 24h.
     Returns: {'gainers': [...], 'losers': [...]}
     """
-    url = "https://api.binance.com/api/v3/ticker/24hr"
-    try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        
-        # Filter USDT pairs with reasonable volume
-        usdt_pairs = [item for item in data if item["symbol"].endswith("USDT") and float(item.get("quoteVolume", 0)) > 1000000]
-        
-        # Sort by price change
-        sorted_by_change = sorted(usdt_pairs, key=lambda x: float(x.get("priceChangePercent", 0)), reverse=True)
-        
-        gainers = []
-        for coin in sorted_by_change[:limit]:
-            symbol = coin["symbol"].replace("USDT", "")
-            gainers.append({
-                "symbol": symbol,
-                "price": float(coin["lastPrice"]),
-                "change_24h": float(coin["priceChangePercent"])
-            })
-        
-        losers = []
-        for coin in sorted_by_change[-limit:]:
-            symbol = coin["symbol"].replace("USDT", "")
-            losers.append({
-                "symbol": symbol,
-                "price": float(coin["lastPrice"]),
-                "change_24h": float(coin["priceChangePercent"])
-            })
-        
-        return {"gainers": gainers, "losers": list(reversed(losers))}
-    except Exception as e:
-        print(f"Error fetching gainers/losers: {e}")
-        return {"gainers": [], "losers": []}
+    return _gainers_losers(get_ticker_snapshot(), limit)
+
+async def get_gainers_losers_async(limit=5):
+    """Async version of get_gainers_losers."""
+    return _gainers_losers(await get_ticker_snapshot_async(), limit)
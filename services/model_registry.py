@@ -0,0 +1,115 @@
+"""
+Model Registry
+Trained models on disk with their metadata, kept warm in memory and retrained on a schedule
+"""
+import os
+import json
+import time
+import glob
+import threading
+import joblib
+
+MODEL_DIR = os.path.join("data", "models")
+RETRAIN_INTERVAL_SECONDS = 6 * 3600    # retrain at least this often
+MIN_NEW_POINTS = 24                    # ...or once this many new data points have arrived
+SCHEDULER_INTERVAL_SECONDS = 15 * 60
+
+# name -> (model, metadata)
+_models = {}
+_lock = threading.Lock()
+_scheduler_stop = threading.Event()
+_scheduler = None
+
+def _paths(name):
+    return os.path.join(MODEL_DIR, f"{name}.joblib"), os.path.join(MODEL_DIR, f"{name}.json")
+
+def _load(name):
+    model_path, meta_path = _paths(name)
+    try:
+        with open(meta_path, "r") as f:
+            metadata = json.load(f)
+        return joblib.load(model_path), metadata
+    except (OSError, json.JSONDecodeError, EOFError, ValueError) as e:
+        print(f"Error loading model {name}: {e}")
+        return None
+
+def load_models():
+    """Warm-load every saved model into memory."""
+    for meta_path in glob.glob(os.path.join(MODEL_DIR, "*.json")):
+        name = os.path.basename(meta_path)[:-len(".json")]
+        loaded = _load(name)
+        if loaded is not None:
+            with _lock:
+                _models[name] = loaded
+
+def get_model(name):
+    """Return (model, metadata), loading from disk on first use; (None, None) if never trained."""
+    with _lock:
+        if name in _models:
+            return _models[name]
+    loaded = _load(name) if os.path.exists(_paths(name)[1]) else None
+    if loaded is None:
+        return None, None
+    with _lock:
+        return _models.setdefault(name, loaded)
+
+def save_model(name, model, **metadata):
+    """
+    Persist a trained model as the next version of `name` and serve it from now on.
+    metadata (training range, metrics, ...) is stored next to it as JSON.
+    """
+    _, previous = get_model(name)
+    metadata = {
+        **metadata,
+        "name": name,
+        "version": (previous or {}).get("version", 0) + 1,
+        "trained_at": time.time()
+    }
+    model_path, meta_path = _paths(name)
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    # Model first, metadata last: a crash in between leaves the previous version readable
+    joblib.dump(model, model_path + ".tmp")
+    os.replace(model_path + ".tmp", model_path)
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+    with _lock:
+        _models[name] = (model, metadata)
+    return metadata
+
+def needs_retrain(metadata, new_points):
+    """True when there is no model yet, it is older than the retrain interval, or enough new data arrived."""
+    if metadata is None:
+        return True
+    return (time.time() - metadata["trained_at"] >= RETRAIN_INTERVAL_SECONDS
+            or new_points >= MIN_NEW_POINTS)
+
+def list_models():
+    with _lock:
+        return [metadata for _, metadata in _models.values()]
+
+def _run_scheduler(refreshers):
+    while not _scheduler_stop.is_set():
+        for refresh in refreshers:
+            try:
+                refresh()
+            except Exception as e:
+                print(f"Error refreshing model with {refresh.__name__}: {e}")
+        _scheduler_stop.wait(SCHEDULER_INTERVAL_SECONDS)
+
+def start_model_scheduler(refreshers):
+    """
+    Warm-load saved models, then call each refresher now and every
+    SCHEDULER_INTERVAL_SECONDS; refreshers decide themselves whether to retrain.
+    """
+    global _scheduler
+    load_models()
+    if _scheduler is None:
+        _scheduler_stop.clear()
+        _scheduler = threading.Thread(target=_run_scheduler, args=(refreshers,), name="model-scheduler", daemon=True)
+        _scheduler.start()
+
+def stop_model_scheduler():
+    global _scheduler
+    _scheduler_stop.set()
+    _scheduler = None
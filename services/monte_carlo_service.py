@@ -0,0 +1,186 @@
+"""
+Monte Carlo Service
+Resamples a backtest's trades or bar returns to see how much of its result is luck
+"""
+import os
+import numpy as np
+from services.binance_service import get_binance_candles, resolve_symbol, MAX_RANGE_KLINES
+from services.backtesting_service import simulate_positions
+from services.candle_store import CLOSE
+from services.strategy_registry import get_strategy, SERIES
+from services.shared_arrays import pool_map
+
+METHODS = ('bootstrap', 'shuffle', 'block')
+MAX_SIMULATIONS = 100000
+SIMULATION_CHUNK = 1000          # simulations per task; fixed so a seed gives the same result on any machine
+MAX_CHUNK_CELLS = 2_000_000      # ...but fewer for long paths, bounding each (simulations, path) array
+MAX_DAYS = MAX_RANGE_KLINES // 24   # same candle bound as the range API
+MONTE_CARLO_WORKERS = os.cpu_count() or 2
+MIN_PARALLEL_CELLS = 5_000_000   # simulations x path length below this run inline
+HISTOGRAM_BINS = 30
+
+def _path_metrics(pnl, initial_capital):
+    """Final capital and max drawdown (%) of each row of a (simulations, steps) P&L matrix."""
+    equity = initial_capital + np.cumsum(pnl, axis=1)
+    peaks = np.maximum.accumulate(np.maximum(equity, initial_capital), axis=1)
+    drawdown = ((peaks - equity) / peaks).max(axis=1) * 100 if pnl.shape[1] else np.zeros(len(pnl))
+    return equity[:, -1] if pnl.shape[1] else np.full(len(pnl), float(initial_capital)), drawdown
+
+def _run_win_rates(held, starts, pnl):
+    """
+    Win rate (%) per row, where a trade starts at each `starts` bar and runs
+    over the held bars after it; its profit is the P&L summed over the run.
+    """
+    labels = np.cumsum(starts.ravel()) - 1
+    mask = held.ravel()
+    run_profit = np.bincount(labels[mask], weights=pnl.ravel()[mask], minlength=int(starts.sum()))
+    run_row = np.nonzero(starts)[0]
+    wins = np.bincount(run_row, weights=run_profit > 0, minlength=len(held))
+    runs = np.bincount(run_row, minlength=len(held))
+    return np.divide(wins * 100, runs, out=np.zeros(len(held)), where=runs > 0)
+
+def _simulate(method, data, simulations, seed, block_size, initial_capital):
+    """
+    One chunk of simulations. data is the closed trades' profits for
+    'bootstrap'/'shuffle' and (trade id per bar, -1 when flat; bar P&L) for 'block'.
+    Returns (final_capital, max_drawdown_pct, win_rate) arrays.
+    """
+    rng = np.random.default_rng(seed)
+    if method == 'block':
+        trade_ids, bar_pnl = data
+        bars = len(bar_pnl)
+        blocks = -(-bars // block_size)
+        # Circular block bootstrap keeps each block's autocorrelation intact
+        starts = rng.integers(0, bars, (simulations, blocks))
+        idx = ((starts[:, :, None] + np.arange(block_size)) % bars).reshape(simulations, -1)[:, :bars]
+        pnl, ids = bar_pnl[idx], trade_ids[idx]
+        held = ids >= 0
+        # A bar continues a trade only if it directly follows the same trade's previous bar;
+        # pieces of trades joined at block edges count as separate trades
+        continues = np.zeros_like(held)
+        continues[:, 1:] = (ids[:, 1:] == ids[:, :-1]) & (idx[:, 1:] == idx[:, :-1] + 1)
+        win_rate = _run_win_rates(held, held & ~continues, pnl)
+    else:
+        profits = data
+        if method == 'bootstrap':
+            pnl = profits[rng.integers(0, len(profits), (simulations, len(profits)))]
+        else:
+            pnl = rng.permuted(np.tile(profits, (simulations, 1)), axis=1)
+        win_rate = (pnl > 0).mean(axis=1) * 100 if len(profits) else np.zeros(simulations)
+    final_capital, drawdown = _path_metrics(pnl, initial_capital)
+    return final_capital, drawdown, win_rate
+
+def _run_simulations(method, data, simulations, seed, block_size, initial_capital):
+    """Run every chunk, across processes when the work is large enough to pay for them."""
+    path_length = len(data[1]) if method == 'block' else len(data)
+    chunk = max(1, min(SIMULATION_CHUNK, MAX_CHUNK_CELLS // max(path_length, 1)))
+    chunks = [chunk] * (simulations // chunk)
+    if simulations % chunk:
+        chunks.append(simulations % chunk)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks = [(method, data, size, s, block_size, initial_capital) for size, s in zip(chunks, seeds)]
+
+    if MONTE_CARLO_WORKERS < 2 or len(tasks) < 2 or simulations * path_length < MIN_PARALLEL_CELLS:
+        results = [_simulate(*task) for task in tasks]
+    else:
+        results = pool_map(_simulate, *zip(*tasks))
+    return [np.concatenate(column) for column in zip(*results)]
+
+def _distribution(values, observed, confidence):
+    tail = (1 - confidence) / 2 * 100
+    lo, hi = np.percentile(values, [tail, 100 - tail])
+    # A shuffle leaves final capital and win rate unchanged up to rounding; give those a unit-wide range
+    spread = values.max() - values.min()
+    value_range = None if spread > 1e-9 * max(1.0, abs(values.max())) else (values.min() - 0.5, values.max() + 0.5)
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS, range=value_range)
+    return {
+        'observed': float(observed),
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'ci': [float(lo), float(hi)],
+        'percentiles': {str(p): float(v) for p, v in zip((5, 25, 50, 75, 95), np.percentile(values, [5, 25, 50, 75, 95]))},
+        'histogram': {'edges': edges.tolist(), 'counts': counts.tolist()}
+    }
+
+def run_monte_carlo(coin, strategy, params, days=30, method='bootstrap', simulations=5000,
+                    block_size=24, confidence=0.95, initial_capital=10000, seed=None):
+    """
+    Monte Carlo robustness check of a backtest.
+
+    Args:
+        coin: Cryptocurrency id or Binance symbol
+        strategy: Registered strategy name
+        params: Strategy parameters
+        days: Number of days of historical data (at most MAX_DAYS)
+        method: 'bootstrap' (resample trades with replacement), 'shuffle'
+            (reorder trades; only the path changes) or 'block' (circular block
+            bootstrap of the strategy's hourly P&L)
+        simulations: Number of resampled paths
+        block_size: Bars per block for 'block' (capped at the number of bars)
+        confidence: Width of the reported confidence intervals
+        seed: Optional seed for reproducible runs
+    """
+    if method not in METHODS:
+        return {'error': f'Unknown method: {method}'}
+    if not 0 < simulations <= MAX_SIMULATIONS:
+        return {'error': f'simulations must be between 1 and {MAX_SIMULATIONS}'}
+    if not 0 < confidence < 1 or block_size < 1:
+        return {'error': 'confidence must be in (0, 1) and block_size at least 1'}
+    if not 0 < days <= MAX_DAYS:
+        return {'error': f'days must be between 1 and {MAX_DAYS}'}
+
+    symbol = resolve_symbol(coin)
+    if not symbol:
+        return {'error': f'Unknown coin: {coin}'}
+    candles = get_binance_candles(symbol, interval='1h', limit=days * 24, closed_only=True)
+    if not len(candles):
+        return {'error': 'Failed to fetch historical data'}
+
+    try:
+        definition = get_strategy(strategy)
+    except ValueError as e:
+        return {'error': str(e)}
+    series = {name: candles[:, column] for name, column in SERIES.items()}
+    try:
+        buy, sell, _, _, _ = definition.evaluate(series, params)
+    except ValueError as e:
+        return {'error': str(e)}
+    entries, exits = simulate_positions(buy, sell)
+    entries = entries[:len(exits)]   # like calculate_metrics, an open position is not counted
+    if not len(exits):
+        return {'error': 'The backtest has no closed trades to resample'}
+
+    # Same per-unit P&L as run_backtest's trades
+    closes = candles[:, CLOSE]
+    profits = closes[exits] - closes[entries]
+    steps = np.zeros(len(closes) + 1)
+    steps[entries + 1] += 1
+    steps[exits + 1] -= 1
+    held = np.cumsum(steps)[:-1] > 0          # bar t's move belongs to a trade
+    bar_pnl = np.where(held, np.diff(closes, prepend=closes[0]), 0.0)
+    opened = np.zeros(len(closes) + 1)
+    opened[entries + 1] = 1
+    trade_ids = np.where(held, np.cumsum(opened)[:-1] - 1, -1).astype(np.int64)
+
+    data = (trade_ids, bar_pnl) if method == 'block' else profits
+    block_size = min(block_size, len(closes))   # a longer block only wraps around the same bars
+    final_capital, drawdown, win_rate = _run_simulations(
+        method, data, simulations, seed, block_size, initial_capital
+    )
+
+    observed_final, observed_drawdown = _path_metrics(profits[None, :], initial_capital)
+    observed_win_rate = (profits > 0).mean() * 100
+    return {
+        'success': True,
+        'symbol': symbol,
+        'strategy': strategy,
+        'params': params,
+        'method': method,
+        'simulations': simulations,
+        'trades': len(profits),
+        'confidence': confidence,
+        'final_capital': _distribution(final_capital, observed_final[0], confidence),
+        'max_drawdown_pct': _distribution(drawdown, observed_drawdown[0], confidence),
+        'win_rate': _distribution(win_rate, observed_win_rate, confidence),
+        'probability_of_loss': float((final_capital < initial_capital).mean())
+    }
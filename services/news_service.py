@@ -1,45 +1,59 @@
-import requests
+import asyncio
+from services import http_client
 from textblob import TextBlob
 
+NEWS_URL = "https://min-api.cryptocompare.com/data/v2/news/?lang=EN"
+
+def _parse_news(data, limit):
+    news_items = []
+    raw_data = data.get("Data", [])
+    
+    # Handle both list and dict responses
+    if isinstance(raw_data, dict):
+        raw_data = []
+    
+    for item in raw_data[:limit]:
+        try:
+            title = item.get("title", "")
+            body = item.get("body", "")
+            
+            # Analyze sentiment
+            sentiment_score, sentiment_label = analyze_sentiment(title + " " + body)
+            
+            news_items.append({
+                "title": title,
+                "url": item.get("url", ""),
+                "source": item.get("source_info", {}).get("name", "Unknown") if isinstance(item.get("source_info"), dict) else "Unknown",
+                "body": body,
+                "sentiment_score": sentiment_score,
+                "sentiment_label": sentiment_label
+            })
+        except Exception as e:
+            print(f"Error processing news item: {e}")
+            continue
+            
+    return news_items
+
 def get_crypto_news(limit=20):
     """
     Fetch latest crypto news from CryptoCompare.
     Returns a list of dicts: {'title', 'url', 'source', 'body', 'sentiment'}
     """
-    url = f"https://min-api.cryptocompare.com/data/v2/news/?lang=EN"
     try:
-        resp = requests.get(url, timeout=10)
+        resp = http_client.get(NEWS_URL, timeout=10)
+        resp.raise_for_status()
+        return _parse_news(resp.json(), limit)
+    except Exception as e:
+        print(f"Error fetching news: {e}")
+        return []
+
+async def get_crypto_news_async(limit=20):
+    """Async version of get_crypto_news; sentiment scoring runs in a worker thread."""
+    try:
+        resp = await http_client.aget(NEWS_URL, timeout=10)
         resp.raise_for_status()
-        data = resp.json()
-        
-        news_items = []
-        raw_data = data.get("Data", [])
-        
-        # Handle both list and dict responses
-        if isinstance(raw_data, dict):
-            raw_data = []
-        
-        for item in raw_data[:limit]:
-            try:
-                title = item.get("title", "")
-                body = item.get("body", "")
-                
-                # Analyze sentiment
-                sentiment_score, sentiment_label = analyze_sentiment(title + " " + body)
-                
-                news_items.append({
-                    "title": title,
-                    "url": item.get("url", ""),
-                    "source": item.get("source_info", {}).get("name", "Unknown") if isinstance(item.get("source_info"), dict) else "Unknown",
-                    "body": body,
-                    "sentiment_score": sentiment_score,
-                    "sentiment_label": sentiment_label
-                })
-            except Exception as e:
-                print(f"Error processing news item: {e}")
-                continue
-                
-        return news_items
+        # TextBlob is CPU-bound; scoring every article on the event loop would stall other requests
+        return await asyncio.to_thread(lambda: _parse_news(resp.json(), limit))
     except Exception as e:
         print(f"Error fetching news: {e}")
         return []
@@ -0,0 +1,294 @@
+"""
+Strategy Optimization Service
+Parameter sweeps over one candle array, spread across worker processes
+"""
+import os
+import json
+import itertools
+import threading
+from collections import OrderedDict
+import numpy as np
+from services.binance_service import get_binance_candles, resolve_symbol
+from services.backtesting_service import run_strategy, calculate_metrics
+from services.candle_store import OPEN_TIME
+from services.strategy_registry import get_strategy
+from services.shared_arrays import map_shared
+
+MAX_SWEEP_COMBINATIONS = 5000
+MAX_GRID_SIZE = 4 * MAX_SWEEP_COMBINATIONS   # raw product allowed before short >= long pruning
+SWEEP_WORKERS = os.cpu_count() or 2
+MIN_PARALLEL_COMBINATIONS = 16   # smaller grids run inline, a pool would cost more than it saves
+SWEEP_CHUNK_SIZE = 25
+
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+WINDOW_CACHE_SIZE = 4096
+
+# Finished walk-forward windows, keyed by everything that determines their result
+_window_cache = OrderedDict()
+_window_cache_lock = threading.Lock()
+
+def _evaluate(candles, strategy, combos):
+    results = []
+    for params in combos:
+        trades, _ = run_strategy(candles, strategy, params)
+        results.append({'params': params, 'metrics': calculate_metrics(trades)})
+    return results
+
+def expand_grid(strategy, grid):
+    """
+    Cartesian product of the grid values as a list of params dicts.
+    Combinations that cannot produce a crossover (short >= long) are skipped.
+    Raises ValueError for non-numeric values or a product over MAX_GRID_SIZE.
+    """
+    names = [name for name in get_strategy(strategy).params if name in grid]
+    unknown = set(grid) - set(names)
+    if unknown:
+        raise ValueError(f"Unknown parameters for {strategy}: {', '.join(sorted(unknown))}")
+
+    values = [grid[name] if isinstance(grid[name], list) else [grid[name]] for name in names]
+    for name, options in zip(names, values):
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in options):
+            raise ValueError(f"Grid values for {name} must be numbers")
+    size = 1
+    for options in values:
+        size *= len(options)
+    if size > MAX_GRID_SIZE:
+        raise ValueError(f'Too many combinations ({size} > {MAX_GRID_SIZE})')
+    combos = [dict(zip(names, combo)) for combo in itertools.product(*values)]
+    if strategy == 'sma_crossover':
+        combos = [
+            c for c in combos
+            if c.get('short_period', 10) < c.get('long_period', 30)
+        ]
+    return names, combos
+
+def _run_combos(candles, strategy, combos):
+    chunks = [(strategy, combos[i:i + SWEEP_CHUNK_SIZE]) for i in range(0, len(combos), SWEEP_CHUNK_SIZE)]
+    parallel = len(combos) >= MIN_PARALLEL_COMBINATIONS
+    results = []
+    for chunk_results in map_shared(candles, _evaluate, chunks, SWEEP_WORKERS, parallel):
+        results += chunk_results
+    return results
+
+def _heatmap(names, grid, results, metric):
+    """
+    Best metric value for each pair of the first two swept parameters
+    (maximised over any remaining parameters); None where no combination ran.
+    """
+    swept = [name for name in names if isinstance(grid[name], list) and len(grid[name]) > 1]
+    if len(swept) < 2:
+        return None
+    x_name, y_name = swept[:2]
+    x_values, y_values = list(grid[x_name]), list(grid[y_name])
+    x_pos = {v: i for i, v in enumerate(x_values)}
+    y_pos = {v: i for i, v in enumerate(y_values)}
+
+    values = np.full((len(y_values), len(x_values)), np.nan)
+    for result in results:
+        i = y_pos[result['params'][y_name]]
+        j = x_pos[result['params'][x_name]]
+        values[i, j] = np.fmax(values[i, j], result['metrics'][metric])
+
+    return {
+        'x': x_name,
+        'y': y_name,
+        'x_values': x_values,
+        'y_values': y_values,
+        'values': np.where(np.isnan(values), None, values).tolist()
+    }
+
+def _prepare_grid(strategy, grid, metric):
+    """Validate a sweep request; returns (names, combos) or raises ValueError."""
+    get_strategy(strategy)
+    if metric not in calculate_metrics([]):
+        raise ValueError(f'Unknown metric: {metric}')
+    names, combos = expand_grid(strategy, grid)
+    if not combos:
+        raise ValueError('Parameter grid is empty')
+    if len(combos) > MAX_SWEEP_COMBINATIONS:
+        raise ValueError(f'Too many combinations ({len(combos)} > {MAX_SWEEP_COMBINATIONS})')
+    return names, combos
+
+def run_sweep(coin, strategy, grid, days=30, metric='total_profit_pct', top=20):
+    """
+    Backtest every combination of the parameter grid over the same candles.
+
+    Args:
+        coin: Cryptocurrency id (bitcoin, ethereum, etc.)
+        strategy: Registered strategy name ('sma_crossover', 'rsi' or a custom one)
+        grid: {param: [values]}; scalar values are held fixed
+        days: Number of days of historical data
+        metric: calculate_metrics key used for ranking and the heatmap
+        top: Number of ranked results to return
+    """
+    try:
+        names, combos = _prepare_grid(strategy, grid, metric)
+    except ValueError as e:
+        return {'error': str(e)}
+
+    symbol = resolve_symbol(coin)
+    if not symbol:
+        return {'error': f'Unknown coin: {coin}'}
+    candles = get_binance_candles(symbol, interval='1h', limit=days * 24, closed_only=True)
+    if not len(candles):
+        return {'error': 'Failed to fetch historical data'}
+
+    results = _run_combos(candles, strategy, combos)
+    # Stable sort keeps grid order among ties
+    ranked = sorted(results, key=lambda r: r['metrics'][metric], reverse=True)
+
+    return {
+        'success': True,
+        'strategy': strategy,
+        'metric': metric,
+        'combinations': len(results),
+        'candles': len(candles),
+        'results': [dict(rank=i + 1, **r) for i, r in enumerate(ranked[:top])],
+        'heatmap': _heatmap(names, grid, results, metric)
+    }
+
+def _trades_from(trades, start_ms):
+    """Keep the BUY/SELL round trips that open at or after start_ms."""
+    kept, keep = [], False
+    for trade in trades:
+        if trade['action'] == 'BUY':
+            keep = trade['timestamp'] >= start_ms
+        if keep:
+            kept.append(trade)
+    return kept
+
+def _walk_forward_window(candles, strategy, combos, metric, train_lo, test_lo, test_hi):
+    """
+    Pick the best combination on candles[train_lo:test_lo], then trade it on
+    candles[test_lo:test_hi]. The test run starts at train_lo so indicators
+    are warmed up, but only positions opened inside the test window count.
+    """
+    train = _evaluate(candles[train_lo:test_lo], strategy, combos)
+    # max() keeps the first of equal scores, i.e. grid order, like the sweep ranking
+    best = max(train, key=lambda r: r['metrics'][metric])
+
+    trades, _ = run_strategy(candles[train_lo:test_hi], strategy, best['params'])
+    test_start = int(candles[test_lo, OPEN_TIME])
+    return {
+        'params': best['params'],
+        'in_sample': best['metrics'],
+        'trades': _trades_from(trades, test_start)
+    }
+
+def walk_forward_windows(times, train_ms, test_ms):
+    """
+    Split hourly open times into (train_start, test_start, test_end) windows.
+    Test windows sit on fixed multiples of test_ms since the epoch, so a
+    window keeps the same boundaries as history grows and can be reused.
+    """
+    if not len(times):
+        return []
+    first, end = int(times[0]), int(times[-1]) + HOUR_MS
+    test_start = -(-(first + train_ms) // test_ms) * test_ms
+    windows = []
+    while test_start < end:
+        windows.append((test_start - train_ms, test_start, test_start + test_ms))
+        test_start += test_ms
+    return windows
+
+def _equity_curve(trades, initial_capital):
+    equity = initial_capital
+    curve = []
+    for trade in trades:
+        if trade['action'] == 'SELL':
+            equity += trade['profit']
+            curve.append({'timestamp': trade['timestamp'], 'equity': equity})
+    return curve
+
+def run_walk_forward(coin, strategy, grid, days=180, train_days=30, test_days=7,
+                     metric='total_profit_pct', initial_capital=10000):
+    """
+    Walk-forward optimization: for each rolling window, choose parameters
+    on the train period and score them on the following test period.
+
+    Args:
+        coin: Cryptocurrency id (bitcoin, ethereum, etc.)
+        strategy: Registered strategy name ('sma_crossover', 'rsi' or a custom one)
+        grid: {param: [values]} searched on every train window
+        days: Number of days of historical data
+        train_days / test_days: Window lengths
+        metric: calculate_metrics key used to choose parameters
+    """
+    try:
+        _, combos = _prepare_grid(strategy, grid, metric)
+        definition = get_strategy(strategy)
+    except ValueError as e:
+        return {'error': str(e)}
+    if train_days <= 0 or test_days <= 0:
+        return {'error': 'train_days and test_days must be positive'}
+
+    symbol = resolve_symbol(coin)
+    if not symbol:
+        return {'error': f'Unknown coin: {coin}'}
+    candles = get_binance_candles(symbol, interval='1h', limit=days * 24, closed_only=True)
+    if not len(candles):
+        return {'error': 'Failed to fetch historical data'}
+
+    times = candles[:, OPEN_TIME]
+    train_ms, test_ms = train_days * DAY_MS, test_days * DAY_MS
+    windows = walk_forward_windows(times, train_ms, test_ms)
+    if not windows:
+        return {'error': 'Not enough history for one walk-forward window'}
+
+    last_end = int(times[-1]) + HOUR_MS
+    # Rules and defaults are part of the key so redefining a custom strategy never serves old windows
+    base_key = (symbol, strategy, definition.entry, definition.exit,
+                json.dumps(definition.params, sort_keys=True), json.dumps(grid, sort_keys=True),
+                metric, train_ms, test_ms)
+
+    results, tasks, task_windows = {}, [], []
+    with _window_cache_lock:
+        for window in windows:
+            key = base_key + window
+            if key in _window_cache:
+                _window_cache.move_to_end(key)
+                results[window] = dict(_window_cache[key], cached=True)
+                continue
+            train_lo, test_lo, test_hi = np.searchsorted(times, window)
+            if test_hi > test_lo:
+                tasks.append((strategy, combos, metric, int(train_lo), int(test_lo), int(test_hi)))
+                task_windows.append(window)
+
+    for window, result in zip(task_windows, map_shared(candles, _walk_forward_window, tasks, SWEEP_WORKERS)):
+        results[window] = dict(result, cached=False)
+        # The newest test window is still filling up; only finished ones are reused
+        if window[2] <= last_end:
+            with _window_cache_lock:
+                _window_cache[base_key + window] = result
+                while len(_window_cache) > WINDOW_CACHE_SIZE:
+                    _window_cache.popitem(last=False)
+
+    window_rows, trades = [], []
+    for train_start, test_start, test_end in windows:
+        result = results.get((train_start, test_start, test_end))
+        if result is None:
+            continue
+        trades += result['trades']
+        window_rows.append({
+            'train_start': train_start,
+            'test_start': test_start,
+            'test_end': test_end,
+            'complete': test_end <= last_end,
+            'cached': result['cached'],
+            'params': result['params'],
+            'in_sample': result['in_sample'],
+            'out_of_sample': calculate_metrics(result['trades'], initial_capital)
+        })
+
+    return {
+        'success': True,
+        'strategy': strategy,
+        'metric': metric,
+        'train_days': train_days,
+        'test_days': test_days,
+        'windows': window_rows,
+        'trades': trades,
+        'metrics': calculate_metrics(trades, initial_capital),
+        'equity_curve': _equity_curve(trades, initial_capital)
+    }
@@ -0,0 +1,167 @@
+"""
+Portfolio Backtesting Service
+Runs one strategy over many coins at once on a time-aligned price matrix
+"""
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from services.binance_service import get_binance_candles, resolve_symbol
+from services.backtesting_service import strategy_signals, simulate_positions
+from services.chart_data import json_column
+from services.candle_store import OPEN_TIME, CLOSE
+
+ALLOCATIONS = ('equal_weight', 'fixed_fraction')
+LOAD_WORKERS = 8
+BARS_PER_YEAR = 24 * 365   # hourly bars
+
+def _ffill(matrix):
+    """Forward-fill NaNs down each column; leading NaNs stay NaN."""
+    rows = np.where(np.isnan(matrix), 0, np.arange(len(matrix))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return matrix[rows, np.arange(matrix.shape[1])]
+
+def load_price_matrix(symbols, days):
+    """
+    Load closed hourly candles for every symbol and align them on one time axis.
+    Returns (timestamps, closes) where closes is (bars, symbols); a coin's
+    missing bars are forward-filled and bars before its first candle are NaN.
+    """
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as pool:
+        candles = list(pool.map(
+            lambda symbol: get_binance_candles(symbol, interval='1h', limit=days * 24, closed_only=True),
+            symbols
+        ))
+
+    timestamps = np.unique(np.concatenate([c[:, OPEN_TIME] for c in candles]))
+    closes = np.full((len(timestamps), len(symbols)), np.nan)
+    for j, c in enumerate(candles):
+        closes[np.searchsorted(timestamps, c[:, OPEN_TIME]), j] = c[:, CLOSE]
+    return timestamps, _ffill(closes)
+
+def positions_from_signals(buy, sell):
+    """
+    Long/flat position matrix (1.0 / 0.0) from buy and sell signal matrices.
+    The position follows the last signal, forward-filled down each column;
+    columns where one bar is both a buy and a sell fall back to simulate_positions.
+    """
+    state = np.where(buy, 1.0, np.where(sell, 0.0, np.nan))
+    state[0] = np.where(np.isnan(state[0]), 0.0, state[0])
+    positions = _ffill(state)
+
+    for j in np.flatnonzero((buy & sell).any(axis=0)):
+        entries, exits = simulate_positions(buy[:, j], sell[:, j])
+        steps = np.zeros(len(buy) + 1)
+        steps[entries] += 1
+        steps[exits] -= 1
+        positions[:, j] = np.cumsum(steps)[:-1]
+    return positions
+
+def allocate(positions, allocation='equal_weight', fraction=None):
+    """
+    Portfolio weights from a position matrix, sharing one pool of capital.
+    equal_weight: capital split evenly across the coins currently held.
+    fixed_fraction: each held coin gets `fraction` of equity (default 1/coins),
+    scaled down whenever the total would exceed 100%.
+    """
+    if allocation == 'equal_weight':
+        held = positions.sum(axis=1, keepdims=True)
+        return positions / np.maximum(held, 1)
+
+    fraction = fraction if fraction is not None else 1 / positions.shape[1]
+    weights = positions * fraction
+    gross = weights.sum(axis=1, keepdims=True)
+    return weights / np.maximum(gross, 1)
+
+def _max_drawdown_pct(equity):
+    peaks = np.maximum.accumulate(equity)
+    return float(((peaks - equity) / peaks).max() * 100)
+
+def run_portfolio_backtest(coins, strategy, params, days=365, allocation='equal_weight',
+                           fraction=None, initial_capital=10000):
+    """
+    Backtest one strategy across many coins sharing a single capital pool.
+
+    Args:
+        coins: Cryptocurrency ids (bitcoin, ethereum, etc.) or Binance symbols
+        strategy: Registered strategy name (rules may only use the close series)
+        params: Strategy parameters, applied to every coin
+        days: Number of days of historical data
+        allocation: 'equal_weight' or 'fixed_fraction'
+        fraction: Share of equity per position for 'fixed_fraction'
+    """
+    if not coins:
+        return {'error': 'No coins given'}
+    if allocation not in ALLOCATIONS:
+        return {'error': f'Unknown allocation: {allocation}'}
+    if fraction is not None and not 0 < fraction <= 1:
+        return {'error': 'fraction must be in (0, 1]'}
+
+    symbols = [resolve_symbol(coin) for coin in coins]
+    unknown = [coin for coin, symbol in zip(coins, symbols) if not symbol]
+    if unknown:
+        return {'error': f"Unknown coins: {', '.join(unknown)}"}
+
+    timestamps, closes = load_price_matrix(symbols, days)
+    if not len(timestamps):
+        return {'error': 'Failed to fetch historical data'}
+
+    try:
+        buy, sell, warmup = strategy_signals(closes, strategy, params)
+    except ValueError as e:
+        return {'error': str(e)}
+
+    # Coins listed after the first bar need their own warm-up
+    listed_bars = np.cumsum(np.isfinite(closes), axis=0)
+    ready = listed_bars > warmup
+    positions = positions_from_signals(buy & ready, sell & ready)
+    weights = allocate(positions, allocation, fraction)
+
+    # Weights set at a bar's close earn the next bar's return
+    returns = np.zeros_like(closes)
+    returns[1:] = closes[1:] / closes[:-1] - 1
+    returns[~np.isfinite(returns)] = 0
+    asset_returns = np.zeros_like(closes)
+    asset_returns[1:] = weights[:-1] * returns[1:]
+    portfolio_returns = asset_returns.sum(axis=1)
+
+    equity = initial_capital * np.cumprod(1 + portfolio_returns)
+    prior_equity = np.concatenate(([initial_capital], equity[:-1]))
+    contribution = (asset_returns * prior_equity[:, None]).sum(axis=0)
+    entries = (np.diff(positions, axis=0, prepend=0) > 0).sum(axis=0)
+
+    volatility = portfolio_returns[1:].std() if len(portfolio_returns) > 2 else 0.0
+    sharpe = portfolio_returns[1:].mean() / volatility * np.sqrt(BARS_PER_YEAR) if volatility > 0 else 0.0
+    final_capital = float(equity[-1])
+
+    metrics = {
+        'total_trades': int(entries.sum()),
+        'final_capital': final_capital,
+        'total_profit': final_capital - initial_capital,
+        'total_return_pct': (final_capital / initial_capital - 1) * 100,
+        'max_drawdown_pct': _max_drawdown_pct(equity),
+        'sharpe_ratio': float(sharpe),
+        'volatility_pct': float(volatility * np.sqrt(BARS_PER_YEAR) * 100),
+        'avg_exposure_pct': float(weights.sum(axis=1).mean() * 100)
+    }
+    assets = [
+        {
+            'coin': coin,
+            'symbol': symbol,
+            'trades': int(entries[j]),
+            'time_in_market_pct': float(positions[:, j].mean() * 100),
+            'profit': float(contribution[j])
+        }
+        for j, (coin, symbol) in enumerate(zip(coins, symbols))
+    ]
+
+    return {
+        'success': True,
+        'strategy': strategy,
+        'params': params,
+        'allocation': allocation,
+        'metrics': metrics,
+        'assets': assets,
+        'equity_curve': {
+            'timestamp': timestamps.astype(np.int64).tolist(),
+            'equity': json_column(equity)
+        }
+    }
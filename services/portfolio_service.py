@@ -1,24 +1,11 @@
-import json
-import os
-from collections import defaultdict
-
-PORTFOLIO_FILE = os.path.join("data", "portfolio.json")
+from sqlalchemy import select, insert, func, case
+from services.database import get_engine, transactions_table
 
 def load_portfolio():
-    """Load portfolio transactions from JSON file."""
-    if not os.path.exists(PORTFOLIO_FILE):
-        return []
-    try:
-        with open(PORTFOLIO_FILE, "r") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return []
-
-def save_portfolio(transactions):
-    """Save portfolio transactions to JSON file."""
-    os.makedirs(os.path.dirname(PORTFOLIO_FILE), exist_ok=True)
-    with open(PORTFOLIO_FILE, "w") as f:
-        json.dump(transactions, f, indent=4)
+    """Load portfolio transactions from the database, oldest first."""
+    with get_engine().connect() as conn:
+        rows = conn.execute(select(transactions_table).order_by(transactions_table.c.id))
+        return [dict(row._mapping) for row in rows]
 
 def add_transaction(coin_id, amount, price_per_coin):
     """
@@ -26,32 +13,30 @@ def add_transaction(coin_id, amount, price_per_coin):
     coin_id: str (e.g., 'bitcoin')
     amount: float (positive for buy, negative for sell)
     price_per_coin: float (price in USD at time of trade)
+    Returns the new transaction's id.
     """
-    transactions = load_portfolio()
-    transaction = {
-        "coin_id": coin_id,
-        "amount": float(amount),
-        "price": float(price_per_coin),
-    }
-    transactions.append(transaction)
-    save_portfolio(transactions)
+    with get_engine().begin() as conn:
+        result = conn.execute(insert(transactions_table), {
+            "coin_id": coin_id,
+            "amount": float(amount),
+            "price": float(price_per_coin),
+        })
+        return result.inserted_primary_key[0]
 
 def get_portfolio_summary(current_prices):
     """
     Calculate summary for each coin based on transactions and current prices.
     """
-    transactions = load_portfolio()
-    summary = defaultdict(lambda: {"amount": 0.0, "total_cost": 0.0})
-    
-    # Aggregate transactions
-    for t in transactions:
-        cid = t["coin_id"]
-        amt = t["amount"]
-        price = t["price"]
-        
-        summary[cid]["amount"] += amt
-        if amt > 0:
-            summary[cid]["total_cost"] += amt * price
+    t = transactions_table
+    # Aggregate transactions in the database (indexed by coin_id)
+    query = select(
+        t.c.coin_id,
+        func.sum(t.c.amount).label("amount"),
+        func.sum(case((t.c.amount > 0, t.c.amount * t.c.price), else_=0.0)).label("total_cost")
+    ).group_by(t.c.coin_id)
+    
+    with get_engine().connect() as conn:
+        summary = {row.coin_id: {"amount": row.amount, "total_cost": row.total_cost} for row in conn.execute(query)}
             
     # Calculate PnL
     results = {}
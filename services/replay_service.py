@@ -0,0 +1,201 @@
+"""
+Tick Replay Service
+Backtests strategies against recorded aggTrades with latency and fees
+"""
+import time
+import numpy as np
+from services.binance_service import resolve_symbol
+from services.backtesting_service import simulate_positions, calculate_metrics
+from services.strategy_registry import get_strategy
+from services.tick_store import iter_ticks, recorded_hours, TIME, PRICE, QUANTITY
+from services.whale_service import HOUR_MS
+
+DEFAULT_BAR_SECONDS = 60
+DEFAULT_FEE_BPS = 10      # 0.1% per side, Binance spot taker fee
+
+def ticks_to_bars(ticks, bar_ms):
+    """
+    Aggregate time-ordered ticks into bars of bar_ms (bars without trades are skipped).
+    Returns (open_times, {'open', 'high', 'low', 'close', 'volume'}).
+    """
+    times, prices = ticks[:, TIME], ticks[:, PRICE]
+    bucket = (times // bar_ms).astype(np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    ends = np.append(starts[1:], len(ticks))
+    series = {
+        "open": prices[starts],
+        "high": np.maximum.reduceat(prices, starts),
+        "low": np.minimum.reduceat(prices, starts),
+        "close": prices[ends - 1],
+        "volume": np.add.reduceat(ticks[:, QUANTITY], starts)
+    }
+    return bucket[starts] * bar_ms, series
+
+def _join_bars(open_times, series):
+    """Merge consecutive bars with the same open time (a bar split across two tick chunks)."""
+    starts = np.flatnonzero(np.concatenate(([True], open_times[1:] != open_times[:-1])))
+    if len(starts) == len(open_times):
+        return open_times, series
+    ends = np.append(starts[1:], len(open_times))
+    return open_times[starts], {
+        "open": series["open"][starts],
+        "high": np.maximum.reduceat(series["high"], starts),
+        "low": np.minimum.reduceat(series["low"], starts),
+        "close": series["close"][ends - 1],
+        "volume": np.add.reduceat(series["volume"], starts)
+    }
+
+def _stream_bars(chunks, bar_ms):
+    """Bars of a stream of time-ordered tick chunks; returns (open_times, series, tick_count)."""
+    open_times, parts, tick_count = [], [], 0
+    for ticks in chunks:
+        if not len(ticks):
+            continue
+        chunk_times, chunk_series = ticks_to_bars(ticks, bar_ms)
+        open_times.append(chunk_times)
+        parts.append(chunk_series)
+        tick_count += len(ticks)
+    if not parts:
+        return np.empty(0), {}, 0
+    series = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    return (*_join_bars(np.concatenate(open_times), series), tick_count)
+
+def _first_trades_at(chunks, targets):
+    """
+    Time and price of the first tick at or after each of the sorted target
+    times, scanning the chunks once; NaN for targets after the last tick.
+    """
+    times = np.full(len(targets), np.nan)
+    prices = np.full(len(targets), np.nan)
+    done = 0
+    for ticks in chunks:
+        if done == len(targets):
+            break
+        if not len(ticks):
+            continue
+        chunk_times = ticks[:, TIME]
+        # Targets up to this chunk's last tick are filled inside it
+        last = np.searchsorted(targets, chunk_times[-1], side="right")
+        idx = np.searchsorted(chunk_times, targets[done:last], side="left")
+        times[done:last] = chunk_times[idx]
+        prices[done:last] = ticks[idx, PRICE]
+        done = last
+    return times, prices
+
+def replay_ticks(chunks, strategy, params, bar_ms=DEFAULT_BAR_SECONDS * 1000,
+                 fee_rate=DEFAULT_FEE_BPS / 10000, latency_ms=0):
+    """
+    Replay ticks through a registered strategy.
+    chunks is a function returning the time-ordered tick arrays to replay,
+    e.g. one hour at a time from tick_store.iter_ticks. It is read twice
+    (bars, then fills), so only one chunk is in memory at a time.
+    Signals are evaluated on bar closes; each order is filled at the first trade
+    at or after bar close + latency_ms, paying fee_rate on both sides.
+    Returns (trades, bar_count, tick_count) with trades in run_backtest's record format.
+    """
+    definition = get_strategy(strategy)
+    open_times, series, tick_count = _stream_bars(chunks(), bar_ms)
+    if not tick_count:
+        return [], 0, 0
+
+    buy, sell, _, fields, _ = definition.evaluate(series, params)
+    entries, exits = simulate_positions(buy, sell)
+
+    # Fills for every signal at once: the first tick at or after the order reaches the market
+    entry_times = open_times[entries] + bar_ms
+    exit_times = open_times[exits] + bar_ms
+    signal_times = np.concatenate([entry_times, exit_times])
+    order = np.argsort(signal_times, kind="stable")
+    fill_times, fill_prices = np.empty(len(order)), np.empty(len(order))
+    fill_times[order], fill_prices[order] = _first_trades_at(chunks(), signal_times[order] + latency_ms)
+    entry_fills = zip(fill_times[:len(entries)], fill_prices[:len(entries)])
+    exit_fills = list(zip(fill_times[len(entries):], fill_prices[len(entries):]))
+
+    params = definition.merged_params(params)
+    def info(template, bar):
+        values = {name: float(v[bar]) for name, v in fields.items()}
+        return {**values, 'reason': template.format(**params, **values)}
+
+    trades = []
+    for n, (bar, (fill_time, price)) in enumerate(zip(entries, entry_fills)):
+        if np.isnan(price):
+            break
+        price = float(price)
+        cost = price * (1 + fee_rate)
+        trades.append({
+            'action': 'BUY',
+            'price': price,
+            'timestamp': int(fill_time),
+            'signal_time': int(entry_times[n]),
+            'signal_price': float(series['close'][bar]),
+            'fee': price * fee_rate,
+            **info(definition.entry_reason, bar)
+        })
+        if n >= len(exits) or np.isnan(exit_fills[n][1]):
+            break
+        fill_time, sell_price = exit_fills[n]
+        sell_price = float(sell_price)
+        profit = sell_price * (1 - fee_rate) - cost
+        trades.append({
+            'action': 'SELL',
+            'price': sell_price,
+            'timestamp': int(fill_time),
+            'signal_time': int(exit_times[n]),
+            'signal_price': float(series['close'][exits[n]]),
+            'fee': sell_price * fee_rate,
+            'profit': profit,
+            'profit_pct': (profit / cost) * 100,
+            **info(definition.exit_reason, exits[n])
+        })
+    return trades, len(open_times), tick_count
+
+def replay_backtest(coin, strategy, params, hours=24, bar_seconds=DEFAULT_BAR_SECONDS,
+                    fee_bps=DEFAULT_FEE_BPS, latency_ms=0, initial_capital=10000):
+    """
+    Backtest a strategy over the most recent `hours` of recorded ticks.
+
+    Args:
+        coin: Cryptocurrency id or Binance symbol
+        strategy: Registered strategy name
+        params: Strategy parameters
+        hours: Hours of recorded ticks to replay, ending at the newest recorded hour
+        bar_seconds: Bar length the strategy's rules are evaluated on
+        fee_bps: Fee per side in basis points
+        latency_ms: Delay between a bar close and the order reaching the market
+    """
+    symbol = resolve_symbol(coin)
+    if not symbol:
+        return {'error': f'Unknown coin: {coin}'}
+    if bar_seconds <= 0 or latency_ms < 0 or fee_bps < 0:
+        return {'error': 'bar_seconds must be positive; latency_ms and fee_bps non-negative'}
+
+    hours_on_disk = recorded_hours(symbol)
+    if not hours_on_disk:
+        return {'error': f'No recorded ticks for {symbol}'}
+    end_ms = hours_on_disk[-1] + HOUR_MS
+    start_ms = end_ms - hours * HOUR_MS
+
+    started = time.perf_counter()
+    try:
+        trades, bars, ticks = replay_ticks(
+            lambda: iter_ticks(symbol, start_ms, end_ms),
+            strategy, params, bar_seconds * 1000, fee_bps / 10000, latency_ms
+        )
+    except ValueError as e:
+        return {'error': str(e)}
+    elapsed = time.perf_counter() - started
+
+    return {
+        'success': True,
+        'symbol': symbol,
+        'strategy': strategy,
+        'params': params,
+        'start': start_ms,
+        'end': end_ms,
+        'ticks': ticks,
+        'bars': bars,
+        'trades': trades,
+        'metrics': calculate_metrics(trades, initial_capital),
+        'elapsed_ms': elapsed * 1000,
+        'ticks_per_second': ticks / elapsed if elapsed > 0 else None
+    }
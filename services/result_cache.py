@@ -0,0 +1,131 @@
+"""
+Result Cache
+Content-addressed cache for computed results: an in-memory LRU in front of JSON files on disk
+"""
+import os
+import json
+import glob
+import hashlib
+import threading
+from collections import OrderedDict
+
+RESULT_CACHE_DIR = os.path.join("data", "results")
+
+def cache_key(symbol, interval, candles_start, candles_end, candles_count, name, params):
+    """
+    Stable key for a result computed from a candle range: any change to the
+    inputs, including a new candle at either end, gives a different key.
+    """
+    content = json.dumps({
+        "symbol": symbol,
+        "interval": interval,
+        "range": [candles_start, candles_end, candles_count],
+        "name": name,
+        "params": params
+    }, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(content.encode()).hexdigest()[:32]
+    # The symbol/interval prefix lets invalidate() find a pair's entries on disk
+    return f"{symbol}_{interval}_{digest}"
+
+class ResultCache:
+    """
+    Two-tier result cache. Memory holds the most recently used entries as JSON
+    text, so every get() returns its own copy; disk keeps up to
+    max_disk_entries JSON files so results survive restarts.
+    """
+    def __init__(self, name, max_entries=128, max_disk_entries=1000):
+        self.directory = os.path.join(RESULT_CACHE_DIR, name)
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, key):
+        """Return a fresh copy of the cached value, or None."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return json.loads(self._memory[key])
+        try:
+            with open(self._path(key), "r") as f:
+                text = f.read()
+            value = json.loads(text)
+        except (json.JSONDecodeError, IOError):
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        with self._lock:
+            self._stats["disk_hits"] += 1
+            self._remember(key, text)
+        return value
+
+    def put(self, key, value):
+        """Store a JSON-serializable value in both tiers (as a snapshot; later changes to value are not cached)."""
+        try:
+            text = json.dumps(value)
+        except (TypeError, ValueError) as e:
+            print(f"Error writing result cache entry {key}: {e}")
+            return
+        with self._lock:
+            self._remember(key, text)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(text)
+            os.replace(tmp_path, self._path(key))
+            self._prune_disk()
+        except IOError as e:
+            print(f"Error writing result cache entry {key}: {e}")
+
+    def _prune_disk(self):
+        paths = glob.glob(os.path.join(self.directory, "*.json"))
+        if len(paths) <= self.max_disk_entries:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def invalidate(self, symbol, interval):
+        """Drop every entry computed from this symbol's candles."""
+        prefix = f"{symbol}_{interval}_"
+        paths = glob.glob(os.path.join(self.directory, prefix + "*.json"))
+        dropped = {os.path.basename(path)[:-len(".json")] for path in paths}
+        with self._lock:
+            for key in [k for k in self._memory if k.startswith(prefix)]:
+                del self._memory[key]
+                dropped.add(key)
+            self._stats["invalidations"] += len(dropped)
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            hits = lookups - self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": hits / lookups if lookups else 0,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "disk_entries": len(glob.glob(os.path.join(self.directory, "*.json"))),
+                "max_disk_entries": self.max_disk_entries
+            }
@@ -0,0 +1,110 @@
+"""
+Shared Arrays
+One worker process pool for the app, and NumPy arrays handed to it through
+shared memory instead of pickling them
+"""
+import os
+import itertools
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
+
+WORKER_PROCESSES = os.cpu_count() or 2
+MAX_ATTACHED_ARRAYS = 4   # shared blocks each worker keeps mapped between tasks
+
+# One pool for the whole process, started on first use. Workers are started by a
+# fork server (or spawned) rather than forked from a server that runs stream threads.
+_pool = None
+_pool_lock = threading.Lock()
+
+# In each worker: shm name -> (shm, array), least recently used first
+_attached = OrderedDict()
+
+def share_array(array):
+    """
+    Copy array into a new shared memory block.
+    Returns (shm, spec); pass spec to workers and call release(shm) when done.
+    """
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+def attach_array(spec):
+    """
+    Map a shared array from its spec without copying.
+    Returns (shm, array); keep shm referenced for as long as array is used.
+    """
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    array.flags.writeable = False
+    return shm, array
+
+def release(shm):
+    """Close and unlink a block created by share_array."""
+    shm.close()
+    shm.unlink()
+
+def get_pool():
+    """The process-wide worker pool, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=WORKER_PROCESSES, mp_context=multiprocessing.get_context(method))
+        return _pool
+
+def shutdown_pool():
+    """Stop the worker pool (at app shutdown, or after a worker died); the next get_pool() starts a new one."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+def pool_map(fn, *iterables):
+    """list(map(fn, *iterables)) on the shared pool; fn must be a module-level function."""
+    try:
+        return list(get_pool().map(fn, *iterables))
+    except BrokenProcessPool:
+        shutdown_pool()
+        raise
+
+def _worker_array(spec):
+    """Map a shared array in a worker, reusing the mapping for later tasks on the same array."""
+    name = spec[0]
+    if name not in _attached:
+        _attached[name] = attach_array(spec)
+        while len(_attached) > MAX_ATTACHED_ARRAYS:
+            _, (shm, array) = _attached.popitem(last=False)
+            del array
+            try:
+                shm.close()
+            except BufferError:
+                pass   # a result still holds a view; the block is unmapped once that is gone
+    _attached.move_to_end(name)
+    return _attached[name][1]
+
+def _call_with_array(fn, spec, task):
+    return fn(_worker_array(spec), *task)
+
+def map_shared(array, fn, tasks, workers, parallel=True):
+    """
+    Return [fn(array, *task) for task in tasks], spreading the tasks over the
+    shared worker pool, whose processes map the array from shared memory.
+    Runs inline unless parallel, workers >= 2 and there are several tasks.
+    fn must be a module-level function so it can be sent to the workers.
+    """
+    if not parallel or workers < 2 or len(tasks) < 2:
+        return [fn(array, *task) for task in tasks]
+
+    shm, spec = share_array(array)
+    try:
+        return pool_map(_call_with_array, itertools.repeat(fn), itertools.repeat(spec), tasks)
+    finally:
+        release(shm)
@@ -0,0 +1,97 @@
+"""
+Signal Service
+Next-price model signals for many coins at once, trained across worker processes
+"""
+import os
+import numpy as np
+from services.binance_service import COIN_MAPPING, resolve_symbol
+from services.crypto_data_service import (
+    WATCHED_COINS, PEPE_WINDOW, fit_price_model, model_metrics, predict_next_price, generate_signal
+)
+from services.feature_pipeline import build_dataset
+from services.model_registry import get_model, save_model, needs_retrain
+from services.portfolio_backtest_service import load_price_matrix
+from services.shared_arrays import map_shared
+
+SIGNAL_WORKERS = os.cpu_count() or 2
+SIGNAL_DAYS = 30
+
+def _model_name(coin):
+    return f"{coin}_signal_random_forest"
+
+def _train(closes, column, window):
+    """Worker: fit one coin's model on its column of the shared hourly close matrix."""
+    prices = closes[:, column]
+    X, y = build_dataset(prices[np.isfinite(prices)], window)
+    model = fit_price_model(X, y)
+    if model is None:
+        return None
+    return model, len(y), model_metrics(model, y)
+
+def get_batch_signals(coins=None, window=PEPE_WINDOW, days=SIGNAL_DAYS):
+    """
+    Current price, predicted next hourly close and BUY/SELL/HOLD signal for
+    every coin (default WATCHED_COINS; 'all' for every mapped coin).
+    Models come from the registry; stale ones are retrained in parallel on a
+    shared price matrix and saved back.
+    """
+    if coins is None:
+        coins = WATCHED_COINS
+    elif coins == 'all':
+        coins = list(COIN_MAPPING)
+    symbols = [resolve_symbol(coin) for coin in coins]
+    unknown = [coin for coin, symbol in zip(coins, symbols) if not symbol]
+    if unknown:
+        return {'error': f"Unknown coins: {', '.join(unknown)}"}
+
+    timestamps, closes = load_price_matrix(symbols, days)
+    if not len(timestamps):
+        return {'error': 'Failed to fetch historical data'}
+
+    models, stale = {}, []
+    for j, coin in enumerate(coins):
+        model, metadata = get_model(_model_name(coin))
+        if metadata is not None and metadata.get('window') == window:
+            new_points = int(np.count_nonzero(timestamps[np.isfinite(closes[:, j])] > metadata['train_end']))
+            if not needs_retrain(metadata, new_points):
+                models[coin] = (model, metadata)
+                continue
+        stale.append((j, window))
+
+    for (j, _), trained in zip(stale, map_shared(closes, _train, stale, SIGNAL_WORKERS)):
+        coin = coins[j]
+        if trained is None:
+            print(f"Not enough data to train the {coin} model.")
+            models[coin] = get_model(_model_name(coin))
+            continue
+        model, samples, metrics = trained
+        listed = np.isfinite(closes[:, j])
+        metadata = save_model(
+            _model_name(coin), model,
+            coin=coin,
+            symbol=symbols[j],
+            window=window,
+            train_start=int(timestamps[listed][0]),
+            train_end=int(timestamps[listed][-1]),
+            samples=samples,
+            metrics=metrics
+        )
+        models[coin] = (model, metadata)
+
+    signals = []
+    for j, (coin, symbol) in enumerate(zip(coins, symbols)):
+        prices = closes[:, j][np.isfinite(closes[:, j])]
+        model, metadata = models[coin]
+        current_price = float(prices[-1]) if len(prices) else None
+        predicted_price = predict_next_price(model, prices, window) if current_price else None
+        signals.append({
+            'coin': coin,
+            'symbol': symbol,
+            'current_price': current_price,
+            'predicted_price': float(predicted_price) if predicted_price is not None else None,
+            'signal': generate_signal(current_price, predicted_price),
+            'model_version': metadata['version'] if metadata else None,
+            'trained_at': metadata['trained_at'] if metadata else None
+        })
+
+    return {'success': True, 'window': window, 'signals': signals}
@@ -0,0 +1,407 @@
+"""
+Strategy Registry
+Strategies declared as entry/exit rules over indicator expressions, e.g.
+    sma(10) crosses_above sma(30) and rsi(14) < 60
+Rules are parsed once and evaluated as whole-array operations; identical
+subexpressions (the same SMA in the entry and exit rule) are computed once per run.
+"""
+import os
+import re
+import json
+import numbers
+import threading
+from functools import lru_cache
+import numpy as np
+from services import indicators
+from services.candle_store import OPEN, HIGH, LOW, CLOSE, VOLUME
+
+CUSTOM_STRATEGIES_FILE = os.path.join("data", "strategies.json")
+
+SERIES = {"open": OPEN, "high": HIGH, "low": LOW, "close": CLOSE, "volume": VOLUME}
+# name -> (kernel, bars before the first usable value)
+FUNCTIONS = {
+    "sma": (indicators.sma, lambda period: period),
+    "ema": (lambda prices, period: indicators.ema(prices, span=period), lambda period: period),
+    "rsi": (indicators.rsi, lambda period: period + 1)
+}
+COMPARISONS = ("<", "<=", ">", ">=", "==", "!=", "crosses_above", "crosses_below")
+
+_TOKEN = re.compile(r"\s*(?:(\d+\.?\d*|\.\d+)|([A-Za-z_]\w*)|(<=|>=|==|!=|[<>+\-*/(),]))")
+
+def _tokenize(text):
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match:
+            raise ValueError(f"Unexpected character at {pos} in rule: {text}")
+        number, name, symbol = match.groups()
+        if number is not None:
+            tokens.append(("num", float(number)))
+        elif name is not None:
+            tokens.append(("name", name))
+        else:
+            tokens.append(("op", symbol))
+        pos = match.end()
+    return tokens
+
+class _Parser:
+    """
+    Recursive-descent parser producing nested tuples:
+    ('num', v) ('param', name) ('series', name) ('call', fn, args)
+    ('neg', x) ('arith', op, a, b) ('cmp', op, a, b) ('and'|'or', a, b) ('not', x)
+    """
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def parse(self):
+        node = self._or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected '{self.tokens[self.pos][1]}' in rule: {self.text}")
+        return node
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _accept(self, kind, value=None):
+        token = self._peek()
+        if token[0] == kind and (value is None or token[1] == value):
+            self.pos += 1
+            return token
+        return None
+
+    def _expect(self, kind, value):
+        if not self._accept(kind, value):
+            raise ValueError(f"Expected '{value}' in rule: {self.text}")
+
+    def _or(self):
+        node = self._and()
+        while self._accept("name", "or"):
+            node = ("or", node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._accept("name", "and"):
+            node = ("and", node, self._not())
+        return node
+
+    def _not(self):
+        if self._accept("name", "not"):
+            return ("not", self._not())
+        return self._comparison()
+
+    def _comparison(self):
+        node = self._sum()
+        kind, value = self._peek()
+        if value in COMPARISONS and kind in ("op", "name"):
+            self.pos += 1
+            node = ("cmp", value, node, self._sum())
+        return node
+
+    def _sum(self):
+        node = self._product()
+        while self._peek() in (("op", "+"), ("op", "-")):
+            op = self.tokens[self.pos][1]
+            self.pos += 1
+            node = ("arith", op, node, self._product())
+        return node
+
+    def _product(self):
+        node = self._factor()
+        while self._peek() in (("op", "*"), ("op", "/")):
+            op = self.tokens[self.pos][1]
+            self.pos += 1
+            node = ("arith", op, node, self._factor())
+        return node
+
+    def _factor(self):
+        token = self._accept("num")
+        if token:
+            return ("num", token[1])
+        if self._accept("op", "-"):
+            return ("neg", self._factor())
+        if self._accept("op", "("):
+            node = self._or()
+            self._expect("op", ")")
+            return node
+        token = self._accept("name")
+        if not token:
+            unexpected = self._peek()[1]
+            if unexpected is None:
+                raise ValueError(f"Unexpected end of rule: {self.text}")
+            raise ValueError(f"Unexpected '{unexpected}' in rule: {self.text}")
+        name = token[1]
+        if self._accept("op", "("):
+            if name not in FUNCTIONS:
+                raise ValueError(f"Unknown function '{name}' in rule: {self.text}")
+            args = [self._sum()]
+            while self._accept("op", ","):
+                args.append(self._sum())
+            self._expect("op", ")")
+            return ("call", name, tuple(args))
+        if name in SERIES:
+            return ("series", name)
+        return ("param", name)
+
+@lru_cache(maxsize=256)
+def compile_rule(text):
+    """Parse a rule once; the tree is reused for every run and parameter set."""
+    node = _Parser(text).parse()
+    if _kind(node) != "bool":
+        raise ValueError(f"Rule must be a condition: {text}")
+    return node
+
+def _kind(node):
+    """'bool' for conditions, 'num' for values; raises on mixing them."""
+    tag = node[0]
+    if tag in ("and", "or", "not"):
+        if any(_kind(child) != "bool" for child in node[1:]):
+            raise ValueError(f"'{tag}' needs conditions on both sides")
+        return "bool"
+    if tag in ("cmp", "arith"):
+        if _kind(node[2]) != "num" or _kind(node[3]) != "num":
+            raise ValueError(f"'{node[1]}' needs values on both sides")
+        return "bool" if tag == "cmp" else "num"
+    if tag == "neg" and _kind(node[1]) != "num":
+        raise ValueError("'-' needs a value")
+    if tag == "call":
+        for arg in node[2]:
+            _kind(arg)
+    return "num"
+
+def _bind(node, params):
+    """Substitute parameter values so equal subexpressions compare equal."""
+    tag = node[0]
+    if tag == "param":
+        if node[1] not in params:
+            raise ValueError(f"Unknown parameter or series '{node[1]}'")
+        value = params[node[1]]
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            raise ValueError(f"Parameter '{node[1]}' must be a number")
+        return ("num", float(value))
+    if tag in ("num", "series"):
+        return node
+    if tag == "call":
+        return ("call", node[1], tuple(_bind(arg, params) for arg in node[2]))
+    if tag in ("cmp", "arith"):
+        return (tag, node[1], _bind(node[2], params), _bind(node[3], params))
+    return (tag,) + tuple(_bind(child, params) for child in node[1:])
+
+def _lookback(node):
+    """Bars before every indicator in the expression has a usable value."""
+    tag = node[0]
+    if tag == "call":
+        period = node[2][0]
+        if period[0] != "num" or period[1] < 1:
+            raise ValueError(f"{node[1]}() period must be a positive number or parameter")
+        inner = max((_lookback(arg) for arg in node[2][1:]), default=0)
+        return FUNCTIONS[node[1]][1](int(period[1])) + inner
+    if tag in ("cmp", "arith"):
+        return max(_lookback(node[2]), _lookback(node[3]))
+    if tag in ("num", "series"):
+        return 0
+    return max(_lookback(child) for child in node[1:])
+
+class Evaluator:
+    """Evaluates bound expressions over one set of series, memoizing every subexpression."""
+    def __init__(self, series):
+        self.series = series
+        self.memo = {}
+
+    def __call__(self, node):
+        if node not in self.memo:
+            self.memo[node] = self._evaluate(node)
+        return self.memo[node]
+
+    def _evaluate(self, node):
+        tag = node[0]
+        if tag == "num":
+            return node[1]
+        if tag == "series":
+            if node[1] not in self.series:
+                raise ValueError(f"Series '{node[1]}' is not available here")
+            return self.series[node[1]]
+        if tag == "call":
+            kernel = FUNCTIONS[node[1]][0]
+            period = int(node[2][0][1])
+            source = self(node[2][1]) if len(node[2]) > 1 else self(("series", "close"))
+            return kernel(source, period)
+        if tag == "neg":
+            return -self(node[1])
+        if tag == "not":
+            return ~self(node[1])
+        if tag == "and":
+            return self(node[1]) & self(node[2])
+        if tag == "or":
+            return self(node[1]) | self(node[2])
+        op, a, b = node[1], self(node[2]), self(node[3])
+        if tag == "arith":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return {"+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide}[op](a, b)
+        if op in ("crosses_above", "crosses_below"):
+            a, b = np.broadcast_arrays(a, b)
+            result = np.zeros(a.shape, dtype=bool)
+            if op == "crosses_above":
+                result[1:] = (a[1:] > b[1:]) & (a[:-1] <= b[:-1])
+            else:
+                result[1:] = (a[1:] < b[1:]) & (a[:-1] >= b[:-1])
+            return result
+        return {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+                "==": np.equal, "!=": np.not_equal}[op](a, b)
+
+class Strategy:
+    """
+    A named pair of entry/exit rules.
+    params: defaults for the names used in the rules
+    plots: {name: expression} indicator series returned for charting
+    fields: {name: expression} values recorded on every trade
+    entry_reason / exit_reason: str.format templates over params and fields
+    """
+    def __init__(self, name, entry, exit, params=None, plots=None, fields=None,
+                 entry_reason=None, exit_reason=None, description="", builtin=False):
+        self.name = name
+        self.entry = entry
+        self.exit = exit
+        self.params = dict(params or {})
+        self.plots = dict(plots or {})
+        self.fields = dict(fields or {})
+        self.entry_reason = entry_reason or f"Entry: {entry}"
+        self.exit_reason = exit_reason or f"Exit: {exit}"
+        self.description = description
+        self.builtin = builtin
+        # Fail at registration, not at the first backtest
+        for text in (entry, exit):
+            compile_rule(text)
+        for text in list(self.plots.values()) + list(self.fields.values()):
+            _kind(_Parser(text).parse())
+        self.signals({name: np.zeros(1) for name in SERIES}, {})
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "entry": self.entry,
+            "exit": self.exit,
+            "params": self.params,
+            "plots": self.plots,
+            "fields": self.fields,
+            "entry_reason": self.entry_reason,
+            "exit_reason": self.exit_reason,
+            "description": self.description
+        }
+
+    def merged_params(self, params):
+        return {**self.params, **(params or {})}
+
+    def evaluate(self, series, params):
+        """
+        Evaluate both rules and the plot/field expressions over the series
+        ({'close': array, ...}; arrays may be (bars, assets) matrices).
+        Returns (entry, exit, plots, fields, warmup); signals before warmup are cleared.
+        """
+        params = self.merged_params(params)
+        evaluate = Evaluator(series)
+        entry_node = _bind(compile_rule(self.entry), params)
+        exit_node = _bind(compile_rule(self.exit), params)
+        warmup = max(_lookback(entry_node), _lookback(exit_node))
+
+        shape = np.shape(series["close"])
+        entry = np.broadcast_to(evaluate(entry_node), shape).astype(bool)
+        exit = np.broadcast_to(evaluate(exit_node), shape).astype(bool)
+        entry[:warmup] = False
+        exit[:warmup] = False
+
+        bind = lambda text: _bind(_Parser(text).parse(), params)
+        plots = {name: evaluate(bind(text)) for name, text in self.plots.items()}
+        fields = {name: evaluate(bind(text)) for name, text in self.fields.items()}
+        return entry, exit, plots, fields, warmup
+
+    def signals(self, series, params):
+        entry, exit, _, _, warmup = self.evaluate(series, params)
+        return entry, exit, warmup
+
+_strategies = {}
+_lock = threading.Lock()
+_custom_loaded = False
+
+def _register(strategy):
+    with _lock:
+        _strategies[strategy.name] = strategy
+
+_register(Strategy(
+    "sma_crossover",
+    entry="sma(short_period) crosses_above sma(long_period)",
+    exit="sma(short_period) crosses_below sma(long_period)",
+    params={"short_period": 10, "long_period": 30},
+    plots={"short_sma": "sma(short_period)", "long_sma": "sma(long_period)"},
+    entry_reason="SMA({short_period}) crossed above SMA({long_period})",
+    exit_reason="SMA({short_period}) crossed below SMA({long_period})",
+    description="Buy when the short SMA crosses above the long SMA, sell when it crosses below",
+    builtin=True
+))
+_register(Strategy(
+    "rsi",
+    entry="rsi(rsi_period) < oversold",
+    exit="rsi(rsi_period) > overbought",
+    params={"rsi_period": 14, "oversold": 30, "overbought": 70},
+    plots={"rsi": "rsi(rsi_period)"},
+    fields={"rsi": "rsi(rsi_period)"},
+    entry_reason="RSI({rsi:.1f}) below {oversold} (oversold)",
+    exit_reason="RSI({rsi:.1f}) above {overbought} (overbought)",
+    description="Buy when RSI is oversold, sell when it is overbought",
+    builtin=True
+))
+
+def _load_custom():
+    global _custom_loaded
+    if _custom_loaded:
+        return
+    _custom_loaded = True
+    if not os.path.exists(CUSTOM_STRATEGIES_FILE):
+        return
+    try:
+        with open(CUSTOM_STRATEGIES_FILE, "r") as f:
+            saved = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return
+    for item in saved:
+        try:
+            _register(Strategy(**item))
+        except (ValueError, TypeError) as e:
+            print(f"Skipping saved strategy {item.get('name')}: {e}")
+
+def _save_custom():
+    custom = [s.to_dict() for s in _strategies.values() if not s.builtin]
+    os.makedirs(os.path.dirname(CUSTOM_STRATEGIES_FILE), exist_ok=True)
+    tmp_path = CUSTOM_STRATEGIES_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(custom, f, indent=2)
+    os.replace(tmp_path, CUSTOM_STRATEGIES_FILE)
+
+def get_strategy(name):
+    """Return the registered strategy; raises ValueError if unknown."""
+    _load_custom()
+    strategy = _strategies.get(name)
+    if strategy is None:
+        raise ValueError('Unknown strategy')
+    return strategy
+
+def list_strategies():
+    _load_custom()
+    return [s.to_dict() for s in _strategies.values()]
+
+def register_strategy(name, entry, exit, params=None, description=""):
+    """
+    Add or replace a custom strategy. Rules are validated before saving;
+    raises ValueError for bad rules or when overriding a built-in.
+    """
+    _load_custom()
+    existing = _strategies.get(name)
+    if existing is not None and existing.builtin:
+        raise ValueError(f"'{name}' is a built-in strategy")
+    _register(Strategy(name, entry, exit, params=params, description=description))
+    with _lock:
+        _save_custom()
+    return _strategies[name].to_dict()
@@ -0,0 +1,94 @@
+"""
+Binance Stream Service
+Background WebSocket subscriptions to Binance combined streams
+"""
+import os
+import json
+import time
+import socket
+import threading
+import websocket
+
+# Point this at a local replay server to run without Binance
+STREAM_BASE_URL = os.getenv("BINANCE_STREAM_URL", "wss://stream.binance.com:9443/stream")
+RECONNECT_DELAY = 1       # seconds, doubled after each failed attempt
+MAX_RECONNECT_DELAY = 30
+
+class BinanceStream:
+    """
+    Keeps one combined-stream connection open on a daemon thread,
+    reconnecting with backoff, and hands every payload to on_data(stream, data).
+    """
+    def __init__(self, streams, on_data, base_url=None):
+        self.streams = list(streams)
+        self.on_data = on_data
+        self.base_url = base_url or STREAM_BASE_URL
+        self.last_message_at = None   # time.monotonic() of the last handled message
+        self._ws = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def url(self):
+        return f"{self.base_url}?streams={'/'.join(self.streams)}"
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the background connection (no-op if already running)."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="binance-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """Close the connection and wait for the thread to exit."""
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            ws.keep_running = False
+            raw = ws.sock.sock if ws.sock is not None else None
+            try:
+                # Wake the reader blocked in select() and let it tear the connection down;
+                # closing the socket from here would leave it waiting out ping_timeout
+                raw.shutdown(socket.SHUT_RDWR)
+            except (AttributeError, OSError):
+                ws.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        delay = RECONNECT_DELAY
+        while not self._stop.is_set():
+            opened_at = time.monotonic()
+            self._ws = websocket.WebSocketApp(
+                self.url,
+                on_message=self._on_message,
+                on_error=self._on_error
+            )
+            self._ws.run_forever(ping_interval=60, ping_timeout=10)
+
+            if self._stop.is_set():
+                break
+            # Reset the backoff after a connection that stayed up for a while
+            if time.monotonic() - opened_at > MAX_RECONNECT_DELAY:
+                delay = RECONNECT_DELAY
+            self._stop.wait(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def _on_error(self, ws, error):
+        if not self._stop.is_set():  # errors from tearing the socket down in stop() are expected
+            print(f"Binance stream error: {error}")
+
+    def _on_message(self, ws, message):
+        try:
+            payload = json.loads(message)
+            # Combined streams wrap each event as {"stream": ..., "data": ...}
+            self.on_data(payload.get("stream"), payload.get("data", payload))
+            self.last_message_at = time.monotonic()
+        except Exception as e:
+            print(f"Error handling Binance stream message: {e}")
@@ -0,0 +1,147 @@
+"""
+Tick Store
+Recorded aggTrades on disk, one NumPy file per symbol and hour
+"""
+import os
+import glob
+import time
+import threading
+import numpy as np
+from services.whale_service import HOUR_MS, MAX_AGG_TRADES_PER_REQUEST, get_agg_trades, add_trade_listener
+
+TICK_DIR = os.path.join("data", "ticks")
+MAX_DOWNLOAD_HOURS = 48
+
+# Columns of a tick array, all float64 (trade ids and ms timestamps are exact below 2**53)
+TICK_COLUMNS = ("agg_id", "time", "price", "quantity", "buyer_maker")
+AGG_ID, TIME, PRICE, QUANTITY, BUYER_MAKER = range(5)
+
+def _hour_path(symbol, hour_start):
+    return os.path.join(TICK_DIR, symbol, f"{hour_start}.npy")
+
+def empty_ticks():
+    return np.empty((0, len(TICK_COLUMNS)), dtype=np.float64)
+
+def trades_to_array(trades):
+    """Raw aggTrade dicts (REST or stream) to an (n, 5) tick array."""
+    if not trades:
+        return empty_ticks()
+    return np.array(
+        [(t["a"], t["T"], float(t["p"]), float(t["q"]), t["m"]) for t in trades],
+        dtype=np.float64
+    )
+
+def _merge_ticks(old, new):
+    """Union by aggregate trade id, in trade order."""
+    combined = np.concatenate([new, old])
+    _, first = np.unique(combined[:, AGG_ID], return_index=True)
+    return combined[first]
+
+def save_hour(symbol, hour_start, ticks):
+    """Merge ticks into the hour's file (atomic replace)."""
+    path = _hour_path(symbol, hour_start)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        ticks = _merge_ticks(np.load(path), ticks)
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, ticks)
+    os.replace(tmp_path, path)
+
+def recorded_hours(symbol):
+    """Start times of the hours with a tick file, oldest first."""
+    paths = glob.glob(os.path.join(TICK_DIR, symbol, "*.npy"))
+    return sorted(int(os.path.basename(p)[:-len(".npy")]) for p in paths if not p.endswith(".tmp.npy"))
+
+def iter_ticks(symbol, start_ms, end_ms):
+    """Yield the recorded tick arrays in [start_ms, end_ms), one hour at a time, in time order."""
+    first_hour = start_ms // HOUR_MS * HOUR_MS
+    for hour_start in recorded_hours(symbol):
+        if hour_start < first_hour or hour_start >= end_ms:
+            continue
+        ticks = np.load(_hour_path(symbol, hour_start), mmap_mode="r")
+        times = ticks[:, TIME]
+        lo = np.searchsorted(times, start_ms, side="left")
+        hi = np.searchsorted(times, end_ms, side="left")
+        if hi > lo:
+            yield ticks[lo:hi]
+
+def _download_hour(symbol, hour_start):
+    """Page through one hour of aggTrades, like the whale backfill does."""
+    hour_end = hour_start + HOUR_MS
+    pages = []
+    params = {"symbol": symbol, "startTime": hour_start, "endTime": hour_end - 1, "limit": MAX_AGG_TRADES_PER_REQUEST}
+    while True:
+        page = get_agg_trades(params)
+        pages.append(trades_to_array([t for t in page if t["T"] < hour_end]))
+        if len(page) < MAX_AGG_TRADES_PER_REQUEST or page[-1]["T"] >= hour_end:
+            break
+        params = {"symbol": symbol, "fromId": page[-1]["a"] + 1, "limit": MAX_AGG_TRADES_PER_REQUEST}
+    return np.concatenate(pages)
+
+def download_ticks(symbol, hours=1, now_ms=None):
+    """
+    Download the last `hours` complete hours of aggTrades into the tick store,
+    skipping hours that are already recorded. Returns the number of ticks saved.
+    """
+    hours = min(hours, MAX_DOWNLOAD_HOURS)
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    last_hour = now_ms // HOUR_MS * HOUR_MS
+    existing = set(recorded_hours(symbol))
+    saved = 0
+    for hour_start in range(last_hour - hours * HOUR_MS, last_hour, HOUR_MS):
+        if hour_start in existing:
+            continue
+        try:
+            ticks = _download_hour(symbol, hour_start)
+        except Exception as e:
+            print(f"Error downloading {symbol} ticks for {hour_start}: {e}")
+            continue
+        save_hour(symbol, hour_start, ticks)
+        saved += len(ticks)
+    return saved
+
+class TickRecorder:
+    """
+    Buffers live aggTrade events and writes each symbol's hour to disk once
+    the stream moves past it. The first and last hour of a session are partial.
+    """
+    def __init__(self):
+        self._buffers = {}      # symbol -> (hour_start, [raw trade])
+        self._lock = threading.Lock()
+
+    def on_trade(self, symbol, data):
+        hour_start = data["T"] // HOUR_MS * HOUR_MS
+        with self._lock:
+            current = self._buffers.get(symbol)
+            if current is not None and current[0] != hour_start:
+                self._write(symbol, *current)
+                current = None
+            if current is None:
+                current = self._buffers[symbol] = (hour_start, [])
+            current[1].append(data)
+
+    def _write(self, symbol, hour_start, trades):
+        try:
+            save_hour(symbol, hour_start, trades_to_array(trades))
+        except Exception as e:
+            print(f"Error saving {symbol} ticks: {e}")
+
+    def flush(self):
+        """Write every buffered (possibly partial) hour now."""
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+            for symbol, (hour_start, trades) in buffers.items():
+                self._write(symbol, hour_start, trades)
+
+_recorder = None
+
+def start_tick_recorder():
+    """Record every aggTrade the whale stream receives."""
+    global _recorder
+    if _recorder is None:
+        _recorder = TickRecorder()
+        add_trade_listener(_recorder.on_trade)
+
+def flush_tick_recorder():
+    if _recorder is not None:
+        _recorder.flush()
@@ -0,0 +1,32 @@
+"""
+Time Ranges
+Bookkeeping for the [start_ms, end_ms) ranges a local history is known to cover
+"""
+
+def merge_ranges(ranges):
+    """Merge overlapping or touching [start, end) ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def missing_ranges(covered, start_ms, end_ms):
+    """Return the parts of [start_ms, end_ms) not inside any covered range."""
+    gaps = []
+    cursor = start_ms
+    for start, end in covered:
+        if end <= cursor:
+            continue
+        if start >= end_ms:
+            break
+        if start > cursor:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+        if cursor >= end_ms:
+            break
+    if cursor < end_ms:
+        gaps.append((cursor, end_ms))
+    return gaps
@@ -1,47 +1,195 @@
-import requests
+import os
+import json
+import heapq
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque, OrderedDict
+from itertools import islice
+import numpy as np
+from services import http_client
 import time
 from datetime import datetime
 
+AGG_TRADES_URL = "https://api.binance.com/api/v3/aggTrades"
+
+# We will check these major pairs for large trades
+WHALE_PAIRS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'BNBUSDT', 'XRPUSDT']
+
+# Whale = trade above this USD size (> $50,000 for demo, usually $1M+)
+DEFAULT_WHALE_THRESHOLD = 50000
+
+def _symbol_values(name):
+    """Parse a 'BTCUSDT:250000,SOLUSDT:99.9' style environment variable into {symbol: float}."""
+    values = {}
+    for item in filter(None, (part.strip() for part in os.getenv(name, "").split(","))):
+        symbol, _, value = item.partition(":")
+        try:
+            values[symbol.strip().upper()] = float(value)
+        except ValueError:
+            print(f"Ignoring invalid {name} entry: {item}")
+    return values
+
+# Per-symbol overrides: a fixed USD size, or a percentile of recent trade sizes
+WHALE_THRESHOLDS = _symbol_values("WHALE_THRESHOLDS")    # e.g. WHALE_THRESHOLDS=BTCUSDT:250000
+WHALE_PERCENTILES = _symbol_values("WHALE_PERCENTILES")  # e.g. WHALE_PERCENTILES=SOLUSDT:99.9
+
+WHALE_BUFFER_SIZE = 500       # whale trades kept in memory per symbol
+TRADE_SIZE_WINDOW = 10000     # recent trade sizes per symbol used for percentiles
+MIN_PERCENTILE_SAMPLES = 500  # use the fixed threshold until this many trades were seen
+PERCENTILE_REFRESH = 200      # recompute a percentile threshold every N trades
+WHALE_STREAM_MAX_AGE = 10     # seconds without a trade before the stream counts as down
+
+HISTORY_DIR = os.path.join("data", "whales")
+HOUR_MS = 3_600_000
+MAX_AGG_TRADES_PER_REQUEST = 1000
+MAX_HISTORY_HOURS = 7 * 24    # longest lookback scan_whale_history serves; older hours are pruned
+BACKFILL_WORKERS = 8
+
+# Shared by all backfill workers to stay under Binance's request weight limit
+_agg_limiter = http_client.RateLimiter(rate=10, burst=10)
+
+# Called with (symbol, raw aggTrade) for every streamed trade
+_trade_listeners = []
+
+HISTORY_CACHE_SIZE = 32       # (symbol, threshold) histories kept in memory
+
+# (symbol, whole-USD threshold) -> {hour_start_ms: scanned hour}, mirrored on disk, least recently used first
+_history_cache = OrderedDict()
+_history_lock = threading.Lock()
+
+def _whale_tx(symbol, price, quantity, trade_time_ms, is_buyer_maker):
+    return {
+        "symbol": symbol.replace("USDT", ""),
+        "amount": quantity,
+        "amount_usd": price * quantity,
+        "from_owner": "Binance User", # Anonymous on Binance
+        "to_owner": "Binance User",
+        "timestamp": int(trade_time_ms / 1000),
+        "is_buyer_maker": is_buyer_maker # True means sell, False means buy
+    }
+
+def _whale_trades(symbol, trades):
+    """Pick the whale-sized trades out of a list of raw aggTrades."""
+    threshold = _detector.threshold(symbol)
+    whales = []
+    for trade in trades:
+        price = float(trade['p'])
+        quantity = float(trade['q'])
+        
+        if price * quantity > threshold: 
+            whales.append(_whale_tx(symbol, price, quantity, trade['T'], trade['m']))
+    return whales
+
+class WhaleDetector:
+    """
+    Streaming whale detection over aggTrade events.
+    Keeps, per symbol, a ring buffer of recent trade sizes (for percentile
+    thresholds) and a bounded buffer of detected whale trades.
+    """
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        self._sizes = {s: np.zeros(TRADE_SIZE_WINDOW) for s in self.symbols}
+        self._seen = {s: 0 for s in self.symbols}
+        self._percentile_cache = {}
+        self._whales = {s: deque(maxlen=WHALE_BUFFER_SIZE) for s in self.symbols}
+        self._lock = threading.Lock()
+        self._stream = None
+
+    @property
+    def live(self):
+        """True while the stream is running and delivered data within WHALE_STREAM_MAX_AGE seconds."""
+        stream = self._stream
+        return (stream is not None and stream.running and stream.last_message_at is not None
+                and time.monotonic() - stream.last_message_at <= WHALE_STREAM_MAX_AGE)
+
+    def threshold(self, symbol):
+        """Current USD size above which a trade on symbol counts as a whale."""
+        percentile = WHALE_PERCENTILES.get(symbol)
+        fixed = WHALE_THRESHOLDS.get(symbol, DEFAULT_WHALE_THRESHOLD)
+        if percentile is None or self._seen.get(symbol, 0) < MIN_PERCENTILE_SAMPLES:
+            return fixed
+        return self._percentile_cache.get(symbol, fixed)
+
+    def on_agg_trade(self, stream, data):
+        """Handle one aggTrade event from the stream."""
+        symbol = data["s"]
+        if symbol not in self._sizes:
+            return
+        price = float(data["p"])
+        quantity = float(data["q"])
+        amount_usd = price * quantity
+
+        with self._lock:
+            seen = self._seen[symbol]
+            self._sizes[symbol][seen % TRADE_SIZE_WINDOW] = amount_usd
+            self._seen[symbol] = seen + 1
+
+            if symbol in WHALE_PERCENTILES and self._seen[symbol] % PERCENTILE_REFRESH == 0:
+                sample = self._sizes[symbol][:min(self._seen[symbol], TRADE_SIZE_WINDOW)]
+                self._percentile_cache[symbol] = float(np.percentile(sample, WHALE_PERCENTILES[symbol]))
+
+            if amount_usd > self.threshold(symbol):
+                self._whales[symbol].append(_whale_tx(symbol, price, quantity, data["T"], data["m"]))
+
+        for listener in _trade_listeners:
+            try:
+                listener(symbol, data)
+            except Exception as e:
+                print(f"Error in trade listener for {symbol}: {e}")
+
+    def get_transactions(self, limit=10):
+        """Most recent whale trades across all symbols, newest first."""
+        with self._lock:
+            # Each buffer is already in time order, so a k-way merge is enough
+            newest_first = [list(reversed(self._whales[s])) for s in self.symbols]
+        merged = heapq.merge(*newest_first, key=lambda x: x['timestamp'], reverse=True)
+        return [dict(tx) for tx in islice(merged, limit)]
+
+    def start(self):
+        from services.stream_service import BinanceStream
+        if self._stream is None:
+            self._stream = BinanceStream([f"{s.lower()}@aggTrade" for s in self.symbols], self.on_agg_trade)
+        self._stream.start()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream = None
+
+_detector = WhaleDetector(WHALE_PAIRS)
+
+def start_whale_stream():
+    """Start feeding the whale detector from the aggTrade streams."""
+    _detector.start()
+
+def add_trade_listener(listener):
+    """Register fn(symbol, trade) to be called with every streamed aggTrade."""
+    _trade_listeners.append(listener)
+
+def stop_whale_stream():
+    _detector.stop()
+
 def get_whale_transactions(limit=10):
     """
     Fetch recent large crypto transactions from Binance (Real Data).
     Returns list of dicts with transaction details.
+    
+    Served from the streaming detector when it is live, otherwise by
+    polling the latest aggTrades of each pair.
     """
-    # We will check these major pairs for large trades
-    pairs = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'BNBUSDT', 'XRPUSDT']
+    if _detector.live:
+        return _detector.get_transactions(limit)
     
     all_trades = []
     
-    for symbol in pairs:
+    for symbol in WHALE_PAIRS:
         try:
-            # Get recent aggregate trades
-            url = "https://api.binance.com/api/v3/aggTrades"
-            params = {
-                "symbol": symbol,
-                "limit": 50  # Get last 50 trades to filter
-            }
-            
-            resp = requests.get(url, params=params, timeout=5)
+            # Get recent aggregate trades (last 50 to filter)
+            params = {"symbol": symbol, "limit": 50}
+            resp = http_client.get(AGG_TRADES_URL, params=params, timeout=5)
             if resp.status_code == 200:
-                trades = resp.json()
-                
-                for trade in trades:
-                    price = float(trade['p'])
-                    quantity = float(trade['q'])
-                    amount_usd = price * quantity
-                    
-                    # Filter for "Whale" transactions (> $50,000 for demo, usually $1M+)
-                    # Lower threshold slightly to ensure we see some activity for the user
-                    if amount_usd > 50000: 
-                        all_trades.append({
-                            "symbol": symbol.replace("USDT", ""),
-                            "amount": quantity,
-                            "amount_usd": amount_usd,
-                            "from_owner": "Binance User", # Anonymous on Binance
-                            "to_owner": "Binance User",
-                            "timestamp": int(trade['T'] / 1000),
-                            "is_buyer_maker": trade['m'] # True means sell, False means buy
-                        })
+                all_trades.extend(_whale_trades(symbol, resp.json()))
                         
         except Exception as e:
             print(f"Error fetching trades for {symbol}: {e}")
@@ -52,6 +200,186 @@ def get_whale_transactions(limit=10):
     
     return all_trades[:limit]
 
+async def _get_pair_whales_async(symbol):
+    try:
+        params = {"symbol": symbol, "limit": 50}
+        resp = await http_client.aget(AGG_TRADES_URL, params=params, timeout=5)
+        if resp.status_code == 200:
+            return _whale_trades(symbol, resp.json())
+    except Exception as e:
+        print(f"Error fetching trades for {symbol}: {e}")
+    return []
+
+async def get_whale_transactions_async(limit=10):
+    """Async version of get_whale_transactions, fetching all pairs concurrently."""
+    if _detector.live:
+        return _detector.get_transactions(limit)
+    
+    results = await asyncio.gather(*(_get_pair_whales_async(symbol) for symbol in WHALE_PAIRS))
+    all_trades = [tx for pair_trades in results for tx in pair_trades]
+    
+    # Sort by time descending
+    all_trades.sort(key=lambda x: x['timestamp'], reverse=True)
+    
+    return all_trades[:limit]
+
+def get_agg_trades(params):
+    """One rate-limited /aggTrades request; raises on HTTP errors."""
+    _agg_limiter.acquire()
+    resp = http_client.get(AGG_TRADES_URL, params=params, timeout=10)
+    resp.raise_for_status()
+    return resp.json()
+
+def _scan_hour(symbol, hour_start, threshold, complete=True, resume=None):
+    """
+    Page through every aggTrade of one symbol in one hour and keep the whales.
+    The first page is found by time, the rest by following fromId.
+    resume is an earlier partial scan of the same hour; only trades after its
+    last_id are fetched and added to it. complete marks an hour that has ended.
+    """
+    hour_end = hour_start + HOUR_MS
+    resume = resume or {}
+    whales = list(resume.get("whales", []))
+    buy_usd = resume.get("buy_usd", 0.0)
+    sell_usd = resume.get("sell_usd", 0.0)
+    last_id = resume.get("last_id")
+    
+    if last_id is None:
+        params = {"symbol": symbol, "startTime": hour_start, "endTime": hour_end - 1, "limit": MAX_AGG_TRADES_PER_REQUEST}
+    else:
+        params = {"symbol": symbol, "fromId": last_id + 1, "limit": MAX_AGG_TRADES_PER_REQUEST}
+    while True:
+        page = get_agg_trades(params)
+        for trade in page:
+            if trade['T'] >= hour_end:
+                break
+            last_id = trade['a']
+            price = float(trade['p'])
+            quantity = float(trade['q'])
+            amount_usd = price * quantity
+            if amount_usd > threshold:
+                whales.append(_whale_tx(symbol, price, quantity, trade['T'], trade['m']))
+                if trade['m']:
+                    sell_usd += amount_usd
+                else:
+                    buy_usd += amount_usd
+        
+        if len(page) < MAX_AGG_TRADES_PER_REQUEST or page[-1]['T'] >= hour_end:
+            break
+        params = {"symbol": symbol, "fromId": page[-1]['a'] + 1, "limit": MAX_AGG_TRADES_PER_REQUEST}
+    
+    return {"whales": whales, "buy_usd": buy_usd, "sell_usd": sell_usd, "last_id": last_id, "complete": complete}
+
+def _history_path(symbol, threshold):
+    return os.path.join(HISTORY_DIR, f"{symbol}_{threshold}.json")
+
+def _load_history(symbol, threshold):
+    """Scanned hours for (symbol, threshold), loaded from disk on first use."""
+    key = (symbol, threshold)
+    if key not in _history_cache:
+        hours = {}
+        path = _history_path(symbol, threshold)
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    hours = {int(h): v for h, v in json.load(f).items()}
+            except (json.JSONDecodeError, IOError, ValueError):
+                pass
+        _history_cache[key] = hours
+        while len(_history_cache) > HISTORY_CACHE_SIZE:
+            _history_cache.popitem(last=False)
+    _history_cache.move_to_end(key)
+    return _history_cache[key]
+
+def _save_history(symbol, threshold, hours):
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    path = _history_path(symbol, threshold)
+    with open(path + ".tmp", "w") as f:
+        json.dump(hours, f)
+    os.replace(path + ".tmp", path)
+
+def _prune_history(hours, oldest_hour):
+    """Drop stored hours before oldest_hour; True if any were dropped."""
+    expired = [h for h in hours if h < oldest_hour]
+    for h in expired:
+        del hours[h]
+    return bool(expired)
+
+def scan_whale_history(hours=24, symbols=None, threshold=None):
+    """
+    Backfill whale trades over the last `hours` hours by paginating aggTrades.
+    Every (symbol, hour) is scanned in parallel and stored, so repeat queries
+    only fetch new hours and the current hour's trades since the last scan.
+    hours is capped at MAX_HISTORY_HOURS; older stored hours are dropped.
+    
+    Returns {'trades': [...newest first], 'hourly': [{'timestamp', 'buy_usd', 'sell_usd', 'symbols'}]}
+    """
+    symbols = symbols or WHALE_PAIRS
+    hours = min(hours, MAX_HISTORY_HOURS)
+    now = int(time.time() * 1000)
+    current_hour = now // HOUR_MS * HOUR_MS
+    hour_starts = [current_hour - i * HOUR_MS for i in range(hours)]
+    oldest_hour = current_hour - (MAX_HISTORY_HOURS - 1) * HOUR_MS
+    
+    # Whole USD, so the cache key and the file name always agree
+    thresholds = {s: int(threshold or WHALE_THRESHOLDS.get(s, DEFAULT_WHALE_THRESHOLD)) for s in symbols}
+    with _history_lock:
+        stored = {s: _load_history(s, thresholds[s]) for s in symbols}
+        # Nothing older than the longest lookback is ever served again
+        pruned = {s for s in symbols if _prune_history(stored[s], oldest_hour)}
+        # Hours stored before partial scans were kept have no "complete" flag and are finished
+        jobs = [
+            (s, h, stored[s].get(h)) for s in symbols for h in hour_starts
+            if h not in stored[s] or not stored[s][h].get("complete", True)
+        ]
+    
+    def scan(job):
+        symbol, hour_start, partial = job
+        try:
+            # The current hour is still filling up; it is stored as partial and resumed from its last trade id
+            return symbol, hour_start, _scan_hour(symbol, hour_start, thresholds[symbol], hour_start != current_hour, partial)
+        except Exception as e:
+            print(f"Error scanning {symbol} trades for hour {hour_start}: {e}")
+            return symbol, hour_start, None
+    
+    with ThreadPoolExecutor(max_workers=BACKFILL_WORKERS) as pool:
+        scanned = list(pool.map(scan, jobs))
+    
+    results = {s: {} for s in symbols}
+    with _history_lock:
+        for symbol, hour_start, result in scanned:
+            if result is not None:
+                stored[symbol][hour_start] = result
+        for symbol in pruned | {symbol for symbol, _, result in scanned if result is not None}:
+            _save_history(symbol, thresholds[symbol], stored[symbol])
+        for symbol in symbols:
+            for hour_start in hour_starts:
+                if hour_start in stored[symbol]:
+                    results[symbol][hour_start] = stored[symbol][hour_start]
+    
+    trades = []
+    hourly = []
+    for hour_start in hour_starts:
+        row = {"timestamp": hour_start // 1000, "buy_usd": 0.0, "sell_usd": 0.0, "symbols": {}}
+        for symbol in symbols:
+            result = results[symbol].get(hour_start)
+            if result is None:
+                continue
+            trades.extend(result["whales"])
+            row["buy_usd"] += result["buy_usd"]
+            row["sell_usd"] += result["sell_usd"]
+            row["symbols"][symbol.replace("USDT", "")] = {
+                "buy_usd": result["buy_usd"],
+                "sell_usd": result["sell_usd"],
+                "count": len(result["whales"])
+            }
+        hourly.append(row)
+    
+    # Sort by time descending
+    trades.sort(key=lambda x: x['timestamp'], reverse=True)
+    
+    return {"trades": trades, "hourly": hourly}
+
 def format_whale_message(tx):
     """Format whale transaction for display."""
     from datetime import datetime
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests import the backend packages the same way backend/main.py does
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
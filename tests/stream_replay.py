@@ -0,0 +1,50 @@
+"""
+Local stand-in for the Binance combined-stream endpoint that replays recorded frames.
+"""
+import os
+import threading
+from websockets.sync.server import serve
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+def load_frames(name):
+    """Recorded raw frames (one JSON message per line) from tests/data."""
+    with open(os.path.join(DATA_DIR, name), "r") as f:
+        return [line.strip() for line in f if line.strip()]
+
+class ReplayServer:
+    """
+    Serves one recorded session per connection, in order. Every session but
+    the last is followed by the server closing the socket, which forces the
+    client to reconnect; the last session is held open until the client leaves.
+    """
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.paths = []           # request path of each connection, e.g. /stream?streams=...
+        # The client may drop the socket without a close handshake; don't wait the default 10s for one
+        self._server = serve(self._handle, "127.0.0.1", 0, close_timeout=0.5)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.socket.getsockname()[:2]
+        return f"ws://{host}:{port}/stream"
+
+    def _handle(self, ws):
+        index = len(self.paths)
+        self.paths.append(ws.request.path)
+        session = self.sessions[min(index, len(self.sessions) - 1)]
+        for frame in session:
+            ws.send(frame)
+        if index < len(self.sessions) - 1:
+            return  # drop the connection
+        for _ in ws:
+            pass
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._thread.join(5)
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from services import indicators
+from services.backtesting_service import sma_crossover_signals, rsi_signals, simulate_positions
+
+def rounded_prices(seed, bars=2000):
+    """PEPE-like series: ~1e-5 prices on a 1e-8 tick with long flat stretches."""
+    rng = np.random.default_rng(seed)
+    moves = rng.normal(0, 0.002, bars) * (rng.random(bars) < 0.3)
+    return np.round(1e-5 * np.exp(np.cumsum(moves)), 8)
+
+def baseline_sma(prices, period):
+    return pd.Series(prices).rolling(window=period).mean().to_numpy()
+
+def baseline_rsi(prices, period=14):
+    delta = pd.Series(prices).diff()
+    gain = delta.where(delta > 0, 0).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    return (100 - (100 / (1 + gain / loss))).to_numpy()
+
+@pytest.mark.parametrize("seed", range(50))
+def test_sma_matches_pandas_rolling_mean(seed):
+    prices = rounded_prices(seed)
+    for period in (10, 30):
+        np.testing.assert_array_equal(indicators.sma(prices, period), baseline_sma(prices, period))
+
+@pytest.mark.parametrize("seed", range(50))
+def test_crossover_trades_match_pandas_baseline(seed):
+    prices = rounded_prices(seed)
+    short, long = baseline_sma(prices, 10), baseline_sma(prices, 30)
+    buy = np.zeros(len(prices), dtype=bool)
+    sell = np.zeros(len(prices), dtype=bool)
+    buy[1:] = (short[1:] > long[1:]) & (short[:-1] <= long[:-1])
+    sell[1:] = (short[1:] < long[1:]) & (short[:-1] >= long[:-1])
+    buy[:30] = sell[:30] = False
+
+    new_buy, new_sell, _, _ = sma_crossover_signals(prices)
+    expected = simulate_positions(buy, sell)
+    actual = simulate_positions(new_buy, new_sell)
+    np.testing.assert_array_equal(actual[0], expected[0])
+    np.testing.assert_array_equal(actual[1], expected[1])
+
+@pytest.mark.parametrize("seed", range(20))
+def test_rsi_matches_pandas_baseline(seed):
+    prices = rounded_prices(seed)
+    np.testing.assert_array_equal(indicators.rsi(prices, 14), baseline_rsi(prices, 14))
+    buy, sell, _ = rsi_signals(prices)
+    rsi = baseline_rsi(prices, 14)
+    np.testing.assert_array_equal(buy[15:], (rsi < 30)[15:])
+    np.testing.assert_array_equal(sell[15:], (rsi > 70)[15:])
+
+@pytest.mark.parametrize("seed", range(10))
+def test_streaming_matches_batch(seed):
+    prices = rounded_prices(seed, bars=800)
+    for period in (1, 10, 30):
+        sma = indicators.SMA(period)
+        np.testing.assert_array_equal([sma.update(float(p)) for p in prices], indicators.sma(prices, period))
+    for method in ("sma", "wilder"):
+        rsi = indicators.RSI(14, method)
+        np.testing.assert_array_equal([rsi.update(float(p)) for p in prices], indicators.rsi(prices, 14, method))
+
+def test_matrix_matches_columns():
+    matrix = np.column_stack([rounded_prices(seed, bars=500) for seed in range(5)])
+    matrix[:40, 2] = np.nan   # listed later
+    result = indicators.sma(matrix, 30)
+    for j in range(matrix.shape[1]):
+        np.testing.assert_array_equal(result[:, j], indicators.sma(matrix[:, j], 30))
@@ -0,0 +1,80 @@
+import time
+import pytest
+from services import binance_service, stream_service
+from stream_replay import ReplayServer, load_frames
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+@pytest.fixture
+def rest_calls(monkeypatch):
+    """Record REST ticker requests instead of calling Binance."""
+    calls = []
+    def fake_ticker_prices(symbols):
+        calls.append(sorted(symbols))
+        return {symbol: 1.0 for symbol in symbols}
+    monkeypatch.setattr(binance_service, "get_binance_ticker_prices", fake_ticker_prices)
+    return calls
+
+@pytest.fixture
+def price_stream(monkeypatch):
+    """Start the live price stream against a replay server; yields the server."""
+    monkeypatch.setattr(stream_service, "RECONNECT_DELAY", 0.05)
+    monkeypatch.setattr(binance_service, "_live_prices", {})
+    servers = []
+    def start(*sessions):
+        server = ReplayServer([load_frames(name) for name in sessions]).__enter__()
+        servers.append(server)
+        monkeypatch.setattr(stream_service, "STREAM_BASE_URL", server.url)
+        binance_service.start_price_stream(["bitcoin", "ethereum", "pepe", "solana"])
+        return server
+    yield start
+    binance_service.stop_price_stream()
+    for server in servers:
+        server.__exit__(None, None, None)
+
+def test_fresh_prices_need_no_rest_calls(price_stream, rest_calls):
+    server = price_stream("binance_miniticker_session1.jsonl")
+    assert wait_for(lambda: binance_service.get_live_price("PEPEUSDT") is not None)
+    assert wait_for(lambda: binance_service.get_live_price("BTCUSDT") == 97015.01)
+
+    prices = binance_service.get_binance_prices(["bitcoin", "ethereum", "pepe"])
+    assert prices == {
+        "bitcoin": {"usd": 97015.01},
+        "ethereum": {"usd": 3650.21},
+        "pepe": {"usd": 0.00001012}
+    }
+    assert rest_calls == []
+    assert "btcusdt@miniTicker" in server.paths[0]
+
+def test_missing_and_stale_prices_fall_back_to_rest(price_stream, rest_calls):
+    price_stream("binance_miniticker_session1.jsonl")
+    assert wait_for(lambda: binance_service.get_live_price("PEPEUSDT") is not None)
+
+    # No frame for SOLUSDT was recorded; age the ETH entry past LIVE_PRICE_MAX_AGE
+    price, _ = binance_service._live_prices["ETHUSDT"]
+    binance_service._live_prices["ETHUSDT"] = (price, time.monotonic() - binance_service.LIVE_PRICE_MAX_AGE - 1)
+
+    prices = binance_service.get_binance_prices(["bitcoin", "ethereum", "solana"])
+    assert rest_calls == [["ETHUSDT", "SOLUSDT"]]
+    assert prices["bitcoin"] == {"usd": 97015.01}
+    assert prices["ethereum"] == {"usd": 1.0}
+    assert prices["solana"] == {"usd": 1.0}
+
+def test_table_keeps_updating_after_reconnect(price_stream, rest_calls):
+    server = price_stream("binance_miniticker_session1.jsonl", "binance_miniticker_session2.jsonl")
+    assert wait_for(lambda: binance_service.get_live_price("BTCUSDT") == 97120.0)
+    assert len(server.paths) == 2
+
+    prices = binance_service.get_binance_prices(["bitcoin", "ethereum", "pepe"])
+    assert prices == {
+        "bitcoin": {"usd": 97120.0},
+        "ethereum": {"usd": 3655.8},
+        "pepe": {"usd": 0.00001012}
+    }
+    assert rest_calls == []
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+from services.strategy_registry import get_strategy
+
+def series(bars=100):
+    closes = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, bars))
+    return {"close": closes}
+
+@pytest.mark.parametrize("value", [None, [5], {"a": 5}, True, "10", "x"])
+def test_non_numeric_params_raise_value_error(value):
+    with pytest.raises(ValueError, match="short_period"):
+        get_strategy("sma_crossover").evaluate(series(), {"short_period": value})
+
+@pytest.mark.parametrize("value", [5, 5.0, np.int64(5), np.float64(5)])
+def test_numeric_params_are_accepted(value):
+    entry, exit, _, _, warmup = get_strategy("sma_crossover").evaluate(series(), {"short_period": value})
+    assert len(entry) == len(exit) == 100
+    assert warmup == 30